@@ -1,45 +1,73 @@
 # vim assistant.py
 
 import os
-import sys
 import time
-import glob
 import re
-import importlib.util
 import numpy as np
-import whisper
-import ollama
 import threading
 import subprocess
-import uuid 
 import sounddevice as sd
 from flask import Flask, request, jsonify
 from datetime import datetime
+from contextlib import nullcontext
 import traceback
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 import config
+from dsp_utils import EnergyGate
+from telemetry import WakeTelemetry
+from wake_engine import create_engine, warmup, WakeDetector
+from wake_process import WakeProcess
+from stt_utils import StreamingTranscriber, TRANSCRIBE_LOCK, create_backend
+from startup_utils import Startup
+from text_utils import normalize_prompt, fix_phonetics, strip_wake_word, is_hallucination, SentenceSegmenter
+from routing import TriggerIndex, build_trigger_index, update_trigger_index
+from intent_utils import load_intent_model, LLM_LABEL
+from circuit_utils import BreakerBoard
+from skill_loader import SkillLoader
+from scheduler import RequestScheduler, SchedulerFull
+from request_utils import RequestContext
+from llm_utils import gateway
+from conversation_utils import ConversationManager
+from cache_utils import ResponseCache
 
 # --- FALLBACKS ---
-try: from audio_utils import play_tts, record_audio, clean_old_cache
+try: from audio_utils import play_tts, record_audio, clean_old_cache, AudioCapture, speech_in_progress, TtsStream
 except ImportError: 
+    TtsStream = None
     def play_tts(t, **k): print(f"[TTS] {t}")
-    def record_audio(): return np.zeros(16000, dtype=np.int16)
-try: from data_utils import setup_database, retrieve_from_rag, get_cached_response, save_cached_response
+    def record_audio(*a, **k): return np.zeros(16000, dtype=np.int16)
+try: from data_utils import setup_database, retrieve_from_rag, get_cached_response, save_cached_response, load_cached_responses
 except ImportError: 
     def setup_database(): pass
-    def retrieve_from_rag(p): return ""
-    def get_cached_response(p): return None
+    def retrieve_from_rag(p, **k): return ""
+    def get_cached_response(p, max_age=0): return None
     def save_cached_response(p, r): pass
+    def load_cached_responses(limit=0): return []
 try: from tools import search_with_searxng
 except ImportError: 
-    def search_with_searxng(p): return ""
+    def search_with_searxng(p, **k): return ""
 
 # --- GLOBAIS ---
-CURRENT_REQUEST_ID = None  
 IS_SPEAKING = False
 app = Flask(__name__)
-whisper_model = None
-ollama_client = None
+stt_backend = None
+LLM = None   # OllamaGateway partilhado (llm_utils)
+# Criados em init_runtime() (ver lá porquê)
+RESPONSE_CACHE = None   # LRU + semelhança em memória, SQLite por trás (validade por categoria)
+CONVERSATIONS = None
+SKILL_POOL = None
+CONTEXT_POOL = None
+SCHEDULER = None        # Voz, UI, Discord, CLI e tarefas de fundo: filas próprias, workers limitados, preempção
 SKILLS_LIST = []
+TRIGGER_INDEX = TriggerIndex()
+INTENT_MODEL = None
+SKILL_LOADER = None
+BREAKERS = BreakerBoard(error_rate=getattr(config, 'SKILL_BREAKER_ERROR_RATE', 0.5),
+                        cooloff=getattr(config, 'SKILL_BREAKER_COOLOFF', 60.0),
+                        max_cooloff=getattr(config, 'SKILL_BREAKER_MAX_COOLOFF', 900.0))
+WAKE_TELEMETRY = WakeTelemetry(getattr(config, 'WAKE_TELEMETRY_INTERVAL', 300))
+WAKE_PROCESS = None
+BOOT = Startup()
 
 # --- UTILITÁRIOS ---
 def stop_audio_output():
@@ -54,10 +82,10 @@ def is_quiet_time():
     if config.QUIET_START > config.QUIET_END: return now >= config.QUIET_START or now < config.QUIET_END
     return config.QUIET_START <= now < config.QUIET_END
 
-def safe_play_tts(text, use_cache=True, request_id=None, speak=True):
-    global CURRENT_REQUEST_ID, IS_SPEAKING
+def safe_play_tts(text, use_cache=True, ctx=None, speak=True):
+    global IS_SPEAKING
     if not speak: return
-    if request_id and request_id != "API_REQ" and request_id != CURRENT_REQUEST_ID: return
+    if ctx is not None and ctx.cancelled: return
     stop_audio_output()
     IS_SPEAKING = True
     play_tts(text, use_cache=use_cache)
@@ -115,133 +143,285 @@ def find_working_samplerate(device_index):
         except: pass
     return 16000
 
-# --- MOTOR PHANTASMA ---
-class PhantasmaEngine:
-    def __init__(self, model_paths):
-        self.ready = False
-        try:
-            from openwakeword.model import Model
-            self.model = Model(wakeword_models=model_paths, inference_framework="onnx")
-            self.ready = True
-            print(f"👻 Motor Phantasma: ONLINE")
-            print(f"   Modelos: {model_paths}")
-        except Exception as e:
-            print(f"❌ Erro Motor: {e}")
-
-    def predict(self, audio_chunk_int16):
-        if not self.ready: return 0.0
-        prediction = self.model.predict(audio_chunk_int16)
-        if prediction: return max(prediction.values())
-        return 0.0
-
-    def reset(self):
-        if self.ready: self.model.reset()
-
 # --- SKILLS & STT ---
 def load_skills():
-    global SKILLS_LIST
-    SKILLS_LIST = []
-    if not os.path.exists(config.SKILLS_DIR): return
-    sys.path.append(config.SKILLS_DIR)
-    for f in glob.glob(os.path.join(config.SKILLS_DIR, "skill_*.py")):
-        try:
-            name = os.path.basename(f)[:-3]
-            spec = importlib.util.spec_from_file_location(name, f)
-            mod = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(mod)
-            if hasattr(mod, 'register_routes'): mod.register_routes(app)
-            SKILLS_LIST.append({
-                "name": name, "handle": getattr(mod, 'handle', None),
-                "triggers": getattr(mod, 'TRIGGERS', []), "trigger_type": getattr(mod, 'TRIGGER_TYPE', 'contains'),
-                "module": mod, "get_status": getattr(mod, 'get_status_for_device', None)
-            })
-        except: pass
-
-def transcribe_audio(audio_data):
-    if audio_data.size == 0 or whisper_model is None: return ""
+    global SKILLS_LIST, TRIGGER_INDEX, INTENT_MODEL, SKILL_LOADER
+    # Manifesto primeiro: os módulos pesados só são importados no primeiro match (skill_loader)
+    SKILL_LOADER = SkillLoader(config.SKILLS_DIR, app, getattr(config, 'SKILL_DEADLINES', {}),
+                               getattr(config, 'SKILL_DEADLINE', 5.0), getattr(config, 'SKILL_LAZY_DAEMONS', []))
+    SKILLS_LIST = SKILL_LOADER.discover()
+    TRIGGER_INDEX = build_trigger_index(SKILLS_LIST)
+    print(f"🧭 Índice de triggers: {len(TRIGGER_INDEX.patterns)} triggers de {len(SKILLS_LIST)} skills")
+    if getattr(config, 'INTENT_ENABLED', True):
+        path = getattr(config, 'INTENT_MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "intents.npz"))
+        INTENT_MODEL = load_intent_model(path, getattr(config, 'INTENT_THRESHOLD', 0.10), getattr(config, 'INTENT_MARGIN', 0.04))
+    interval = getattr(config, 'SKILL_RELOAD_INTERVAL', 2.0)
+    if interval: SKILL_LOADER.watch(lambda: SKILLS_LIST, reload_skills, interval)
+
+def reload_skills(entries, changes):
+    """ Chamado pelo watcher: só os triggers das skills alteradas mudam no índice (ver routing). """
+    global SKILLS_LIST, TRIGGER_INDEX
+    for c in changes: BREAKERS.reset(c[1:])
+    TRIGGER_INDEX = update_trigger_index(TRIGGER_INDEX, entries, {c[1:] for c in changes})
+    SKILLS_LIST = entries
+
+def stt_raw(audio_data, prompt=None):
+    """ Texto cru do backend STT. 'prompt' (texto já ouvido) junta-se ao WHISPER_INITIAL_PROMPT. """
+    initial = getattr(config, 'WHISPER_INITIAL_PROMPT', None)
+    if prompt: initial = f"{initial} {prompt}" if initial else prompt
+    return stt_backend.transcribe(audio_data, initial_prompt=initial, language='pt').text
+
+def clean_transcript(text):
+    """ Filtro de alucinações + resto da wake word no início + PHONETIC_FIXES. """
+    text = text.strip()
+    if is_hallucination(text): return ""
+    return fix_phonetics(strip_wake_word(text))
+
+def transcribe_audio(audio_data, stream=None):
+    if audio_data.size == 0 or stt_backend is None: return ""
     try:
-        initial = getattr(config, 'WHISPER_INITIAL_PROMPT', None)
-        res = whisper_model.transcribe(audio_data, language='pt', fp16=False, initial_prompt=initial)
-        text = res['text'].strip()
-        hallucinations = [".", "?", "Obrigado", "Sous-titres"]
-        if any(h in text for h in hallucinations) and len(text) < 5: return ""
-        if hasattr(config, 'PHONETIC_FIXES'):
-            for k, v in config.PHONETIC_FIXES.items():
-                if k in text.lower(): text = re.sub(re.escape(k), v, text, flags=re.IGNORECASE)
-        return text
+        if stream is not None:
+            text = stream.finish(audio_data)
+            st = stream.stats
+            print(f"📝 STT streaming: {st['segments']} segmentos, {st['partials']} parciais | final em {st['final_ms']}ms")
+        else:
+            with TRANSCRIBE_LOCK: text = stt_raw(audio_data)
+        return clean_transcript(text)
     except: return ""
 
-def route_and_respond(prompt, req_id, speak=True):
-    global CURRENT_REQUEST_ID
-    if req_id == "API_REQ": CURRENT_REQUEST_ID = "API_REQ"; stop_audio_output()
-    elif req_id != CURRENT_REQUEST_ID: return
-
-    p_low = prompt.lower()
+def run_skill(s, p_low, prompt, ctx=None):
+    """
+    Executa uma skill. Devolve o texto da resposta, ou None se ignorou/falhou.
+    Exceções e chamadas acima do prazo contam para o disjuntor da skill
+    (exceto as de um pedido cancelado a meio).
+    """
+    breaker = BREAKERS.get(s['name'])
+    if not breaker.allow():
+        print(f"🔌 Skill '{s['name']}' saltada (disjuntor aberto).")
+        return None
+    t0 = time.monotonic()
+    try:
+        resp = s['handle'](p_low, prompt, ctx=ctx) if s.get('wants_ctx') and ctx is not None else s['handle'](p_low, prompt)
+        latency = time.monotonic() - t0
+        slow = latency > s.get('deadline', 5.0)
+        breaker.record(latency, not slow, f"lenta ({latency:.1f}s)" if slow else None)
+
+        # CRÍTICO: Se a skill devolveu None/Vazio, IGNORA e continua o loop!
+        if not resp:
+            print(f"⏩ Skill '{s['name']}' ignorou o pedido.")
+            return None
+        txt = resp.get("response", "") if isinstance(resp, dict) else resp
+        return txt or None
+    except Exception as e:
+        if ctx is not None and ctx.cancelled:
+            breaker.release()   # Não conta, mas não deixa o disjuntor preso em meio-aberto
+            return None
+        breaker.record(time.monotonic() - t0, False, str(e)[:200])
+        print(f"⚠️ Erro Skill {s['name']}: {e}")
+        return None
+
+def run_skills_parallel(candidates, p_low, prompt, ctx=None):
+    """
+    Todas as skills candidatas ao mesmo tempo, cada uma com o seu prazo.
+    Ganha a resposta não-vazia de maior prioridade (ordem da lista): uma skill
+    só é aceite depois de as anteriores terem recusado ou esgotado o prazo.
+    As que perdem são canceladas (se ainda não começaram) ou ignoradas.
+    """
+    t0 = time.monotonic()
+    futures = [(s, SKILL_POOL.submit(run_skill, s, p_low, prompt, ctx)) for s in candidates]
+    winner = (None, None)
+    for s, f in futures:
+        if winner[0] is not None or (ctx is not None and ctx.cancelled): f.cancel(); continue
+        try: txt = f.result(timeout=max(0.0, t0 + s['deadline'] - time.monotonic()))
+        except FutureTimeout:
+            print(f"⏱️ Skill '{s['name']}' excedeu o prazo ({s['deadline']}s). Ignorada.")
+            continue
+        if txt: winner = (s, txt)
+    print(f"⚡ {len(candidates)} skills em paralelo: {(time.monotonic() - t0) * 1000:.0f}ms")
+    return winner
+
+def route_and_respond(prompt, ctx, speak=True):
+    if ctx.cancelled: return
+
+    # Normalizado UMA vez; as skills recebem o NormalizedPrompt (é uma str em minúsculas)
+    p_low = normalize_prompt(prompt)
+    session = CONVERSATIONS.key_for(ctx)
+    # Uma só leitura: o índice traz a lista de skills a que as chaves se referem (recarregamento a quente)
+    index = TRIGGER_INDEX
+    skills = index.skills
     
-    # 1. Skills (COM FALLTHROUGH - PASSA A BATATA QUENTE)
-    for s in SKILLS_LIST:
-        trigs = [t.lower() for t in s['triggers']]
-        match = any(p_low.startswith(t) for t in trigs) if s['trigger_type'] == 'startswith' else any(t in p_low for t in trigs)
-        
-        if match and s['handle']:
-            try:
-                # Tenta executar a skill
-                resp = s['handle'](p_low, prompt)
-                
-                if req_id != CURRENT_REQUEST_ID: return
-
-                # CRÍTICO: Se a skill devolveu None/Vazio, IGNORA e continua o loop!
-                if not resp:
-                    print(f"⏩ Skill '{s['name']}' ignorou o pedido.")
-                    continue
-                
-                txt = resp.get("response", "") if isinstance(resp, dict) else resp
-                
-                # Se a resposta for vazia, também continua
-                if not txt:
-                    continue
-
-                # Se chegámos aqui, é porque a skill resolveu!
-                print(f"🔧 Skill '{s['name']}' resolveu.")
-                safe_play_tts(txt, False, req_id, speak)
+    # 1. Classificador de intenções: vai direto à skill certa (sem chamadas de rede a skills erradas)
+    tried = set()
+    intent, score = INTENT_MODEL.predict(p_low) if INTENT_MODEL is not None else (None, 0.0)
+    if intent is not None and intent != LLM_LABEL:
+        i = next((k for k, s in enumerate(skills) if s['name'] == intent), None)
+        if i is not None and skills[i]['handle']:
+            txt = run_skill(skills[i], p_low, prompt, ctx)
+            if ctx.cancelled: return
+            if txt:
+                print(f"🎯 Intenção '{intent}' ({score:.2f}) resolveu.")
+                CONVERSATIONS.add_turn(session, prompt, txt, "skill")
+                safe_play_tts(txt, False, ctx, speak)
                 return txt
-            except Exception as e:
-                print(f"⚠️ Erro Skill {s['name']}: {e}")
-                pass 
-
-    # 2. Cache
-    cached = get_cached_response(prompt)
+            tried.add(i)
+
+    # 2. Skills por triggers (COM FALLTHROUGH - PASSA A BATATA QUENTE)
+    # Uma passagem do autómato dá todas as skills com match; mantém-se a ordem de SKILLS_LIST.
+    # Os triggers correm sempre (mesmo com intenção '_llm'): skills sem exemplos de treino
+    # (ex: skill_lucid, regenerada todas as noites) só são alcançáveis por aqui.
+    matches = index.match(p_low)
+    if intent == LLM_LABEL and matches: print(f"🎯 Intenção '_llm' ({score:.2f}), mas há triggers: tenta as skills primeiro.")
+    candidates = [i for i in sorted(matches) if i not in tried and skills[i]['handle']]
+    if getattr(config, 'SKILL_PARALLEL', False) and len(candidates) > 1:
+        s, txt = run_skills_parallel([skills[i] for i in candidates], p_low, prompt, ctx)
+    else:
+        s, txt = None, None
+        for i in candidates:
+            txt = run_skill(skills[i], p_low, prompt, ctx)
+            if txt: s = skills[i]; break
+            if ctx.cancelled: return
+    if ctx.cancelled: return
+    if txt:
+        # Se chegámos aqui, é porque a skill resolveu!
+        print(f"🔧 Skill '{s['name']}' resolveu.")
+        CONVERSATIONS.add_turn(session, prompt, txt, "skill")
+        safe_play_tts(txt, False, ctx, speak)
+        return txt
+
+    # 3. Cache (só se não for continuação: "e amanhã?" depende do que veio antes)
+    follow_up = CONVERSATIONS.is_follow_up(session, prompt)
+    cached = RESPONSE_CACHE.get(prompt) if not follow_up else None
     if cached:
-        safe_play_tts(cached, True, req_id, speak)
+        CONVERSATIONS.add_turn(session, prompt, cached)
+        safe_play_tts(cached, True, ctx, speak)
         return cached
 
-    # 3. LLM
-    safe_play_tts("Deixa ver...", True, req_id, speak)
-    rag = retrieve_from_rag(prompt)
-    web = search_with_searxng(prompt)
+    # 4. LLM (o contexto é recolhido enquanto se diz "Deixa ver...")
+    rag, web, filler = gather_context(prompt, ctx, speak)
     try:
-        if req_id != CURRENT_REQUEST_ID: return
-        model = getattr(config, 'OLLAMA_MODEL_PRIMARY', 'llama3')
-        full_p = f"{getattr(config,'SYSTEM_PROMPT','')}\nContext:{rag}\n{web}\nUser:{prompt}"
-        resp = ollama_client.chat(model=model, messages=[{'role':'user','content':full_p}])
-        ans = resp['message']['content']
-        if req_id != CURRENT_REQUEST_ID: return
-        save_cached_response(prompt, ans)
-        safe_play_tts(ans, False, req_id, speak)
+        if ctx.cancelled: return
+        # System prompt estável à frente (KV cache reaproveitada); o contexto variável fica junto à pergunta.
+        # Histórico, memórias e web repartem o que sobra da janela (num_ctx) por orçamento.
+        history, context, usage = CONVERSATIONS.build(session, LLM.system, prompt, rag, web, follow_up)
+        print(f"🧮 Prompt ~{usage['total']}/{usage['budget']} tok | sistema {usage['system']} | histórico {usage['history']}"
+              f" | memórias {usage['memories']} | web {usage['web']} | cortado {sum(usage['dropped'].values())}")
+        messages = LLM.messages(prompt, context=context, history=history)
+        # Com TTS_STREAMING a resposta é dita frase a frase enquanto o LLM ainda gera
+        tts = TtsStream() if speak and TtsStream is not None and getattr(config, 'TTS_STREAMING', True) else None
+        ans = ollama_chat_stream(messages, ctx, tts, before_speech=filler.result)
+        if ans is None: return
+        CONVERSATIONS.add_turn(session, prompt, ans)
+        if not follow_up: RESPONSE_CACHE.put(prompt, ans)
+        if tts is None: filler.result(); safe_play_tts(ans, False, ctx, speak)
         return ans
-    except Exception as e: return f"Erro: {e}"
+    except Exception as e:
+        if ctx.cancelled: return
+        return f"Erro: {e}"
 
-def process_command_thread(audio, req_id):
-    txt = transcribe_audio(audio)
+def gather_context(prompt, ctx, speak):
+    """
+    RAG e pesquisa web em paralelo, com a frase de espera a tocar ao mesmo tempo.
+    Prazo global CONTEXT_DEADLINE: o LLM avança com o que chegou; o que se atrasou
+    é abortado (contexto próprio, cancelado também se o pedido o for).
+    Devolve (rag, web, future da frase de espera).
+    """
+    t0 = time.monotonic()
+    sub = RequestContext(ctx.source, f"{ctx.id}-ctx")
+    ctx.on_cancel(sub.cancel)
+    timings = {}
+    def timed(name, fn):
+        def run():
+            t = time.monotonic()
+            try: return fn()
+            finally: timings[name] = int((time.monotonic() - t) * 1000)
+        return run
+    filler = CONTEXT_POOL.submit(safe_play_tts, "Deixa ver...", True, ctx, speak)
+    jobs = {"rag": CONTEXT_POOL.submit(timed("rag", lambda: retrieve_from_rag(prompt, ctx=sub))),
+            "web": CONTEXT_POOL.submit(timed("web", lambda: search_with_searxng(prompt, ctx=sub)))}
+    deadline = t0 + getattr(config, 'CONTEXT_DEADLINE', 4.0)
+    found = {}
+    for name, f in jobs.items():
+        try: found[name] = f.result(timeout=max(0.0, deadline - time.monotonic())) or ""
+        except FutureTimeout: found[name] = ""
+        except Exception as e: print(f"⚠️ Contexto '{name}' falhou: {e}"); found[name] = ""
+    ctx.discard(sub.cancel)
+    if not all(f.done() for f in jobs.values()): sub.cancel("prazo do contexto")
+    print(f"📚 Contexto em {(time.monotonic() - t0) * 1000:.0f}ms | " +
+          " | ".join(f"{n}: {timings[n]}ms ({len(found[n])} car.)" if n in timings else f"{n}: fora do prazo" for n in jobs))
+    return found["rag"], found["web"], filler
+
+def ollama_chat_stream(messages, ctx, tts=None, before_speech=None):
+    """
+    Chat em streaming: se o pedido for substituído o gateway fecha a ligação, mesmo
+    antes do primeiro token (avaliação do prompt), e o Ollama deixa de gerar. None se cancelado.
+    Com 'tts' (TtsStream), cada frase completa vai logo para o piper;
+    'before_speech' corre antes da primeira (ex: esperar que a frase de espera acabe).
+    """
+    global IS_SPEAKING
+    seg = SentenceSegmenter() if tts is not None else None
+    t0, first_audio = time.monotonic(), None
+
+    def speak(sentence):
+        global IS_SPEAKING
+        nonlocal first_audio
+        if first_audio is None:
+            if before_speech is not None: before_speech()
+            stop_audio_output()  # Antes de o nosso aplay arrancar
+            IS_SPEAKING = True
+            first_audio = time.monotonic() - t0
+            print(f"🔊 Primeira frase aos {first_audio * 1000:.0f}ms")
+        tts.say(sentence)
+
+    stream = LLM.chat(messages, stream=True, ctx=ctx)
+    parts = []
+    try:
+        with ctx.cancel_scope(tts.abort) if tts is not None else nullcontext():
+            for chunk in stream:
+                if ctx.cancelled:
+                    print(f"🛑 LLM interrompido ao fim de {len(parts)} tokens.")
+                    return None
+                parts.append(chunk['message']['content'])
+                if seg is not None:
+                    for sentence in seg.feed(parts[-1]): speak(sentence)
+            if seg is not None:
+                for sentence in seg.flush(): speak(sentence)
+    except Exception:
+        if not ctx.cancelled: raise
+        print(f"🛑 LLM interrompido ao fim de {len(parts)} tokens.")   # Ligação fechada pelo cancelamento
+        return None
+    finally:
+        stream.close()
+        if tts is not None:
+            if ctx.cancelled: tts.abort()
+            else: tts.close()
+            IS_SPEAKING = False
+    return "".join(parts)
+
+def process_command(audio, ctx, stream=None):
+    txt = transcribe_audio(audio, stream)
+    if ctx.cancelled: return
     if txt:
         print(f"🗣️  Ouvi: {txt}")
-        route_and_respond(txt, req_id, speak=True)
+        return route_and_respond(txt, ctx, speak=True)
     else: print("🤷 Nada ouvido.")
 
 # --- API ---
+def api_request(prompt, source="ui", session=None):
+    """ Pedido da API pelo escalonador (fila da origem). Pedidos da API não falam nem cortam o áudio da voz. """
+    if source not in SCHEDULER.sources or source == "voz": source = "ui"
+    ctx = SCHEDULER.new_context(source, session)
+    try: job = SCHEDULER.submit(ctx, lambda c: route_and_respond(prompt, c, False))
+    except SchedulerFull: return jsonify({"status": "busy", "request_id": ctx.id, "response": "Estou ocupado, tenta daqui a pouco."}), 429
+    resp = job.wait(getattr(config, 'SCHED_API_TIMEOUT', 120))
+    if not job.done.is_set(): ctx.cancel("timeout da API"); status = "timeout"
+    else: status = "cancelled" if ctx.cancelled else "ok"
+    return jsonify({"status": status, "request_id": ctx.id, "response": resp})
+
 @app.route("/comando", methods=['POST'])
 def api_cmd():
-    return jsonify({"status":"ok", "response": route_and_respond(request.json.get('prompt',''), "API_REQ", False)})
+    # A origem decide a fila e a prioridade
+    data = request.json or {}
+    return api_request(data.get('prompt', ''), data.get('source', 'ui'), data.get('session'))
 
 @app.route("/get_devices")
 def api_devs():
@@ -270,8 +450,28 @@ def api_status():
 
 @app.route("/device_action", methods=['POST'])
 def api_action():
-    d = request.json
-    return jsonify({"status":"ok", "response": route_and_respond(f"{d.get('action')} o {d.get('device')}", "API_REQ", False)})
+    # Botões da UI: passam pela mesma fila que o chat da UI
+    d = request.json or {}
+    return api_request(f"{d.get('action')} o {d.get('device')}", "ui")
+
+@app.route("/wake_stats")
+def api_wake_stats():
+    stats = WAKE_PROCESS.summary() if WAKE_PROCESS is not None else WAKE_TELEMETRY.summary()
+    return jsonify({"status": "ok", "wake": stats})
+
+@app.route("/skill_health")
+def api_skill_health():
+    loader = SKILL_LOADER.stats(SKILLS_LIST) if SKILL_LOADER is not None else {}
+    return jsonify({"status": "ok", "skills": BREAKERS.summary(), "loader": loader})
+
+@app.route("/llm_stats")
+def api_llm_stats():
+    return jsonify({"status": "ok", **(LLM.stats() if LLM is not None else {}), "conversations": CONVERSATIONS.stats(),
+                    "cache": RESPONSE_CACHE.stats()})
+
+@app.route("/scheduler_stats")
+def api_scheduler_stats():
+    return jsonify({"status": "ok", **SCHEDULER.summary()})
 
 @app.route("/help")
 def get_help():
@@ -282,134 +482,212 @@ def get_help():
     return jsonify({"status": "ok", "commands": cmds})
 
 # --- MAIN LOOP ---
-def main():
-    global CURRENT_REQUEST_ID, IS_SPEAKING
+def handle_wake(source):
+    """ Depois da wake word: pre-roll, "Sim?", gravação do comando e processamento em background. """
+    ctx = SCHEDULER.new_context("voz")  # Cancela já o pedido de voz anterior
+    
+    # O leitor do comando começa 'preroll' segundos antes da deteção
+    cmd_reader = source.reader(preroll_seconds=getattr(config, 'COMMAND_PREROLL_SECONDS', 0.5))
+    if speech_in_progress(source):
+        print("🎤 Comando de seguida (sem 'Sim?')")
+    else:
+        print("🎤 Fala...")
+        safe_play_tts("Sim?", speak=True)
+        cmd_reader.clear()  # Descarta o eco do "Sim?"
+    
+    # STT em streaming: o Whisper trabalha nas pausas enquanto ainda se grava
+    stream = None
+    if getattr(config, 'STT_STREAMING', True) and stt_backend is not None:
+        stream = StreamingTranscriber(stt_raw, partial_interval=getattr(config, 'STT_PARTIAL_INTERVAL', 1.0),
+                                      on_partial=lambda t: print(f"💬 {t}"))
+    audio_cmd = record_audio(reader=cmd_reader, stream=stream) 
     
-    # Import local para não mexer no topo do ficheiro
-    import queue 
+    try: SCHEDULER.submit(ctx, lambda c: process_command(audio_cmd, c, stream))
+    except SchedulerFull:
+        print("⚠️ Fila de voz cheia: comando descartado.")
+        SCHEDULER.close(ctx)
 
+def main():
+    global WAKE_PROCESS
+    
     if not config.WAKEWORD_MODELS: print("❌ WAKEWORD_MODELS vazio!"); return
     
-    engine = PhantasmaEngine(config.WAKEWORD_MODELS)
-    if not engine.ready: return
+    # Modelos de wake word + modelos de paragem ("pára") no mesmo motor
+    stop_models = list(getattr(config, 'WAKEWORD_STOP_MODELS', []))
+    models = list(config.WAKEWORD_MODELS) + stop_models
+    n_wake = len(config.WAKEWORD_MODELS)
+    engine_mode = getattr(config, 'WAKEWORD_ENGINE', 'openwakeword')
+    intra = getattr(config, 'WAKEWORD_ORT_INTRA_THREADS', 1)
+    inter = getattr(config, 'WAKEWORD_ORT_INTER_THREADS', 1)
 
     # Config Audio
-    device_in = getattr(config, 'ALSA_DEVICE_IN', 0)
-    force_volume_down(device_in) 
-    DETECTED_RATE = find_working_samplerate(device_in)
-    
-    # Lógica de Downsample
-    if DETECTED_RATE > 32000: DOWNSAMPLE_FACTOR = 3
-    elif DETECTED_RATE > 24000: DOWNSAMPLE_FACTOR = 2
-    else: DOWNSAMPLE_FACTOR = 1
-        
-    CHUNK_SIZE = 1280
-    READ_SIZE = CHUNK_SIZE * DOWNSAMPLE_FACTOR
+    with BOOT.phase("áudio"):
+        device_in = getattr(config, 'ALSA_DEVICE_IN', 0)
+        force_volume_down(device_in) 
+        DETECTED_RATE = find_working_samplerate(device_in)
+    started = time.perf_counter()
     
     debug = getattr(config, 'DEBUG_MODE', False)
     thresh = getattr(config, 'WAKEWORD_CONFIDENCE', 0.6)
     persistence = getattr(config, 'WAKEWORD_PERSISTENCE', 3)
+    stop_thresh = getattr(config, 'WAKEWORD_STOP_CONFIDENCE', thresh)
+    ring_seconds = getattr(config, 'AUDIO_RING_SECONDS', 4)
+    policy = getattr(config, 'AUDIO_BACKLOG_POLICY', 'drop_oldest')
+    max_backlog_s = getattr(config, 'AUDIO_MAX_BACKLOG_SECONDS', 0.5)
+
+    # Gate de energia: em silêncio não se corre o openWakeWord
+    gate_kw = None
+    if getattr(config, 'WAKE_GATE_ENABLED', True):
+        gate_kw = {"chunk_size": 1280, "min_rms": getattr(config, 'WAKE_GATE_MIN_RMS', 60),
+                   "hangover_chunks": int(getattr(config, 'WAKE_GATE_HANGOVER_SECONDS', 1.0) * 12.5),
+                   "decimate": getattr(config, 'WAKE_GATE_DECIMATE', 0)}
+
+    # --- Modo Processo Dedicado (captura + motor fora do GIL principal) ---
+    if getattr(config, 'WAKEWORD_PROCESS', False):
+        WAKE_PROCESS = WakeProcess({
+            "models": models, "names": [os.path.splitext(os.path.basename(m))[0] for m in models],
+            "n_wake": n_wake, "engine": engine_mode, "intra_threads": intra, "inter_threads": inter,
+            "device": device_in, "rate": DETECTED_RATE, "capacity": int(DETECTED_RATE * ring_seconds),
+            "policy": policy, "max_backlog": int(DETECTED_RATE * max_backlog_s),
+            "thresh": thresh, "persistence": persistence, "stop_thresh": stop_thresh,
+            "gate": gate_kw, "telemetry_interval": getattr(config, 'WAKE_TELEMETRY_INTERVAL', 300), "debug": debug,
+        })
+        WAKE_PROCESS.on_ready = lambda: BOOT.mark("wake word", started)
+        WAKE_PROCESS.on_failed = lambda reason: BOOT.fail("wake word", started, reason)
+        WAKE_PROCESS.start()
+        print(f"👻 A ouvir no device {device_in} @ {DETECTED_RATE}Hz (processo dedicado)")
+        try:
+            while True:
+                try:
+                    WAKE_PROCESS.set_state(IS_SPEAKING)
+                    event = WAKE_PROCESS.poll(0.05)
+                    if event is None: continue
+                    kind, score = event
+                    if kind == "stop":
+                        print(f"✋ Paragem detetada (Score: {score:.2f})"); stop_audio_output(); continue
+
+                    print(f"\n⚡ WAKEWORD DETETADA! (Score: {score:.2f})")
+                    stop_audio_output()
+                    quiet = is_quiet_time()
+                    if not quiet: handle_wake(WAKE_PROCESS)
+                    WAKE_PROCESS.reset()
+                    WAKE_PROCESS.set_state(IS_SPEAKING, time.time() + (0 if quiet else 2.0))
+                except Exception as e:
+                    print(f"❌ Erro Main: {e}")
+                    time.sleep(1)
+        finally:
+            WAKE_PROCESS.stop()
+
+    # --- Modo Normal (mesmo processo) ---
+    with BOOT.phase("wake word"):
+        engine = create_engine(models, mode=engine_mode, intra_threads=intra, inter_threads=inter)
+        warmup(engine)
+    if not engine.ready: return
+    gate = EnergyGate(**gate_kw) if gate_kw is not None else None
+    if gate is not None: WAKE_TELEMETRY.attach_gate(gate)
+    detector = WakeDetector(engine, DETECTED_RATE, n_wake, thresh=thresh, persistence=persistence,
+                            stop_thresh=stop_thresh, gate=gate, telemetry=WAKE_TELEMETRY, debug=debug)
+    rs = detector.resampler
 
-    print(f"👻 A ouvir no device {device_in} @ {DETECTED_RATE}Hz -> Fator {DOWNSAMPLE_FACTOR}x")
+    print(f"👻 A ouvir no device {device_in} @ {DETECTED_RATE}Hz -> {rs.rate_out}Hz ({rs.up}/{rs.down})")
 
-    streak = 0
     cooldown = 0
-    log_counter = 0
     
-    # Fila para desacoplar a leitura
-    audio_queue = queue.Queue()
-
-    def audio_callback(indata, frames, time, status):
-        """Callback do sistema de som (Thread separada)"""
-        if status:
-            print(f"⚠️ Audio Status: {status}", file=sys.stderr)
-        audio_queue.put(indata.copy())
+    # Stream único e persistente: wake word e gravação do comando leem do mesmo ring
+    capture = AudioCapture(device_in, DETECTED_RATE, detector.chunk_in, ring_seconds)
+    ring = capture.reader(policy=policy, max_backlog_seconds=max_backlog_s)
+    WAKE_TELEMETRY.attach_ring(ring, DETECTED_RATE)
     
     while True:
         try:
-            # blocksize=READ_SIZE garante pacotes do tamanho certo
-            with sd.InputStream(device=device_in, channels=1, samplerate=DETECTED_RATE, 
-                                dtype='int16', blocksize=READ_SIZE, callback=audio_callback):
-                
+            if not capture.active:
+                capture.start(); ring.clear()
                 print(f"👂 Stream Ativo")
-                
-                while True:
-                    # Lê da fila (bloqueia na RAM, não no driver)
-                    chunk = audio_queue.get()
-                    
-                    audio_raw = np.frombuffer(chunk, dtype=np.int16)
-
-                    # Processamento de Audio
-                    if DOWNSAMPLE_FACTOR > 1: audio_resampled = audio_raw[::DOWNSAMPLE_FACTOR]
-                    else: audio_resampled = audio_raw
-
-                    audio_float = audio_resampled.astype(np.float32)
-                    audio_float -= np.mean(audio_float)
-                    audio_np = np.clip(audio_float, -32767, 32767).astype(np.int16)
-
-                    if IS_SPEAKING or time.time() < cooldown: streak=0; continue
-
-                    # Previsão
-                    score = engine.predict(audio_np)
-                    amplitude = np.max(np.abs(audio_np))
-
-                    # --- SILENT DEBUG LOGIC ---
-                    # 1. Calculamos sempre a string (mantém CPU/Timing ativo como no debug)
-                    stat = "🔴 CLIP" if amplitude > 32500 else "🟢 SOM"
-                    bar = "█" * int(score * 20)
-                    debug_str = f"[{stat}] Vol:{amplitude:<5} | Score:{score:.4f} {bar}"
-                    
-                    log_counter += 1
-                    
-                    # 2. Mostramos SÓ se o score for interessante (> 0.2) ou se estivermos em debug total
-                    # Isto permite-te ver se ele te está a ouvir "baixo" (0.3, 0.4) sem encher o log de lixo
-                    if debug or (score > 0.2):
-                         # Limita o spam visual mesmo quando deteta algo
-                         if log_counter % 2 == 0 or score > thresh:
-                            print(debug_str)
-                    
-                    # 3. Pequeno yield para garantir que a thread de áudio respira
-                    if not debug:
-                        time.sleep(0.002) 
-                    # --------------------------
-
-                    if score > thresh: streak += 1
-                    else: streak = 0
-
-                    if streak >= persistence:
-                        print(f"\n⚡ WAKEWORD DETETADA! (Score: {score:.2f})")
-                        stop_audio_output()
-                        if is_quiet_time(): streak=0; engine.reset(); continue
-                        break
-            
-            # --- Fora do Stream (Ação) ---
-            with audio_queue.mutex: audio_queue.queue.clear()
-            
-            req_id = str(uuid.uuid4())[:8]
-            CURRENT_REQUEST_ID = req_id
-            engine.reset(); streak=0
-            
-            print("🎤 Fala...")
-            safe_play_tts("Sim?", speak=True)
-            
-            audio_cmd = record_audio() 
-            
-            t = threading.Thread(target=process_command_thread, args=(audio_cmd, req_id))
-            t.daemon=True; t.start()
+
+            # Lê do ring (view sem cópia; bloqueia na RAM, não no driver)
+            chunk = ring.read(detector.chunk_in, timeout=2.0)
+            if chunk is None: raise RuntimeError(f"Stream de áudio parado ({ring.stats()})")
+
+            event = detector.process(chunk, busy=IS_SPEAKING or time.time() < cooldown, speaking=IS_SPEAKING)
+            if event is None: continue
+            kind, score = event
+            if kind == "stop":
+                print(f"✋ Paragem detetada (Score: {score:.2f})"); stop_audio_output(); continue
+
+            print(f"\n⚡ WAKEWORD DETETADA! (Score: {score:.2f})")
+            stop_audio_output()
+            if is_quiet_time(): detector.reset(); continue
+        
+            # --- Ação (o stream continua aberto) ---
+            handle_wake(capture)
+            ring.clear(); detector.reset()
             cooldown = time.time() + 2.0
 
         except Exception as e:
             print(f"❌ Erro Main: {e}")
+            capture.stop()
             time.sleep(1)
 
-if __name__ == "__main__":
-    setup_database(); load_skills()
+# --- ARRANQUE ---
+def init_runtime():
+    """
+    Estado pesado do processo principal (matriz da cache, workers do escalonador, pools).
+    Não fica ao nível do módulo: com WAKEWORD_PROCESS o filho (spawn) volta a importar
+    este ficheiro como __mp_main__ e não deve alocar nada disto.
+    """
+    global RESPONSE_CACHE, CONVERSATIONS, SKILL_POOL, CONTEXT_POOL, SCHEDULER
+    RESPONSE_CACHE = ResponseCache(getattr(config, 'CACHE_LRU_SIZE', 256), getattr(config, 'CACHE_MAX_VECTORS', 2048),
+                                   threshold=getattr(config, 'CACHE_SIM_THRESHOLD', 0.80), ttls=getattr(config, 'CACHE_TTLS', None),
+                                   persist_get=get_cached_response, persist_put=save_cached_response)
+    CONVERSATIONS = ConversationManager(getattr(config, 'OLLAMA_NUM_CTX', 8192), getattr(config, 'OLLAMA_NUM_PREDICT', 512),
+                                        getattr(config, 'CONVERSATION_MAX_TURNS', 6), getattr(config, 'CONVERSATION_TIMEOUT', 300),
+                                        shares=getattr(config, 'CONVERSATION_BUDGET', None))
+    SKILL_POOL = ThreadPoolExecutor(max_workers=getattr(config, 'SKILL_WORKERS', 8), thread_name_prefix="skill")
+    CONTEXT_POOL = ThreadPoolExecutor(max_workers=6, thread_name_prefix="contexto")
+    SCHEDULER = RequestScheduler(getattr(config, 'SCHED_WORKERS', 3), getattr(config, 'SCHED_RESERVED', 1),
+                                 getattr(config, 'SCHED_SOURCES', None))
+
+def setup_database_and_cache():
+    setup_database()
+    RESPONSE_CACHE.load(load_cached_responses(getattr(config, 'CACHE_MAX_VECTORS', 2048)))
+    print(f"⚡ Cache de respostas: {len(RESPONSE_CACHE.rows)} perguntas em memória")
+
+def load_stt():
+    """ Carrega o backend STT e aquece-o com 1s de silêncio. """
+    global stt_backend
+    backend = create_backend(getattr(config, 'STT_BACKEND', 'whisper'), getattr(config, 'WHISPER_MODEL', 'base'),
+                             getattr(config, 'WHISPER_THREADS', None), getattr(config, 'STT_COMPUTE_TYPE', 'int8'))
+    backend.transcribe(np.zeros(16000, dtype=np.float32), language='pt')
+    stt_backend = backend
+
+def warm_ollama():
+    """ Carrega o modelo (e o prefixo do system prompt) e mantém-no quente. """
+    global LLM
+    LLM = gateway()
+    interval = getattr(config, 'OLLAMA_WARM_INTERVAL', 240)
+    if interval: LLM.keep_warm(interval)
+    LLM.warmup()
+
+def start_skill_daemons():
+    BOOT.wait("skills")
+    if SKILL_LOADER is None: return
+    for s in SKILL_LOADER.boot_daemons(SKILLS_LIST):
+        with BOOT.phase(f"daemon {s['name']}"): SKILL_LOADER.start_daemon(s)
+
+def start_flask():
+    BOOT.wait("skills")  # As skills registam rotas antes do primeiro pedido
     threading.Thread(target=lambda: app.run(host='0.0.0.0', port=5000), daemon=True).start()
-    try: whisper_model = whisper.load_model(getattr(config, 'WHISPER_MODEL', 'base')); ollama_client = ollama.Client()
-    except: pass
-    for s in SKILLS_LIST: 
-        if hasattr(s['module'], 'init_skill_daemon'): 
-            try: s['module'].init_skill_daemon()
-            except: pass
+
+if __name__ == "__main__":
+    init_runtime()
+    # Tudo em paralelo; o loop da wake word arranca assim que o motor está pronto
+    BOOT.run("base de dados", setup_database_and_cache)
+    BOOT.run("skills", load_skills)
+    BOOT.run("stt", load_stt)
+    BOOT.run("ollama", warm_ollama)
+    BOOT.run("flask", start_flask)
+    BOOT.run("daemons", start_skill_daemons)
+    BOOT.expect("áudio", "wake word")
+    BOOT.report_when_done()
     try: main()
     except KeyboardInterrupt: stop_audio_output()
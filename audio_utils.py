@@ -1,4 +1,5 @@
 import subprocess
+import sys
 import glob
 import random
 import os
@@ -10,6 +11,7 @@ import collections
 import config
 import hashlib 
 import traceback
+from dsp_utils import AudioRingBuffer, PolyphaseResampler, Endpointer, TARGET_RATE
 
 # Diretório para guardar os ficheiros de áudio gerados
 TTS_CACHE_DIR = "/opt/phantasma/cache/tts"
@@ -59,6 +61,45 @@ def play_tts(text, use_cache=True):
             p1.stdin.write(text_cleaned.encode('utf-8')); p1.stdin.close(); p3.wait()
         except: pass
 
+class TtsStream:
+    """
+    Um só pipeline piper -> sox -> aplay para uma resposta inteira, alimentado frase a frase.
+    O piper sintetiza cada linha do stdin assim que chega e o aplay toca enquanto o LLM
+    ainda está a gerar as seguintes. close() espera que acabe de falar; abort() corta já.
+    """
+    def __init__(self):
+        self.procs = []
+        self.sentences = 0
+
+    def _start(self):
+        p1 = subprocess.Popen(['piper', '--model', config.TTS_MODEL_PATH, '--output-raw'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        p2 = subprocess.Popen(['sox', '--buffer', '2048', '-t', 'raw', '-r', '22050', '-e', 'signed-integer', '-b', '16', '-c', '1', '-',
+                               '-t', 'raw', '-', 'flanger', '1', '1', '5', '50', '1', 'sin', 'tempo', '0.9'], stdin=p1.stdout, stdout=subprocess.PIPE)
+        p3 = subprocess.Popen(['aplay', '-D', config.ALSA_DEVICE_OUT, '-q', '-t', 'raw', '-f', 'S16_LE', '-r', '22050', '-c', '1'], stdin=p2.stdout)
+        p1.stdout.close(); p2.stdout.close()  # Só os processos seguintes ficam com as pontas dos pipes
+        self.procs = [p1, p2, p3]
+
+    def say(self, sentence):
+        sentence = sentence.replace('\n', ' ').strip()
+        if not sentence: return
+        print(f"IA: {sentence}")
+        try:
+            if not self.procs: self._start()
+            self.procs[0].stdin.write((sentence + "\n").encode('utf-8')); self.procs[0].stdin.flush()
+            self.sentences += 1
+        except (OSError, ValueError): pass  # Pipeline cortado (abort/stop_audio_output)
+
+    def close(self):
+        if not self.procs: return
+        try: self.procs[0].stdin.close()
+        except (OSError, ValueError): pass
+        for p in self.procs: p.wait()
+
+    def abort(self):
+        for p in self.procs:
+            try: p.kill()
+            except OSError: pass
+
 def play_random_music_snippet():
     try:
         mp3s = glob.glob(os.path.join('/home/media/music', '**/*.mp3'), recursive=True)
@@ -73,57 +114,130 @@ def play_random_song_full():
         return True
     except: return False
 
-def record_audio():
+# --- CAPTURA PARTILHADA ---
+
+class AudioCapture:
+    """
+    Stream de captura único e persistente. O callback escreve no ring buffer e
+    cada consumidor (wake word, gravação do comando) lê com o seu próprio cursor.
+    Evita fechar/abrir o device a cada interação e não perde o áudio entre
+    a wake word e o comando (pre-roll).
+    """
+    def __init__(self, device, rate, blocksize, ring_seconds=4, ring=None):
+        self.device = device
+        self.rate = rate
+        self.blocksize = blocksize
+        self.ring = ring if ring is not None else AudioRingBuffer(int(rate * ring_seconds), rate=rate)
+        self.stream = None
+
+    def _callback(self, indata, frames, time_info, status):
+        """Callback do sistema de som (Thread separada)"""
+        if status:
+            print(f"⚠️ Audio Status: {status}", file=sys.stderr)
+        self.ring.write(indata)
+
+    @property
+    def active(self):
+        return self.stream is not None and self.stream.active
+
+    def start(self):
+        if self.active: return
+        self.stop()
+        # blocksize garante pacotes do tamanho certo
+        self.stream = sd.InputStream(device=self.device, channels=1, samplerate=self.rate,
+                                     dtype='int16', blocksize=self.blocksize, callback=self._callback)
+        self.stream.start()
+
+    def stop(self):
+        if self.stream is None: return
+        try: self.stream.close()
+        except: pass
+        self.stream = None
+
+    def reader(self, preroll_seconds=0.0, policy="catch_up", max_backlog_seconds=None):
+        max_backlog = int(self.rate * max_backlog_seconds) if max_backlog_seconds else None
+        return self.ring.reader(int(self.rate * preroll_seconds), policy, max_backlog)
+
+def _vad_frames(reader, frame_duration_ms=30):
+    """ Gera frames int16 de 'frame_duration_ms' a 16 kHz a partir de um RingReader. """
+    rs = PolyphaseResampler(reader.rate, chunk_out=TARGET_RATE * frame_duration_ms // 1000, remove_dc=False)
+    while True:
+        chunk = reader.read(rs.chunk_in, timeout=2.0)
+        if chunk is None: return
+        yield rs.process(chunk)
+
+def speech_in_progress(capture, window_seconds=0.3):
+    """
+    Escuta 'window_seconds' a seguir à wake word e diz se o utilizador já está a falar
+    (ex: "fantasma liga a luz" de seguida). Nesse caso não se interrompe com o "Sim?".
+    """
+    vad = webrtcvad.Vad(2)
+    n_frames = max(1, int(window_seconds * 1000) // 30)
+    speech = 0
+    frames = _vad_frames(capture.reader())
+    for _ in range(n_frames):
+        frame = next(frames, None)
+        if frame is None: break
+        if vad.is_speech(frame.tobytes(), TARGET_RATE): speech += 1
+    return speech * 2 >= n_frames
+
+ENDPOINTER = None
+
+def get_endpointer(rate=TARGET_RATE):
+    """ Endpointer partilhado (o buffer pré-alocado é reutilizado entre comandos). """
+    global ENDPOINTER
+    if ENDPOINTER is None or ENDPOINTER.rate != rate:
+        ENDPOINTER = Endpointer(rate,
+                                short_silence=getattr(config, 'ENDPOINT_SHORT_SILENCE', 0.6),
+                                medium_silence=getattr(config, 'ENDPOINT_MEDIUM_SILENCE', 1.0),
+                                long_silence=getattr(config, 'ENDPOINT_LONG_SILENCE', 1.5),
+                                max_seconds=getattr(config, 'ENDPOINT_MAX_SECONDS', 10.0),
+                                dictation_max_seconds=getattr(config, 'ENDPOINT_DICTATION_MAX_SECONDS', 20.0))
+        ENDPOINTER.dictation_triggers = tuple(getattr(config, 'ENDPOINT_DICTATION_TRIGGERS', ["memoriza", "anota", "lembra-te disto", "grava isto", "guarda isto"]))
+    return ENDPOINTER
+
+def record_audio(reader=None, mode="command", stream=None):
     """ 
-    A Lógica VAD Original (Afinada).
-    Usa Vad(2) e espera 1.5s de silêncio.
-    Não aceita device_index (Usa Default do Sistema).
+    VAD(2) + Endpointer: o silêncio final exigido adapta-se ao tipo de frase
+    (curto para ordens, longo para ditado). Ver dsp_utils.Endpointer.
+    Com 'reader' lê do stream partilhado (AudioCapture, já reamostrado para 16 kHz);
+    sem ele abre o device DEFAULT do sistema.
+    'stream' (stt_utils.StreamingTranscriber) transcreve em paralelo enquanto se grava; é o
+    texto parcial dele que passa "memoriza ..." a ditado. Sem 'stream' fica o 'mode' pedido.
     """
     print("A ouvir...")
     
     vad = webrtcvad.Vad(2) 
     frame_duration_ms = 30 
-    samples_per_frame = int(config.MIC_SAMPLERATE * frame_duration_ms / 1000)
-    
-    silence_threshold_seconds = 1.5
-    max_duration_seconds = 10.0
-    
-    frames = []
-    silence_counter = 0
-    speech_detected = False
-    
-    chunks_per_second = 1000 // frame_duration_ms
-    silence_limit_chunks = int(silence_threshold_seconds * chunks_per_second)
-    max_chunks = int(max_duration_seconds * chunks_per_second)
+    rate = TARGET_RATE if reader is not None else config.MIC_SAMPLERATE
+    samples_per_frame = int(rate * frame_duration_ms / 1000)
+    ep = get_endpointer(rate)
+    ep.reset(mode)
+    if stream is not None: stream.start(ep)
 
-    try:
+    def default_stream_frames():
         # Usa o DEFAULT do sistema (sem device=...)
-        with sd.InputStream(samplerate=config.MIC_SAMPLERATE, channels=1, dtype='int16') as stream:
-            for _ in range(max_chunks):
+        with sd.InputStream(samplerate=rate, channels=1, dtype='int16') as stream:
+            while True:
                 audio_chunk, overflowed = stream.read(samples_per_frame)
-                if overflowed: pass
-
-                audio_bytes = audio_chunk.tobytes()
-                is_speech = vad.is_speech(audio_bytes, config.MIC_SAMPLERATE)
-
-                if is_speech:
-                    silence_counter = 0
-                    speech_detected = True
-                else:
-                    silence_counter += 1
+                yield audio_chunk
 
-                frames.append(audio_chunk.flatten().astype(np.float32) / 32768.0)
-
-                if speech_detected and silence_counter > silence_limit_chunks:
-                    print("Fim de fala detetado.")
-                    break
+    try:
+        source = _vad_frames(reader, frame_duration_ms) if reader is not None else default_stream_frames()
+        for audio_chunk in source:
+            if ep.push(audio_chunk, vad.is_speech(audio_chunk.tobytes(), rate)): break
+        source.close()
+        if stream is not None: stream.stop()
         
-        print("Gravação terminada.")
-        if not speech_detected:
+        r = ep.report()
+        print(f"Fim de fala ({r['reason']}, {r['mode']}): janela {r['window_ms']}ms | fala {r['speech_ms']}ms"
+              f" | pausas {r['pauses']} | total {r['total_ms']}ms (-{r['trimmed_ms']}ms cortados)")
+        if not ep.started:
             return np.array([], dtype='float32')
 
-        return np.concatenate(frames)
+        return ep.audio()
 
     except Exception as e:
         print(f"ERRO Gravação VAD: {e}")
+        if stream is not None: stream.stop()
         return np.array([], dtype='float32')
@@ -0,0 +1,154 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from text_utils import fold
+from intent_utils import featurize
+
+# --- CACHE DE RESPOSTAS EM DOIS NÍVEIS (+ SQLite) ---
+# 1. LRU em memória pela pergunta normalizada ("Que horas são?" == "que horas sao").
+# 2. Semelhança: cada pergunta guardada é um vetor (n-gramas de caracteres, como o
+#    classificador de intenções) numa matriz contígua; uma pesquisa é um produto
+#    matriz-vetor. Só aceita acima do limiar E com as mesmas palavras de conteúdo e os
+#    mesmos números ("anedota sobre gatos" parece-se muito com "... sobre cães").
+# 3. A tabela 'cache' do SQLite (persistente, chave = pergunta normalizada; as linhas antigas,
+#    com a pergunta crua, continuam a ser encontradas até expirarem).
+# Cada pergunta tem uma categoria que decide a validade: as que dependem da hora ou
+# do dia expiram depressa; o conhecimento geral dura dias.
+
+CATEGORIES = [
+    # (categoria, regex sobre o texto sem acentos, validade em segundos)
+    ("agora", r"\b(horas?|minutos?|agora|neste momento)\b", 30),
+    ("hoje", r"\b(hoje|amanha|ontem|esta semana|este fim de semana|noticias?|tempo|temperatura|chuva|"
+             r"jogo|resultado|preco|cotacao|transito)\b", 3600),
+]
+DEFAULT_CATEGORY, DEFAULT_TTL = "geral", 7 * 86400
+
+def cache_key(prompt):
+    """ Minúsculas, sem acentos, sem pontuação e espaços simples. """
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", fold(prompt))).strip()
+
+# Palavras de cortesia que não mudam a pergunta ("podes dizer-me ...")
+FILLERS = {"podes", "pode", "consegues", "favor", "sabes", "dizer", "fantasma", "phantasma"}
+
+def _signature(key):
+    """ Números e palavras de conteúdo (4+ letras) que têm de coincidir nas duas perguntas. """
+    return frozenset(w for w in key.split() if w.isdigit() or (len(w) >= 4 and w not in FILLERS))
+
+class ResponseCache:
+    def __init__(self, lru_size=256, max_vectors=2048, dim=2048, threshold=0.80, ttls=None,
+                 persist_get=None, persist_put=None):
+        self.lru = OrderedDict()          # chave -> (resposta, expira)
+        self.lru_size = lru_size
+        self.dim = dim
+        self.threshold = threshold
+        self.categories = [(name, re.compile(rx), (ttls or {}).get(name, ttl)) for name, rx, ttl in CATEGORIES]
+        self.default_ttl = (ttls or {}).get(DEFAULT_CATEGORY, DEFAULT_TTL)
+        self.persist_get = persist_get    # f(chave, max_age_s) -> resposta | None
+        self.persist_put = persist_put    # f(chave, resposta)
+        # Tier semântico: linhas [0, n) ocupadas; com a matriz cheia reaproveita-se a que expira primeiro
+        self.M = np.zeros((max_vectors, dim), dtype=np.float32)
+        self.rows = []                    # linha -> (chave, resposta, expira)
+        self.row_of = {}                  # chave -> linha
+        self.hits = {"lru": 0, "semantic": 0, "db": 0}
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def category(self, key):
+        for name, rx, ttl in self.categories:
+            if rx.search(key): return name, ttl
+        return DEFAULT_CATEGORY, self.default_ttl
+
+    def _vector(self, key):
+        v = np.zeros(self.dim, dtype=np.float32)
+        idx, tf = featurize(key, self.dim)
+        np.add.at(v, idx, tf)
+        v /= np.linalg.norm(v) + 1e-9
+        return v
+
+    # --- Leitura ---
+    def get(self, prompt):
+        key = cache_key(prompt)
+        if not key: return None
+        cat, ttl = self.category(key)
+        now = time.time()
+        # Os contadores só mudam com o lock: get() corre nos workers do escalonador e stats() lê-os ao mesmo tempo
+        with self._lock:
+            if ttl <= 0:
+                self.misses += 1
+                return None
+            hit = self.lru.get(key)
+            if hit and hit[1] > now:
+                self.lru.move_to_end(key)
+                self.hits["lru"] += 1
+                print(f"⚡ Cache (memória, {cat}): '{key}'")
+                return hit[0]
+            found = self._similar(key, now)
+            if found: self.hits["semantic"] += 1
+        if found:
+            other, response, score = found
+            print(f"⚡ Cache (semelhante {score:.2f}, {cat}): '{key}' ≈ '{other}'")
+            return response
+        if self.persist_get is not None:
+            response = self.persist_get(key, ttl)
+            # Linhas gravadas antes da chave normalizada têm a pergunta tal como foi dita
+            if not response and str(prompt) != key: response = self.persist_get(str(prompt), ttl)
+            if response:
+                with self._lock: self.hits["db"] += 1
+                self._remember(key, response, now + ttl)
+                return response
+        with self._lock: self.misses += 1
+        return None
+
+    def _similar(self, key, now):
+        """ (chave, resposta, score) da pergunta guardada mais parecida, se passar o limiar. """
+        if not self.rows: return None
+        n = len(self.rows)
+        scores = self.M[:n] @ self._vector(key)
+        sig = _signature(key)
+        for i in np.argsort(scores)[::-1][:3]:
+            score = float(scores[i])
+            if score < self.threshold: break
+            other, response, expires = self.rows[i]
+            if expires > now and _signature(other) == sig: return other, response, score
+        return None
+
+    # --- Escrita ---
+    def put(self, prompt, response):
+        key = cache_key(prompt)
+        if not key or not response: return
+        cat, ttl = self.category(key)
+        if ttl <= 0: return
+        self._remember(key, response, time.time() + ttl)
+        if self.persist_put is not None: self.persist_put(key, response)
+
+    def load(self, entries):
+        """ Aquece os tiers com (pergunta, resposta, idade_s) vindos do SQLite. """
+        now = time.time()
+        for prompt, response, age in entries:
+            key = cache_key(prompt)
+            ttl = self.category(key)[1]
+            if key and response and age < ttl: self._remember(key, response, now + ttl - age)
+
+    def _remember(self, key, response, expires):
+        with self._lock:
+            self.lru[key] = (response, expires)
+            self.lru.move_to_end(key)
+            while len(self.lru) > self.lru_size: self.lru.popitem(last=False)
+            row = self.row_of.get(key)
+            if row is None:
+                if len(self.rows) < len(self.M): row = len(self.rows); self.rows.append(None)
+                else:
+                    # Matriz cheia: substitui a linha que expira primeiro
+                    row = min(range(len(self.rows)), key=lambda i: self.rows[i][2])
+                    self.row_of.pop(self.rows[row][0], None)
+                self.M[row] = self._vector(key)
+                self.row_of[key] = row
+            self.rows[row] = (key, response, expires)
+
+    def stats(self):
+        with self._lock: counts, misses, lru, vectors = dict(self.hits), self.misses, len(self.lru), len(self.rows)
+        total = sum(counts.values()) + misses
+        return {"hit_rate": round(sum(counts.values()) / total, 3) if total else 0.0, "hits": counts, "misses": misses,
+                "lru": lru, "vectors": vectors, "threshold": self.threshold}
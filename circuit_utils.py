@@ -0,0 +1,105 @@
+import time
+import threading
+from collections import deque
+
+# --- CIRCUIT BREAKERS DAS SKILLS ---
+# Cada skill tem uma janela das últimas chamadas (latência, ok). Muitos erros ou
+# chamadas acima do prazo abrem o disjuntor: a skill é saltada durante um período
+# de arrefecimento que duplica a cada reincidência. Passado o período deixa-se
+# passar UMA chamada de teste (meio-aberto) antes de fechar outra vez.
+
+CLOSED, OPEN, HALF_OPEN = "fechado", "aberto", "meio-aberto"
+
+class CircuitBreaker:
+    def __init__(self, name, window=20, min_calls=4, error_rate=0.5, consecutive=3,
+                 cooloff=60.0, max_cooloff=900.0):
+        self.name = name
+        self.window = deque(maxlen=window)   # (timestamp, latência_s, ok)
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.consecutive = consecutive
+        self.base_cooloff = cooloff
+        self.max_cooloff = max_cooloff
+        self.cooloff = cooloff
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self.short_circuited = 0
+        self.last_error = None
+        self._fails_in_row = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """ A skill pode correr agora? """
+        with self._lock:
+            if self.state == CLOSED: return True
+            if self.state == OPEN and time.time() - self.opened_at >= self.cooloff:
+                self.state = HALF_OPEN  # Uma chamada de teste
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record(self, latency, ok, error=None):
+        with self._lock:
+            self.window.append((time.time(), latency, ok))
+            if ok:
+                self._fails_in_row = 0
+                if self.state == HALF_OPEN:
+                    self.state = CLOSED
+                    self.cooloff = max(self.base_cooloff, self.cooloff / 2)
+                    self.window.clear(); self.window.append((time.time(), latency, ok))  # Recomeça a contagem
+                return
+            self._fails_in_row += 1
+            self.last_error = error
+            if self.state == HALF_OPEN:
+                self._trip(min(self.max_cooloff, self.cooloff * 2))
+                return
+            fails = sum(1 for _, _, k in self.window if not k)
+            if self._fails_in_row >= self.consecutive or (len(self.window) >= self.min_calls and fails / len(self.window) >= self.error_rate):
+                self._trip(self.cooloff if self.trips == 0 else min(self.max_cooloff, self.cooloff * 2))
+
+    def release(self):
+        """ Chamada sem veredicto (pedido cancelado a meio). Se era a de teste, a próxima volta a testar. """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+                self.opened_at = time.time() - self.cooloff
+
+    def _trip(self, cooloff):
+        self.state = OPEN
+        self.opened_at = time.time()
+        self.cooloff = cooloff
+        self.trips += 1
+        print(f"🔌 Disjuntor '{self.name}' ABERTO durante {cooloff:.0f}s ({self.last_error})")
+
+    def stats(self):
+        with self._lock:
+            lat = sorted(l for _, l, _ in self.window)
+            n = len(lat)
+            fails = sum(1 for _, _, k in self.window if not k)
+            res = {"state": self.state, "calls": n, "error_rate": round(fails / n, 3) if n else 0.0,
+                   "p50_ms": int(lat[n // 2] * 1000) if n else 0, "p95_ms": int(lat[min(n - 1, int(n * 0.95))] * 1000) if n else 0,
+                   "trips": self.trips, "short_circuited": self.short_circuited, "cooloff_s": self.cooloff,
+                   "last_error": self.last_error}
+            if self.state == OPEN: res["retry_in_s"] = max(0, int(self.opened_at + self.cooloff - time.time()))
+            return res
+
+class BreakerBoard:
+    """ Um disjuntor por skill (criado na primeira chamada). """
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            b = self.breakers.get(name)
+            if b is None: b = self.breakers[name] = CircuitBreaker(name, **self.kwargs)
+            return b
+
+    def reset(self, name):
+        """ Esquece o histórico (ex: a skill foi recarregada com código novo). """
+        with self._lock: self.breakers.pop(name, None)
+
+    def summary(self):
+        return {name: b.stats() for name, b in sorted(self.breakers.items())}
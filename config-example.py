@@ -10,6 +10,7 @@ QUIET_END = 8    # 08:00
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "memory.db")
 TTS_MODEL_PATH = os.path.join(BASE_DIR, "models/tts/pt_PT-dii-high.onnx")
+TTS_STREAMING = True   # Respostas do LLM ditas frase a frase enquanto ainda estão a ser geradas
 SKILLS_DIR = os.path.join(BASE_DIR, "skills")
 
 # --- Configs de Hardware (Áudio) ---
@@ -17,12 +18,52 @@ MIC_SAMPLERATE = 16000 # 16kHz
 ALSA_DEVICE_IN = 0
 ALSA_DEVICE_OUT = "plughw:0,0"
 
+# Ring buffer entre o callback de áudio e o loop da wake word
+AUDIO_RING_SECONDS = 4
+# "drop_oldest": se o loop se atrasar (Whisper/Ollama a puxar CPU), salta para o presente.
+# "catch_up": processa todo o áudio em atraso (só perde áudio se o ring der a volta).
+AUDIO_BACKLOG_POLICY = "drop_oldest"
+AUDIO_MAX_BACKLOG_SECONDS = 0.5
+# Áudio guardado antes da deteção para apanhar comandos ditos de seguida ("fantasma liga a luz")
+COMMAND_PREROLL_SECONDS = 0.5
+# Fim de fala adaptativo (segundos de silêncio exigidos no fim do comando)
+ENDPOINT_SHORT_SILENCE = 0.6     # Ordens curtas ("liga a luz da sala")
+ENDPOINT_MEDIUM_SILENCE = 1.0    # Frases com mais de ~2s de fala
+ENDPOINT_LONG_SILENCE = 1.5      # Ditado / muitas pausas (teto)
+ENDPOINT_MAX_SECONDS = 10.0
+ENDPOINT_DICTATION_MAX_SECONDS = 20.0
+# Ditado (janela longa): ligado pelos textos parciais do STT em streaming. Com STT_STREAMING = False
+# não há texto durante a gravação e "memoriza ..." usa a janela normal (não faz pausas longas).
+ENDPOINT_DICTATION_TRIGGERS = ["memoriza", "anota", "lembra-te disto", "grava isto", "guarda isto"]
+
 # --- WAKE WORD (openWakeWord) ---
 # Modelos possíveis: 'hey_jarvis', 'alexa', 'hey_mycroft', 'hey_rhasspy', 'timer', 'weather'
 # Podes colocar mais do que um: ['hey_jarvis', 'alexa']
 WAKEWORD_MODELS = ['/opt/phantasma/models/hey_fantasma.onnx']
 WAKEWORD_CONFIDENCE = 0.5
 WAKEWORD_PERSISTENCE = 1
+# Como a wake word aparece transcrita: o que sobrar dela no início do comando é cortado
+# ("...tasma, memoriza isto" -> "memoriza isto"; o pre-roll do comando apanha o fim dela)
+WAKEWORD_PHRASES = ["hey fantasma", "ei fantasma", "phantasma", "fantasma"]
+# Motor: "openwakeword" (Model do openWakeWord) ou "batched" (features calculadas uma vez,
+# todos os heads numa só sessão ONNX Runtime). O "batched" compensa com mais do que um modelo.
+WAKEWORD_ENGINE = "openwakeword"
+WAKEWORD_ORT_INTRA_THREADS = 1
+WAKEWORD_ORT_INTER_THREADS = 1
+# Modelos de paragem: avaliados mesmo enquanto o assistente fala, para o interromper
+WAKEWORD_STOP_MODELS = []  # ex: ['/opt/phantasma/models/para.onnx']
+WAKEWORD_STOP_CONFIDENCE = 0.6
+# Corre a captura e o motor num processo dedicado (áudio e scores em shared memory).
+# A latência da wake word deixa de depender do Whisper/Flask/daemons a competir pelo GIL.
+WAKEWORD_PROCESS = False
+# Linha de resumo da telemetria do loop (segundos). Detalhe completo em GET /wake_stats
+WAKE_TELEMETRY_INTERVAL = 300
+
+# Gate de energia antes do openWakeWord (poupa CPU durante a noite/silêncio)
+WAKE_GATE_ENABLED = True
+WAKE_GATE_MIN_RMS = 60             # RMS mínimo (int16) para abrir, mesmo com noise floor muito baixo
+WAKE_GATE_HANGOVER_SECONDS = 1.0   # Tempo abaixo do limiar até fechar
+WAKE_GATE_DECIMATE = 0             # Em silêncio, corre a inferência 1 em cada N chunks (0 = nunca)
 
 # Sensibilidade (0.0 a 1.0). 
 # 0.5 é o padrão. 0.6 ou 0.7 é recomendado para evitar falsos positivos da TV.
@@ -32,15 +73,74 @@ WAKEWORD_CONFIDENCE = 0.6
 OLLAMA_MODEL_PRIMARY = "qwen3:8b" # O teu modelo 8K
 OLLAMA_MODEL_FALLBACK = "qwen3:8b"
 OLLAMA_TIMEOUT = 600
+# Gateway do Ollama (llm_utils): um cliente partilhado pelo assistente e pelas skills
+OLLAMA_KEEP_ALIVE = "30m"        # Quanto tempo o modelo fica na RAM depois do último pedido (-1 = sempre)
+OLLAMA_WARM_INTERVAL = 240       # Segundos sem pedidos até novo aquecimento (0 = só no arranque)
+OLLAMA_NUM_CTX = 8192            # Janela de contexto
+OLLAMA_NUM_PREDICT = 512         # Máximo de tokens por resposta falada (as skills de fundo pedem mais)
+# Conversa: histórico curto por sessão (voz, UI, cada utilizador do Discord) e orçamento da janela
+CONVERSATION_MAX_TURNS = 6       # Pares pergunta/resposta guardados por sessão
+CONVERSATION_TIMEOUT = 300       # Segundos parados até a conversa recomeçar do zero
+CONVERSATION_BUDGET = {"history": 0.3, "memories": 0.4, "web": 0.3}   # Partes do que sobra do num_ctx
+# Cache de respostas do LLM (hit rate em /llm_stats)
+CACHE_LRU_SIZE = 256             # Perguntas normalizadas guardadas em memória
+CACHE_MAX_VECTORS = 2048         # Perguntas no índice de semelhança (linhas da matriz)
+CACHE_SIM_THRESHOLD = 0.80       # Semelhança mínima (cosseno) para reaproveitar a resposta de outra pergunta
+# Validade por categoria (segundos): "agora" (horas), "hoje" (tempo, notícias, resultados), "geral"
+CACHE_TTLS = {"agora": 30, "hoje": 3600, "geral": 7 * 86400}
 WHISPER_MODEL = "medium"
+# Motor de STT: "whisper" (openai-whisper, FP32) ou "faster-whisper" (CTranslate2, quantizado)
+# faster-whisper: pip install faster-whisper. Comparar com tools/bench_stt.py
+STT_BACKEND = "whisper"
+STT_COMPUTE_TYPE = "int8"    # Só faster-whisper: int8, int8_float32, float32
+# Transcreve durante a gravação (segmentos em cada pausa + parciais).
+# O texto final fica pronto poucas centenas de ms depois do fim de fala.
+# Também é o que liga o modo ditado do fim de fala (ENDPOINT_DICTATION_TRIGGERS).
+STT_STREAMING = True
+STT_PARTIAL_INTERVAL = 1.0   # Segundos de fala nova entre hipóteses parciais
 RECORD_SECONDS = 7
 
+# --- Classificador de Intenções ---
+# Escolhe a skill antes da cadeia de triggers (que fica como fallback).
+# Treinar/retreinar: python tools/treinar_intents.py (usa models/intent_examples.txt)
+INTENT_ENABLED = True
+INTENT_MODEL_PATH = os.path.join(BASE_DIR, "models/intents.npz")
+INTENT_THRESHOLD = 0.10   # Similaridade mínima com a skill
+INTENT_MARGIN = 0.04      # Diferença mínima para a segunda skill
+
+# --- Execução das Skills ---
+# Paralelo: todas as skills com match correm ao mesmo tempo e ganha a de maior prioridade
+# (ordem de carregamento). Atenção: skills que fazem ações (ligar luzes) correm mesmo que
+# outra acabe por ganhar. Desligado = cadeia sequencial original.
+SKILL_PARALLEL = False
+SKILL_WORKERS = 8
+SKILL_DEADLINE = 5.0                 # Prazo por skill (segundos); a skill também pode definir DEADLINE
+SKILL_DEADLINES = {"skill_gemini": 30.0, "skill_cloogy": 8.0}
+# Skills são importadas só no primeiro match. Os daemons destas também só arrancam aí
+# (os restantes arrancam com o assistente). Import/RSS por skill em /skill_health.
+SKILL_LAZY_DAEMONS = ["skill_dream"]
+# Recarregamento a quente: de quantos em quantos segundos se verificam os mtimes da pasta das skills (0 = desligado)
+SKILL_RELOAD_INTERVAL = 2.0
+# Disjuntores: skills com muitos erros/timeouts são saltadas durante um tempo (estado em /skill_health)
+SKILL_BREAKER_ERROR_RATE = 0.5       # Fração de falhas (últimas 20 chamadas) que abre o disjuntor
+SKILL_BREAKER_COOLOFF = 60.0         # Segundos; duplica a cada reincidência
+SKILL_BREAKER_MAX_COOLOFF = 900.0
+
+# --- Escalonador de pedidos (voz, ui, cli, discord, background) ---
+# Cada origem tem a sua fila; estatísticas por origem em /scheduler_stats
+SCHED_WORKERS = 3                    # Pedidos em simultâneo
+SCHED_RESERVED = 1                   # Workers guardados para a voz (as outras origens nunca os ocupam)
+SCHED_API_TIMEOUT = 120              # Segundos que o /comando espera pela resposta
+# Ajustes às regras por omissão (ver scheduler.SOURCES), ex: o Discord também corta tarefas de fundo
+# SCHED_SOURCES = {"discord": {"queue": 4, "preempts": ["background"]}}
+
 # --- Configs de Performance ---
-OLLAMA_THREADS = 4
+OLLAMA_THREADS = 4   # num_thread de cada pedido ao Ollama
 WHISPER_THREADS = 4
 
 # --- Configs de RAG (Web) ---
 SEARXNG_URL = "http://127.0.0.1:8081" # A tua porta do SearxNG
+CONTEXT_DEADLINE = 4.0   # Segundos para RAG + pesquisa web (em paralelo); o LLM avança com o que chegou
 
 # --- Prompts de IA ---
 WHISPER_INITIAL_PROMPT = "Português de Portugal. Bumblebee. Como estás? Que horas são? Meteorologia. Quanto é? Toca música. Põe música. Memoriza isto. 1050 a dividir por 30."
@@ -0,0 +1,140 @@
+import re
+import time
+import math
+import threading
+from collections import deque
+from text_utils import fold
+
+# --- CONVERSA COM ORÇAMENTO DE TOKENS ---
+# Histórico curto por sessão (voz, cada utilizador do Discord, UI, ...) e um orçamento
+# para a janela do modelo: num_ctx - num_predict fica para o prompt; o system prompt e a
+# pergunta entram sempre, o resto é repartido entre histórico, memórias (RAG) e web.
+# A parte que um não usa passa para os outros. O que não cabe é cortado por entradas
+# inteiras (as memórias vêm da mais recente para a mais antiga) e só a última é aparada.
+# O histórico só entra (e a cache de respostas só é saltada) numa continuação: uma pergunta
+# nova a seguir a "liga a luz" não é conversa e não deve arrastar o que veio antes.
+
+# Pistas de continuação (texto sem acentos): "e amanhã?", "porquê?", "fala mais disso", ...
+FOLLOW_UP_START = re.compile(r"^(e|mas|entao|tambem)\b|^porque( nao)?$")
+FOLLOW_UP_WORDS = re.compile(r"\b(ele|ela|eles|elas|dele|dela|deles|delas|nele|nela|lhe|lhes|isso|disso|nisso|esse|essa|"
+                             r"esses|essas|desse|dessa|nesse|nessa|aquilo|daquilo|o mesmo|a mesma|outra vez|de novo|"
+                             r"mais sobre|explica melhor|continua|anterior|disseste|dizias|referiste)\b")
+
+def approx_tokens(text):
+    """ Aproximação rápida (~3.5 caracteres por token em PT/EN; sem tokenizer). """
+    return math.ceil(len(text) / 3.5) if text else 0
+
+def truncate_tokens(text, max_tokens):
+    """ Corta 'text' para caber em max_tokens, de preferência no fim de uma frase/linha. """
+    if approx_tokens(text) <= max_tokens: return text
+    cut = text[:max(0, int(max_tokens * 3.5) - 1)]
+    m = re.search(r"(?s).*[.!?\n]", cut)
+    if m and len(m.group(0)) > len(cut) // 2: cut = m.group(0)
+    return cut.rstrip() + "…" if cut else ""
+
+def fit_entries(text, max_tokens):
+    """ Mantém o cabeçalho e as entradas ("- ...") que couberem, pela ordem em que vêm. """
+    if not text or max_tokens <= 0: return ""
+    if approx_tokens(text) <= max_tokens: return text
+    lines = text.splitlines()
+    head = [l for l in lines if not l.startswith("- ")][:3]
+    entries = [l for l in lines if l.startswith("- ")]
+    out, used = list(head), approx_tokens("\n".join(head))
+    for e in entries:
+        t = approx_tokens(e) + 1
+        if used + t > max_tokens:
+            rest = max_tokens - used
+            if rest > 30: out.append(truncate_tokens(e, rest))   # Vale a pena um pedaço da seguinte
+            break
+        out.append(e); used += t
+    return "\n".join(out) if len(out) > len(head) else ""
+
+class ConversationManager:
+    def __init__(self, num_ctx=8192, num_predict=512, max_turns=6, timeout=300.0, max_turn_tokens=200, shares=None):
+        self.num_ctx = num_ctx
+        self.num_predict = num_predict if num_predict and num_predict > 0 else 1024
+        self.max_turns = max_turns
+        self.timeout = timeout
+        self.max_turn_tokens = max_turn_tokens   # Respostas antigas longas entram aparadas
+        self.shares = shares or {"history": 0.3, "memories": 0.4, "web": 0.3}
+        self.sessions = {}   # chave -> deque[(papel, texto, instante, origem)]; origem "llm" ou "skill"
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(ctx):
+        """ Sessão do pedido: a origem, mais o utilizador se vier (ex: "discord:1234"). """
+        session = getattr(ctx, "session", None)
+        return f"{ctx.source}:{session}" if session else ctx.source
+
+    def history(self, key):
+        """ Turnos da sessão (vazio se a conversa ficou parada mais de 'timeout' segundos). """
+        with self._lock:
+            turns = self.sessions.get(key)
+            if not turns: return []
+            if time.time() - turns[-1][2] > self.timeout:
+                del self.sessions[key]
+                return []
+            return [{'role': r, 'content': c} for r, c, _, _ in turns]
+
+    def add_turn(self, key, question, answer, origin="llm"):
+        """ 'origin': "llm" (inclui respostas da cache) ou "skill" (ex: "liga a luz"). """
+        with self._lock:
+            turns = self.sessions.setdefault(key, deque(maxlen=self.max_turns * 2))
+            now = time.time()
+            turns.append(("user", question, now, origin))
+            turns.append(("assistant", re.sub(r"(?s)<think>.*?</think>", "", answer).strip(), now, origin))
+
+    def is_follow_up(self, key, question):
+        """
+        A pergunta continua a conversa? Só numa sessão ativa e se tiver uma pista de continuação
+        ("e amanhã?", "porquê?", "quem é ela?") ou se for curta logo a seguir a uma resposta do LLM
+        ("quando morreu?"). Uma pergunta nova depois de uma skill nunca é continuação só por isso.
+        """
+        if not self.history(key): return False
+        text = re.sub(r"[^\w\s]", " ", fold(question)).strip()
+        if FOLLOW_UP_START.search(text) or FOLLOW_UP_WORDS.search(text): return True
+        with self._lock:
+            turns = self.sessions.get(key)
+            last_llm = bool(turns) and turns[-1][3] == "llm"
+        return last_llm and len(text.split()) <= 3
+
+    def build(self, key, system, question, memories="", web="", follow_up=True):
+        """
+        (histórico, contexto, uso) a passar ao LLM. 'uso' tem os tokens estimados de cada parte.
+        Sem 'follow_up' o histórico fica de fora (pergunta nova).
+        """
+        budget = self.num_ctx - self.num_predict - 64   # Margem para o template do chat
+        fixed = approx_tokens(system or "") + approx_tokens(question) + 16
+        free = max(0, budget - fixed)
+        turns = self.history(key) if follow_up else []
+        history = [dict(m, content=truncate_tokens(m['content'], self.max_turn_tokens)) for m in turns]
+        wants = {"history": sum(approx_tokens(m['content']) + 4 for m in history),
+                 "memories": approx_tokens(memories), "web": approx_tokens(web)}
+
+        # Duas passagens: quem precisa de menos que a sua parte liberta o resto para os outros
+        alloc = {k: min(wants[k], int(free * self.shares.get(k, 0))) for k in wants}
+        spare = free - sum(alloc.values())
+        needy = sorted((k for k in wants if wants[k] > alloc[k]), key=lambda k: wants[k] - alloc[k])
+        for i, k in enumerate(needy):
+            extra = min(wants[k] - alloc[k], spare // (len(needy) - i))
+            alloc[k] += extra; spare -= extra
+
+        # Histórico: os turnos mais recentes que couberem (sempre aos pares pergunta/resposta)
+        kept, used = [], 0
+        for i in range(len(history) - 2, -1, -2):
+            pair = history[i:i + 2]
+            t = sum(approx_tokens(m['content']) + 4 for m in pair)
+            if used + t > alloc["history"]: break
+            kept = pair + kept; used += t
+        mem = fit_entries(memories.strip(), alloc["memories"]) if memories else ""
+        web_txt = fit_entries(web.strip(), alloc["web"]) if web else ""
+        context = "\n\n".join(x for x in (mem, web_txt) if x)
+        usage = {"system": approx_tokens(system or ""), "question": approx_tokens(question), "history": used,
+                 "memories": approx_tokens(mem), "web": approx_tokens(web_txt), "budget": budget,
+                 "dropped": {k: max(0, wants[k] - v) for k, v in (("history", used), ("memories", approx_tokens(mem)), ("web", approx_tokens(web_txt)))}}
+        usage["total"] = usage["system"] + usage["question"] + used + usage["memories"] + usage["web"]
+        return kept, context, usage
+
+    def stats(self):
+        with self._lock:
+            return {k: {"turns": len(v) // 2, "idle_s": int(time.time() - v[-1][2])} for k, v in self.sessions.items() if v}
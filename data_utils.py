@@ -51,10 +51,11 @@ def save_to_rag(transcription_text):
     except Exception as e:
         print(f"ERRO: Falha ao guardar a transcrição na BD RAG: {e}")
 
-def retrieve_from_rag(prompt, max_results=5):
+def retrieve_from_rag(prompt, max_results=5, ctx=None):
     """
     Recupera memórias relevantes com TIMESTAMPS para dar contexto temporal.
     Resolve o conflito 'Bimby vs Ophiuchus' dando prioridade à data.
+    Com 'ctx', cancelar o pedido interrompe a query (conn.interrupt()).
     """
     try:
         # Filtro de palavras curtas para evitar ruído
@@ -74,8 +75,13 @@ def retrieve_from_rag(prompt, max_results=5):
         # Selecionamos também o timestamp
         sql_query = f"SELECT timestamp, text FROM memories WHERE {' OR '.join(query_parts)} ORDER BY timestamp DESC LIMIT {max_results}"
         
-        cursor.execute(sql_query, params)
-        results = cursor.fetchall()
+        if ctx is not None:
+            with ctx.cancel_scope(conn.interrupt):
+                cursor.execute(sql_query, params)
+                results = cursor.fetchall()
+        else:
+            cursor.execute(sql_query, params)
+            results = cursor.fetchall()
         conn.close()
 
         if results:
@@ -97,13 +103,14 @@ def retrieve_from_rag(prompt, max_results=5):
             return ""
 
     except Exception as e:
+        if ctx is not None and ctx.cancelled: return ""
         print(f"ERRO: Falha ao recuperar da BD RAG: {e}")
         return ""
 
 # --- CACHE (RESPOSTAS RÁPIDAS) - AS FUNÇÕES QUE FALTAVAM ---
 
-def get_cached_response(prompt):
-    """ Tenta recuperar uma resposta exata da cache (válida por 24h). """
+def get_cached_response(prompt, max_age=86400):
+    """ Tenta recuperar uma resposta exata da cache (válida por 'max_age' segundos, 24h por omissão). """
     try:
         conn = sqlite3.connect(config.DB_PATH)
         cursor = conn.cursor()
@@ -113,10 +120,10 @@ def get_cached_response(prompt):
 
         if row:
             response, timestamp_str = row
-            # Verifica validade (ex: 24 horas)
+            # Verifica validade
             try:
                 cached_time = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S.%f")
-                if datetime.now() - cached_time < timedelta(hours=24):
+                if datetime.now() - cached_time < timedelta(seconds=max_age):
                     print("CACHE: Resposta recuperada da base de dados.")
                     return response
             except:
@@ -142,3 +149,18 @@ def save_cached_response(prompt, response):
         conn.close()
     except Exception as e:
         print(f"AVISO: Erro ao gravar cache: {e}")
+
+def load_cached_responses(limit=1000):
+    """ As 'limit' entradas mais recentes da cache: [(prompt, resposta, idade_em_segundos)]. """
+    try:
+        conn = sqlite3.connect(config.DB_PATH)
+        rows = conn.execute("SELECT prompt, response, timestamp FROM cache ORDER BY timestamp DESC LIMIT ?", (limit,)).fetchall()
+        conn.close()
+    except Exception as e:
+        print(f"AVISO: Erro ao ler cache: {e}")
+        return []
+    now, out = datetime.now(), []
+    for prompt, response, ts in rows:
+        try: out.append((prompt, response, (now - datetime.strptime(ts, "%Y-%m-%d %H:%M:%S.%f")).total_seconds()))
+        except (TypeError, ValueError): continue
+    return out
@@ -0,0 +1,433 @@
+import math
+import time
+import threading
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+# --- FRONT-END DSP (Wake Word) ---
+# Tudo o que corre aqui corre 12.5x por segundo, 24/7.
+# Regra da casa: nada de alocações no caminho quente. Os buffers são criados
+# uma vez no __init__ e reutilizados em cada chunk.
+
+TARGET_RATE = 16000
+
+def _design_lowpass(num_taps, cutoff, gain):
+    """ FIR passa-baixo (sinc com janela de Blackman). 'cutoff' em ciclos/amostra. """
+    n = np.arange(num_taps) - (num_taps - 1) / 2.0
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.blackman(num_taps)
+    return (h * (gain / h.sum())).astype(np.float32)
+
+class PolyphaseResampler:
+    """
+    Reamostragem polifásica em streaming (ex: 48000/44100/32000 -> 16000 Hz),
+    com anti-aliasing, remoção de DC in-place e saída int16 pré-alocada.
+    O array devolvido por process() é reutilizado no chunk seguinte.
+    """
+    def __init__(self, rate_in, rate_out=TARGET_RATE, chunk_out=1280, taps_per_phase=16, remove_dc=True):
+        g = math.gcd(int(rate_in), int(rate_out))
+        self.up = int(rate_out) // g
+        self.down = int(rate_in) // g
+        if (chunk_out * self.down) % self.up:
+            raise ValueError(f"Chunk de {chunk_out} amostras não é compatível com {rate_in}->{rate_out} Hz")
+
+        self.rate_in = int(rate_in)
+        self.rate_out = int(rate_out)
+        self.chunk_out = chunk_out
+        self.chunk_in = chunk_out * self.down // self.up
+        self.remove_dc = remove_dc
+        self.passthrough = (self.up == self.down)
+
+        # Buffers de saída (float para DSP, int16 para o openWakeWord)
+        self.float_out = np.zeros(chunk_out, dtype=np.float32)
+        self._out = np.zeros(chunk_out, dtype=np.int16)
+        if self.passthrough: return
+
+        # Filtro no domínio sobre-amostrado, partido em 'up' fases de K coeficientes
+        K = max(2, int(math.ceil(taps_per_phase * max(1.0, self.down / self.up))))
+        cutoff = 0.5 / max(self.up, self.down) * 0.9
+        h = _design_lowpass(K * self.up, cutoff, self.up)
+
+        self._hist = K - 1
+        self._x = np.zeros(self._hist + self.chunk_in, dtype=np.float32)
+
+        if self.up == 1:
+            # Decimação inteira (48k, 32k): uma só fase -> janela deslizante sem gather
+            self._win = as_strided(self._x, shape=(chunk_out, K), strides=(self.down * 4, 4), writeable=False)
+            self._h_rev = np.ascontiguousarray(h[::-1])
+        else:
+            # Padrão de fases repete-se em cada chunk -> índices e coeficientes fixos
+            t = np.arange(chunk_out) * self.down
+            base = (K - 1) + t // self.up
+            phase = t % self.up
+            k = np.arange(K)
+            self._idx = (base[:, None] - k[None, :]).astype(np.intp)
+            self._coef = np.ascontiguousarray(h[phase[:, None] + k[None, :] * self.up])
+            self._taps = np.zeros((chunk_out, K), dtype=np.float32)
+
+    def reset(self):
+        if not self.passthrough: self._x.fill(0)
+
+    def process(self, chunk_int16):
+        """ Recebe 'chunk_in' amostras int16 e devolve 'chunk_out' amostras int16 a 16 kHz. """
+        x_in = chunk_int16.reshape(-1)
+        y = self.float_out
+
+        if self.passthrough:
+            np.copyto(y, x_in, casting='unsafe')
+        else:
+            x = self._x
+            h = self._hist
+            if h: x[:h] = x[-h:]
+            np.copyto(x[h:], x_in, casting='unsafe')
+            if self.up == 1:
+                np.einsum('nk,k->n', self._win, self._h_rev, out=y)
+            else:
+                # mode='clip' evita o buffer temporário que o take() faz com mode='raise'
+                np.take(x, self._idx, out=self._taps, mode='clip')
+                np.einsum('nk,nk->n', self._taps, self._coef, out=y)
+
+        if self.remove_dc: y -= y.mean()
+        np.clip(y, -32767, 32767, out=y)
+        np.copyto(self._out, y, casting='unsafe')
+        return self._out
+
+# --- RING BUFFER (Callback PortAudio -> Consumidores) ---
+
+class AudioRingBuffer:
+    """
+    Ring buffer int16 pré-alocado escrito pelo callback de áudio (escritor único)
+    e lido por vários consumidores (wake word, gravação de comandos), cada um com o seu RingReader.
+    Cada amostra é escrita em duas posições (i e i+capacity), por isso qualquer leitura
+    até 'capacity' amostras é uma view contígua, sem cópias nem objetos por bloco.
+    O head é um contador monotónico: o escritor só mexe no head, cada leitor só no seu tail.
+
+    Com 'buffer' (ex: multiprocessing.shared_memory, nbytes(capacity) bytes) o head e as
+    amostras vivem nessa memória e o ring pode ser escrito e lido em processos diferentes.
+    """
+    def __init__(self, capacity, rate=None, buffer=None):
+        self.capacity = int(capacity)
+        self.rate = rate
+        if buffer is None:
+            self._state = np.zeros(1, dtype=np.int64)
+            self._buf = np.zeros(2 * self.capacity, dtype=np.int16)
+            self._event = threading.Event()
+        else:
+            self._state = np.ndarray((1,), dtype=np.int64, buffer=buffer, offset=0)
+            self._buf = np.ndarray((2 * self.capacity,), dtype=np.int16, buffer=buffer, offset=8)
+            self._event = None  # Entre processos não há Event: os leitores fazem polling
+
+    @staticmethod
+    def nbytes(capacity):
+        return 8 + 4 * int(capacity)
+
+    def write(self, block):
+        """ Chamado no callback de áudio. Sem locks, sem alocações. """
+        x = block.reshape(-1)
+        n = x.shape[0]
+        if n > self.capacity: x = x[-self.capacity:]; n = self.capacity
+        cap = self.capacity
+        head = int(self._state[0])
+        pos = head % cap
+        first = min(n, cap - pos)
+        self._buf[pos:pos + first] = x[:first]
+        self._buf[pos + cap:pos + cap + first] = x[:first]
+        if first < n:
+            rest = n - first
+            self._buf[:rest] = x[first:]
+            self._buf[cap:cap + rest] = x[first:]
+        # O head só avança depois das amostras estarem escritas
+        self._state[0] = head + n
+        if self._event is not None: self._event.set()
+
+    @property
+    def head(self):
+        return int(self._state[0])
+
+    def wait_for(self, target, timeout=None):
+        """ Espera até o head chegar a 'target'. Devolve False em timeout. """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._state[0] < target:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0: return False
+            if self._event is not None:
+                self._event.clear()
+                if self._state[0] >= target: break
+                self._event.wait(remaining)
+            else:
+                time.sleep(0.005 if remaining is None else min(0.005, remaining))
+        return True
+
+    def reader(self, preroll=0, policy="catch_up", max_backlog=None):
+        """ Novo consumidor, a começar 'preroll' amostras antes do presente. """
+        return RingReader(self, self.head - min(int(preroll), self.capacity // 2), policy, max_backlog)
+
+class RingReader:
+    """
+    Cursor de leitura de um consumidor do AudioRingBuffer.
+
+    Política de atraso (backlog):
+      - "drop_oldest": se o leitor ficar mais de 'max_backlog' amostras atrás, salta para o presente.
+      - "catch_up": processa tudo o que está em atraso (só salta se o escritor der a volta).
+    """
+    def __init__(self, ring, start, policy="catch_up", max_backlog=None):
+        self.ring = ring
+        self.rate = ring.rate
+        self.policy = policy
+        self.max_backlog = int(max_backlog) if max_backlog else ring.capacity // 2
+        self._tail = max(0, start)
+        self.closed = False
+
+        self.overruns = 0
+        self.underruns = 0
+        self.dropped_samples = 0
+
+    def lag(self):
+        """ Amostras escritas e ainda não lidas por este leitor. """
+        return self.ring.head - self._tail
+
+    def clear(self):
+        """ Descarta o atraso e salta para o presente. """
+        if not self.closed: self._tail = self.ring.head
+
+    def close(self):
+        """ O ring vai deixar de existir (ex: shared memory libertada): read() passa a devolver None. """
+        self.closed = True
+
+    def read(self, n, timeout=None):
+        """
+        Devolve uma view de 'n' amostras (válida até o escritor dar a volta ao buffer),
+        ou None se não chegar áudio dentro do 'timeout' (conta como underrun).
+        """
+        if self.closed: return None
+        ring = self.ring
+        if not ring.wait_for(self._tail + n, timeout):
+            self.underruns += 1
+            return None
+
+        head = ring.head
+        lag = head - self._tail
+        if lag > ring.capacity:
+            # O escritor deu a volta: o áudio mais antigo já foi reescrito
+            self.overruns += 1
+            self.dropped_samples += lag - n
+            self._tail = head - n
+        elif self.policy == "drop_oldest" and lag > self.max_backlog:
+            self.dropped_samples += lag - n
+            self._tail = head - n
+
+        pos = self._tail % ring.capacity
+        self._tail += n
+        return ring._buf[pos:pos + n]
+
+    def stats(self):
+        return {"lag": self.lag(), "overruns": self.overruns, "underruns": self.underruns,
+                "dropped_samples": self.dropped_samples, "policy": self.policy}
+
+# --- GATE DE ENERGIA (antes do openWakeWord) ---
+
+class EnergyGate:
+    """
+    Pré-filtro barato (RMS com histerese e noise floor adaptativo) que salta a
+    inferência completa do openWakeWord durante silêncio prolongado.
+    Os chunks saltados mais recentes ficam guardados: quando o gate abre, são
+    re-enviados ao extrator de features para que a primeira sílaba não se perca.
+    """
+    def __init__(self, chunk_size=1280, min_rms=60.0, open_ratio=3.0, close_ratio=2.0,
+                 hangover_chunks=12, preroll_chunks=3, decimate=0):
+        self.min_rms = float(min_rms)
+        self.open_ratio = open_ratio
+        self.close_ratio = close_ratio
+        self.hangover_chunks = hangover_chunks
+        self.decimate = decimate
+
+        self.noise_floor = self.min_rms / open_ratio
+        self.is_open = True
+        self.just_opened = False
+        self._quiet = 0
+        self._closed_run = 0
+
+        # Pre-roll dos chunks saltados (circular, pré-alocado)
+        self._hist = np.zeros((max(1, preroll_chunks), chunk_size), dtype=np.int16)
+        self._hist_pos = 0
+
+        self.chunks = 0
+        self.skipped = 0
+        self.openings = 0
+
+    def update(self, y_float, audio_int16):
+        """ Devolve True se o chunk deve ir à inferência completa. """
+        self.chunks += 1
+        rms = math.sqrt(float(np.dot(y_float, y_float)) / y_float.shape[0])
+        open_level = max(self.noise_floor * self.open_ratio, self.min_rms)
+        close_level = max(self.noise_floor * self.close_ratio, self.min_rms * self.close_ratio / self.open_ratio)
+
+        if self.is_open:
+            if rms < close_level:
+                self._quiet += 1
+                if self._quiet >= self.hangover_chunks: self.is_open = False; self._closed_run = 0
+            else:
+                self._quiet = 0
+        elif rms > open_level:
+            self.is_open = True; self.just_opened = True
+            self._quiet = 0
+            self.openings += 1
+
+        # O noise floor só aprende com silêncio (desce depressa, sobe devagar)
+        if rms < close_level:
+            alpha = 0.05 if rms < self.noise_floor else 0.005
+            self.noise_floor += alpha * (rms - self.noise_floor)
+
+        if self.is_open: return True
+
+        self._closed_run += 1
+        if self.decimate and self._closed_run % self.decimate == 0:
+            self._hist_pos = 0  # O extrator vai ficar atualizado com este chunk
+            return True
+
+        self._hist[self._hist_pos % self._hist.shape[0]] = audio_int16
+        self._hist_pos += 1
+        self.skipped += 1
+        return False
+
+    def take_preroll(self):
+        """ Chunks saltados mais recentes, por ordem cronológica (só depois de abrir). """
+        self.just_opened = False
+        n = min(self._hist_pos, self._hist.shape[0])
+        start = self._hist_pos - n
+        self._hist_pos = 0
+        return [self._hist[i % self._hist.shape[0]] for i in range(start, start + n)]
+
+    def stats(self):
+        return {"chunks": self.chunks, "skipped": self.skipped,
+                "skipped_fraction": round(self.skipped / self.chunks, 4) if self.chunks else 0.0,
+                "openings": self.openings, "noise_floor_rms": round(self.noise_floor, 1), "open": self.is_open}
+
+# --- ENDPOINTING (fim de fala adaptativo) ---
+
+class Endpointer:
+    """
+    Decide quando o utilizador acabou de falar. O silêncio final exigido adapta-se:
+    curto para ordens curtas ("liga a luz da sala"), mais longo para frases longas
+    ou com pausas, e longo em modo ditado (ex: "memoriza ..." via hint()).
+    Um frame só conta como fala se o VAD concordar E a energia estiver acima do
+    noise floor (ruído de fundo constante não prolonga a gravação).
+    O áudio vai para um buffer float32 pré-alocado e reutilizado entre gravações.
+    """
+    def __init__(self, rate=TARGET_RATE, short_silence=0.6, medium_silence=1.0, long_silence=1.5,
+                 long_speech=2.0, pause_bonus=0.2, min_pause=0.3, min_speech_frames=3,
+                 max_seconds=10.0, dictation_max_seconds=20.0, tail_keep=0.3, energy_ratio=2.5, min_rms=30.0):
+        self.rate = rate
+        self.short_silence = short_silence
+        self.medium_silence = medium_silence
+        self.long_silence = long_silence
+        self.long_speech = long_speech
+        self.pause_bonus = pause_bonus
+        self.min_pause = min_pause
+        self.min_speech_frames = min_speech_frames
+        self.max_samples = int(max_seconds * rate)
+        self.dictation_max_samples = int(max(max_seconds, dictation_max_seconds) * rate)
+        self.tail_keep = int(tail_keep * rate)
+        self.energy_ratio = energy_ratio
+        self.min_rms = float(min_rms)
+        self.dictation_triggers = ()
+
+        self._buf = np.zeros(self.dictation_max_samples, dtype=np.float32)
+        self._lock = threading.Lock()   # O STT em streaming lê o buffer de outra thread (snapshot)
+        self.noise_floor = self.min_rms
+        self.last = None
+        self.reset()
+
+    def reset(self, mode="command"):
+        with self._lock:
+            self.mode = mode
+            self.n = 0
+            self.started = False
+            self.speech_s = 0.0
+            self.pauses = 0
+            self.reason = None
+            self._run = 0
+            self._silence = 0.0
+            self._speech_end = 0
+
+    def hint(self, mode):
+        """ "dictation" ou "command". Pode ser chamado de outra thread (ex: texto parcial do STT). """
+        self.mode = mode
+
+    def hint_from_text(self, text):
+        """
+        Se o texto parcial começa por um gatilho de ditado, alarga a janela de silêncio.
+        Só há texto parcial com o STT em streaming; sem ele, quem grava passa o modo a
+        record_audio(mode="dictation") ou chama hint() diretamente.
+        """
+        t = text.strip().lower()
+        if any(t.startswith(trig) for trig in self.dictation_triggers): self.hint("dictation")
+
+    def window(self):
+        """ Silêncio final (segundos) exigido neste momento. """
+        if self.mode == "dictation": return self.long_silence
+        w = self.short_silence if self.speech_s < self.long_speech else self.medium_silence
+        return min(self.long_silence, w + self.pauses * self.pause_bonus)
+
+    def push(self, frame, vad_speech):
+        """ Acrescenta um frame int16. Devolve True quando o fim de fala foi atingido. """
+        with self._lock: return self._push(frame, vad_speech)
+
+    def _push(self, frame, vad_speech):
+        n = frame.shape[0]
+        limit = self.dictation_max_samples if self.mode == "dictation" else self.max_samples
+        if self.n + n > limit: self.reason = "max"; return True
+
+        y = self._buf[self.n:self.n + n]
+        np.multiply(frame.reshape(-1), np.float32(1.0 / 32768.0), out=y)
+        self.n += n
+        rms = math.sqrt(float(np.dot(y, y)) / n) * 32768.0
+        speech = vad_speech and rms > max(self.noise_floor * self.energy_ratio, self.min_rms)
+        frame_s = n / self.rate
+
+        if not speech:
+            # O noise floor só aprende com frames que o VAD não marcou como fala
+            if not vad_speech:
+                alpha = 0.1 if rms < self.noise_floor else 0.01
+                self.noise_floor = max(self.min_rms, self.noise_floor + alpha * (rms - self.noise_floor))
+            self._run = 0
+            self._silence += frame_s
+            if self.started and self._silence >= self.window(): self.reason = "silence"; return True
+            return False
+
+        self._run += 1
+        if self.started:
+            if self._silence >= self.min_pause: self.pauses += 1
+            self.speech_s += frame_s
+        elif self._run >= self.min_speech_frames:
+            self.started = True
+            self.speech_s = self._run * frame_s
+        self._silence = 0.0
+        self._speech_end = self.n
+        return False
+
+    def audio(self):
+        """ Cópia do áudio gravado, cortado 'tail_keep' depois da última fala. """
+        with self._lock:
+            end = min(self.n, self._speech_end + self.tail_keep) if self.started else self.n
+            return self._buf[:end].copy()
+
+    def progress(self):
+        """ (amostras gravadas, silêncio atual em s, fim da última fala), lidos de uma vez. """
+        with self._lock: return self.n, self._silence, self._speech_end
+
+    def snapshot(self, start, end=None):
+        """
+        (cópia de [start, end), silêncio, fim da última fala) do mesmo instante. Para ler de
+        outra thread: nunca mistura áudio de um push() ou reset() a meio. 'end' é cortado em n.
+        """
+        with self._lock:
+            end = self.n if end is None else min(end, self.n)
+            return self._buf[start:max(start, end)].copy(), self._silence, self._speech_end
+
+    def report(self):
+        end = min(self.n, self._speech_end + self.tail_keep) if self.started else self.n
+        self.last = {"reason": self.reason or "stream", "mode": self.mode, "window_ms": int(self.window() * 1000),
+                     "speech_ms": int(self.speech_s * 1000), "pauses": self.pauses,
+                     "total_ms": int(self.n * 1000 / self.rate), "trimmed_ms": int((self.n - end) * 1000 / self.rate),
+                     "noise_floor_rms": round(self.noise_floor, 1)}
+        return self.last
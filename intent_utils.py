@@ -0,0 +1,82 @@
+import re
+import zlib
+import numpy as np
+from text_utils import fold
+
+# --- CLASSIFICADOR DE INTENÇÕES (n-gramas de caracteres + TF-IDF) ---
+# Modelo pequeno e local: cada skill é um centróide TF-IDF (n-gramas de caracteres
+# com hashing). Prever = um produto esparso contra uma matriz [skills, DIM]: dezenas de µs.
+# Treino: tools/treinar_intents.py (triggers das skills + models/intent_examples.txt).
+
+LLM_LABEL = "_llm"   # Conversa geral: sem skill direta (os triggers continuam a decidir antes da cache/LLM)
+
+def _ngrams(text, n_min, n_max):
+    t = " " + re.sub(r"\s+", " ", fold(text)).strip() + " "
+    for n in range(n_min, n_max + 1):
+        for i in range(len(t) - n + 1): yield t[i:i + n]
+
+def featurize(text, dim, n_min=3, n_max=5):
+    """ (índices, pesos TF sublineares) dos n-gramas com hashing estável (crc32). """
+    counts = {}
+    for g in _ngrams(text, n_min, n_max):
+        h = zlib.crc32(g.encode("utf-8")) % dim
+        counts[h] = counts.get(h, 0) + 1
+    idx = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    tf = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    return idx, tf.astype(np.float32)
+
+def train_intents(examples, dim=2 ** 15, n_min=3, n_max=5):
+    """ examples: [(label, texto)]. Devolve os arrays do modelo (para np.savez). """
+    labels = sorted({lab for lab, _ in examples})
+    lab_idx = {lab: i for i, lab in enumerate(labels)}
+    feats = [featurize(t, dim, n_min, n_max) for _, t in examples]
+
+    df = np.zeros(dim, dtype=np.float32)
+    for idx, _ in feats: df[idx] += 1
+    idf = (np.log((1.0 + len(examples)) / (1.0 + df)) + 1.0).astype(np.float32)
+
+    W = np.zeros((len(labels), dim), dtype=np.float32)
+    for (lab, _), (idx, tf) in zip(examples, feats):
+        v = tf * idf[idx]
+        W[lab_idx[lab], idx] += v / (np.linalg.norm(v) + 1e-9)
+    W /= np.linalg.norm(W, axis=1, keepdims=True) + 1e-9
+    return {"W": W, "idf": idf, "labels": np.array(labels), "ngram": np.array([n_min, n_max])}
+
+class IntentClassifier:
+    def __init__(self, path, threshold=0.10, margin=0.04):
+        data = np.load(path)
+        self.W = np.ascontiguousarray(data["W"])
+        self.idf = data["idf"]
+        self.labels = [str(l) for l in data["labels"]]
+        self.n_min, self.n_max = (int(x) for x in data["ngram"])
+        self.dim = self.W.shape[1]
+        self.threshold = threshold
+        self.margin = margin
+
+    def scores(self, text):
+        """ Similaridade de cosseno com cada centróide (na ordem de self.labels). """
+        idx, tf = featurize(text, self.dim, self.n_min, self.n_max)
+        if idx.size == 0: return np.zeros(len(self.labels), dtype=np.float32)
+        v = tf * self.idf[idx]
+        v /= np.linalg.norm(v) + 1e-9
+        return self.W[:, idx] @ v
+
+    def predict(self, text):
+        """ (label, score) se a decisão for clara; (None, score) caso contrário. """
+        s = self.scores(text)
+        order = np.argsort(s)[::-1]
+        best = float(s[order[0]])
+        second = float(s[order[1]]) if len(order) > 1 else 0.0
+        if best < self.threshold or best - second < self.margin: return None, best
+        return self.labels[order[0]], best
+
+def load_intent_model(path, threshold=0.10, margin=0.04):
+    try:
+        model = IntentClassifier(path, threshold, margin)
+        print(f"🎯 Classificador de intenções: {len(model.labels)} classes ({path})")
+        return model
+    except FileNotFoundError:
+        print(f"⚠️ Sem modelo de intenções em '{path}' (treinar com tools/treinar_intents.py). Só triggers.")
+    except Exception as e:
+        print(f"⚠️ Erro a carregar modelo de intenções: {e}")
+    return None
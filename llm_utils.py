@@ -0,0 +1,135 @@
+import time
+import threading
+from collections import deque
+import ollama
+import config
+
+# --- GATEWAY DO OLLAMA ---
+# Um só cliente (o httpx por baixo mantém as ligações abertas) para o assistente e skills.
+# keep_alive mantém o modelo na RAM; o aquecimento periódico evita que seja descarregado
+# nas horas paradas. O SYSTEM_PROMPT vai sempre como mensagem 'system' idêntica, à frente
+# de tudo: o Ollama reaproveita a KV cache desse prefixo e só avalia o contexto + pergunta.
+# Os streams de um pedido (ctx) usam um cliente próprio: cancelar fecha-o e a ligação cai
+# mesmo durante a avaliação do prompt, antes de chegar o primeiro pedaço. O partilhado não
+# se pode fechar sem cortar os pedidos dos outros.
+
+class OllamaGateway:
+    def __init__(self, model, host=None, timeout=None, keep_alive="30m", system=None, options=None):
+        self.client = ollama.Client(host=host, timeout=timeout)
+        self.host = host
+        self.timeout = timeout
+        self.model = model
+        self.keep_alive = keep_alive
+        self.system = system
+        self.options = {k: v for k, v in (options or {}).items() if v is not None}
+        self.calls = 0
+        self.cold_loads = 0
+        self.history = deque(maxlen=100)   # Métricas das últimas chamadas
+        self.last_used = 0.0
+        self._lock = threading.Lock()
+
+    def messages(self, question, context="", history=None, system=None):
+        """ [system estável] + histórico + [contexto variável + pergunta]. """
+        msgs = []
+        system = self.system if system is None else system
+        if system: msgs.append({'role': 'system', 'content': system})
+        msgs += history or []
+        content = f"Context:\n{context.strip()}\n\nUser: {question}" if context and context.strip() else question
+        msgs.append({'role': 'user', 'content': content})
+        return msgs
+
+    def chat(self, messages, stream=False, options=None, model=None, ctx=None, timeout=None, **kwargs):
+        """
+        ollama.Client.chat com keep_alive e as opções por omissão (num_ctx, num_predict, num_thread).
+        Com stream=True e 'ctx' (RequestContext) o cancelamento do pedido aborta a geração.
+        'timeout' (s) substitui o do gateway nesta chamada (ex: código longo com num_predict=-1).
+        """
+        opts = {**self.options, **(options or {})}
+        t0 = time.monotonic()
+        self.last_used = time.time()
+        own = (stream and ctx is not None) or (timeout is not None and timeout != self.timeout)
+        client = ollama.Client(host=self.host, timeout=timeout or self.timeout) if own else self.client
+        resp = client.chat(model=model or self.model, messages=messages, stream=stream,
+                           options=opts, keep_alive=self.keep_alive, **kwargs)
+        if not stream:
+            if client is not self.client: client._client.close()
+            self._record(resp, t0, "chat")
+            return resp
+        return self._recorded_stream(resp, t0, client if client is not self.client else None, ctx)
+
+    def _recorded_stream(self, stream, t0, client=None, ctx=None):
+        """ Devolve os pedaços tal como vêm; o último (done=True) traz as métricas. """
+        close = client._client.close if client is not None else None   # httpx.Client do pedido
+        try:
+            if close is not None: ctx.on_cancel(close)   # Já cancelado: fecha logo e o pedido nem sai
+            for chunk in stream:
+                if chunk.get('done'): self._record(chunk, t0, "stream")
+                yield chunk
+        finally:
+            stream.close()
+            if close is not None:
+                ctx.discard(close)
+                close()
+
+    def warmup(self):
+        """ Carrega o modelo e avalia o prefixo do system prompt (fica na KV cache). """
+        msgs = [{'role': 'system', 'content': self.system}] if self.system else []
+        resp = self.client.chat(model=self.model, messages=msgs + [{'role': 'user', 'content': 'ok'}],
+                                options={**self.options, "num_predict": 1}, keep_alive=self.keep_alive)
+        self._record(resp, time.monotonic(), "warmup")
+        return resp
+
+    def keep_warm(self, interval):
+        """ Thread que volta a aquecer o modelo se ninguém o usou nos últimos 'interval' segundos. """
+        def loop():
+            while True:
+                time.sleep(interval)
+                if time.time() - self.last_used < interval: continue
+                try:
+                    self.warmup()
+                    self.last_used = time.time()
+                except Exception as e: print(f"⚠️ Aquecimento do Ollama falhou: {e}")
+        t = threading.Thread(target=loop, daemon=True, name="ollama-warm")
+        t.start()
+        return t
+
+    # --- Métricas (durações do Ollama vêm em nanossegundos) ---
+    def _record(self, resp, t0, kind):
+        def ms(key): return (resp.get(key) or 0) / 1e6
+        m = {"kind": kind, "at": time.time(), "wall_ms": int((time.monotonic() - t0) * 1000),
+             "load_ms": int(ms('load_duration')), "prompt_tokens": resp.get('prompt_eval_count') or 0,
+             "prompt_ms": int(ms('prompt_eval_duration')), "eval_tokens": resp.get('eval_count') or 0,
+             "eval_ms": int(ms('eval_duration'))}
+        m["eval_tps"] = round(m["eval_tokens"] / (m["eval_ms"] / 1000), 1) if m["eval_ms"] else 0.0
+        m["prompt_tps"] = round(m["prompt_tokens"] / (m["prompt_ms"] / 1000), 1) if m["prompt_ms"] else 0.0
+        with self._lock:
+            self.calls += 1
+            if m["load_ms"] > 1000: self.cold_loads += 1   # O modelo teve de ser (re)carregado
+            self.history.append(m)
+        if kind != "warmup":
+            print(f"🧠 LLM: load {m['load_ms']}ms | prompt {m['prompt_tokens']} tok em {m['prompt_ms']}ms"
+                  f" | {m['eval_tokens']} tok a {m['eval_tps']} tok/s")
+
+    def stats(self):
+        with self._lock: hist = [h for h in self.history if h["kind"] != "warmup"]
+        def avg(key): return round(sum(h[key] for h in hist) / len(hist), 1) if hist else 0
+        return {"model": self.model, "keep_alive": self.keep_alive, "options": self.options,
+                "calls": self.calls, "cold_loads": self.cold_loads,
+                "avg_load_ms": avg("load_ms"), "avg_prompt_ms": avg("prompt_ms"), "avg_prompt_tokens": avg("prompt_tokens"),
+                "avg_eval_tps": avg("eval_tps"), "last": hist[-1] if hist else None}
+
+_GATEWAY = None
+_GATEWAY_LOCK = threading.Lock()
+
+def gateway():
+    """ O gateway partilhado (criado a partir do config na primeira chamada). """
+    global _GATEWAY
+    with _GATEWAY_LOCK:
+        if _GATEWAY is None:
+            _GATEWAY = OllamaGateway(
+                getattr(config, 'OLLAMA_MODEL_PRIMARY', 'llama3'), getattr(config, 'OLLAMA_HOST', None),
+                getattr(config, 'OLLAMA_TIMEOUT', None), getattr(config, 'OLLAMA_KEEP_ALIVE', "30m"),
+                getattr(config, 'SYSTEM_PROMPT', None),
+                {"num_ctx": getattr(config, 'OLLAMA_NUM_CTX', None), "num_predict": getattr(config, 'OLLAMA_NUM_PREDICT', None),
+                 "num_thread": getattr(config, 'OLLAMA_THREADS', None)})
+        return _GATEWAY
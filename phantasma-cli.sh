@@ -71,7 +71,7 @@ fi
 
 # Construir o JSON
 # Usamos 'jq' para criar o JSON de forma segura
-JSON_PAYLOAD=$(jq -n --arg prompt "$PROMPT" '{"prompt": $prompt}')
+JSON_PAYLOAD=$(jq -n --arg prompt "$PROMPT" '{"prompt": $prompt, "source": "cli"}')
 
 echo "A enviar comando: $PROMPT"
 echo "------------------------------"
@@ -0,0 +1,76 @@
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+import httpx
+
+# --- CONTEXTO DO PEDIDO (cancelamento cooperativo) ---
+# Cada pedido (wake word ou API) tem um RequestContext. Uma wake word nova cancela o
+# anterior: os pontos de verificação saem logo e os callbacks registados com on_cancel()
+# abortam o que está em curso (clientes HTTP fechados, query SQLite interrompida,
+# stream do Ollama fechado), em vez de se esperar que acabem.
+
+class Cancelled(Exception):
+    """ O pedido foi substituído por outro mais recente. """
+
+class RequestContext:
+    def __init__(self, source="voz", req_id=None, session=None):
+        self.id = req_id or str(uuid.uuid4())[:8]
+        self.source = source
+        self.session = session   # Ex: utilizador do Discord (conversas separadas na mesma origem)
+        self.started = time.monotonic()
+        self.reason = None
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self): return self._event.is_set()
+
+    def cancel(self, reason="substituído"):
+        with self._lock:
+            if self._event.is_set(): return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try: fn()
+            except Exception: pass
+        print(f"🛑 Pedido {self.id} cancelado ({reason})")
+
+    def on_cancel(self, fn):
+        """ Regista fn() para correr no cancelamento (ou já, se o pedido já foi cancelado). """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(fn)
+                return fn
+        fn()
+        return fn
+
+    def discard(self, fn):
+        with self._lock:
+            if fn in self._callbacks: self._callbacks.remove(fn)
+
+    def check(self):
+        if self._event.is_set(): raise Cancelled(self.reason)
+
+    def wait(self, timeout):
+        """ Pausa interrompível: True se o pedido foi cancelado entretanto. """
+        return self._event.wait(timeout)
+
+    @contextmanager
+    def cancel_scope(self, fn):
+        """ fn() aborta a operação do bloco 'with' se o pedido for cancelado a meio. """
+        self.on_cancel(fn)
+        try: yield
+        finally: self.discard(fn)
+
+    @contextmanager
+    def http_client(self, **kwargs):
+        """ httpx.Client que é fechado no cancelamento (o pedido em voo falha de imediato). """
+        client = httpx.Client(**kwargs)
+        try:
+            with self.cancel_scope(client.close): yield client
+        finally: client.close()
+
+    def elapsed_ms(self): return int((time.monotonic() - self.started) * 1000)
@@ -0,0 +1,133 @@
+import os
+import ast
+from collections import deque
+
+# --- ÍNDICE DE TRIGGERS (Aho-Corasick) ---
+# Um autómato com os TRIGGERS de todas as skills, construído em load_skills().
+# Uma passagem pelo prompt devolve todas as skills que fazem match, com posição
+# e comprimento de cada trigger: O(tamanho do prompt), independente do número de skills.
+# Recarregamento a quente: os padrões de uma skill alterada são desligados no autómato
+# principal e os novos vão para um autómato pequeno (overlay), construído em menos de 1ms.
+# Não se volta a ligar o autómato todo (~300ms com 400 skills).
+
+class TriggerIndex:
+    def __init__(self):
+        self._goto = [{}]     # nó -> {carácter: nó}
+        self._fail = [0]
+        self._own = [[]]      # nó -> [id do padrão que acaba aqui]
+        self._out = [[]]      # nó -> [ids incluindo os dos sufixos] (preenchido em build)
+        self.patterns = []    # id -> (chave, trigger, só_no_início)
+        self.skills = []      # Lista de skills a que as chaves se referem (trocada junto com o índice)
+        self.built = False
+        self._by_key = {}     # chave -> [ids]
+        # (chaves desligadas deste autómato, TriggerIndex com os triggers atuais delas): um só
+        # tuplo, trocado de uma vez, para que match() nunca veja metade de um recarregamento
+        self.patch = (frozenset(), None)
+
+    def add(self, key, trigger, startswith=False):
+        """ 'key' identifica a skill (ex: índice em SKILLS_LIST). """
+        trigger = trigger.lower()
+        if not trigger: return
+        node = 0
+        for ch in trigger:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({}); self._fail.append(0); self._own.append([])
+            node = nxt
+        self._own[node].append(len(self.patterns))
+        self._by_key.setdefault(key, []).append(len(self.patterns))
+        self.patterns.append((key, trigger, startswith))
+        self.built = False
+
+    def build(self):
+        """ Liga as transições de falha (BFS) e junta as saídas de cada nó. """
+        self._out = [list(o) for o in self._own]
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                f = self._fail[node]
+                while f and ch not in self._goto[f]: f = self._fail[f]
+                self._fail[child] = self._goto[f].get(ch, 0)
+                self._out[child] += self._out[self._fail[child]]
+                queue.append(child)
+        self.built = True
+        return self
+
+    def match(self, text):
+        """ {chave: [(posição, comprimento, trigger)]}. Triggers 'startswith' só contam na posição 0. """
+        if not self.built: self.build()
+        removed, overlay = self.patch
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        found = {}
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]: node = fail[node]
+            node = goto[node].get(ch, 0)
+            for pid in out[node]:
+                key, trig, startswith = patterns[pid]
+                pos = i - len(trig) + 1
+                if (startswith and pos != 0) or key in removed: continue
+                found.setdefault(key, []).append((pos, len(trig), trig))
+        if overlay is not None:
+            for key, hits in overlay.match(text).items(): found.setdefault(key, []).extend(hits)
+        return found
+
+    def replace(self, skills, keys):
+        """
+        Troca só os triggers das chaves 'keys' (skills recarregadas; as posições não mudaram).
+        O overlay é refeito com todas as skills já recarregadas e trocado de uma vez.
+        """
+        keys = set(keys) | self.patch[0]
+        overlay = TriggerIndex()
+        for i in sorted(keys):
+            for t in skills[i].get('triggers', []): overlay.add(i, t, skills[i].get('trigger_type') == 'startswith')
+        overlay.build()
+        self.patch = (frozenset(keys), overlay)
+        self.skills = skills
+        return self
+
+    def live_patterns(self):
+        return sum(len(ids) for k, ids in self._by_key.items() if k not in self.patch[0])
+
+def build_trigger_index(skills):
+    """ Índice para a lista de skills do assistant (chave = posição na lista). """
+    index = TriggerIndex()
+    index.skills = skills
+    for i, s in enumerate(skills):
+        for t in s.get('triggers', []): index.add(i, t, s.get('trigger_type') == 'startswith')
+    return index.build()
+
+def update_trigger_index(index, skills, changed):
+    """
+    Depois de um recarregamento a quente ('changed' = nomes das skills). Se só mudaram skills
+    que já existiam, as chaves (posições) mantêm-se e só os triggers delas são trocados.
+    Skills novas ou removidas deslocam as posições: aí, ou quando o overlay já pesa mais de
+    um quarto do principal, constrói-se um índice novo.
+    """
+    if [s['name'] for s in skills] != [s['name'] for s in index.skills]: return build_trigger_index(skills)
+    index.replace(skills, [i for i, s in enumerate(skills) if s['name'] in changed])
+    if len(index.patch[1].patterns) * 4 > index.live_patterns(): return build_trigger_index(skills)
+    return index
+
+# --- LEITURA ESTÁTICA DAS SKILLS ---
+
+def static_skill_lists(path):
+    """
+    Listas/strings literais ao nível do módulo de uma skill, lidas por AST (sem importar):
+    {"name", "TRIGGER_TYPE", "TRIGGERS" (None se for calculado), "lists": {NOME: [str]}}.
+    """
+    info = {"name": os.path.splitext(os.path.basename(path))[0], "TRIGGER_TYPE": "contains", "TRIGGERS": None, "lists": {}}
+    with open(path, encoding="utf-8") as f: tree = ast.parse(f.read(), filename=path)
+    for node in tree.body:
+        if not (isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)): continue
+        name = node.targets[0].id
+        try: value = ast.literal_eval(node.value)
+        except ValueError: continue
+        if name == "TRIGGER_TYPE" and isinstance(value, str): info["TRIGGER_TYPE"] = value
+        elif isinstance(value, list) and all(isinstance(v, str) for v in value):
+            info["lists"][name] = value
+            if name == "TRIGGERS": info["TRIGGERS"] = value
+    return info
@@ -0,0 +1,149 @@
+import time
+import threading
+from collections import deque
+from request_utils import RequestContext
+
+# --- ESCALONADOR DE PEDIDOS ---
+# Cada pedido tem o seu RequestContext (id próprio) e entra na fila da sua origem.
+# Um conjunto fixo de workers serve as filas por prioridade; 'reserved' workers ficam
+# sempre livres para a origem mais urgente (a voz não espera por uma pergunta do Discord).
+# Preempção: uma origem só cancela os pedidos das origens listadas em "preempts"
+# (uma wake word nova substitui o pedido de voz anterior, mas não o chat da UI).
+
+SOURCES = {
+    #              prioridade (0 = mais urgente), máx. na fila, origens que cancela
+    "voz":        {"priority": 0, "queue": 2,  "preempts": ["voz", "background"]},
+    "ui":         {"priority": 1, "queue": 8,  "preempts": []},
+    "cli":        {"priority": 1, "queue": 8,  "preempts": []},
+    "discord":    {"priority": 2, "queue": 16, "preempts": []},
+    "background": {"priority": 3, "queue": 32, "preempts": []},
+}
+
+class SchedulerFull(Exception):
+    """ A fila desta origem está cheia. """
+
+class Job:
+    def __init__(self, ctx, fn):
+        self.ctx = ctx
+        self.fn = fn
+        self.submitted = time.monotonic()
+        self.started = None
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        """ Resultado de fn(ctx) (None se cancelado, falhou ou ainda não acabou). """
+        self.done.wait(timeout)
+        return self.result
+
+class _SourceStats:
+    def __init__(self):
+        self.submitted = self.completed = self.cancelled = self.rejected = self.preempted = self.errors = 0
+        self.waits = deque(maxlen=200)      # Tempo na fila (s)
+        self.runs = deque(maxlen=200)       # Tempo a correr (s)
+        self.finished_at = deque(maxlen=1000)
+
+    def summary(self, queued, running):
+        def pct(v, p):
+            v = sorted(v)
+            return int(v[min(len(v) - 1, int(len(v) * p))] * 1000) if v else 0
+        now = time.monotonic()
+        return {"submitted": self.submitted, "completed": self.completed, "cancelled": self.cancelled,
+                "preempted": self.preempted, "rejected": self.rejected, "errors": self.errors,
+                "queued": queued, "running": running,
+                "per_min": sum(1 for t in self.finished_at if now - t <= 60),
+                "wait_p50_ms": pct(self.waits, 0.5), "wait_p95_ms": pct(self.waits, 0.95),
+                "run_p50_ms": pct(self.runs, 0.5), "run_p95_ms": pct(self.runs, 0.95)}
+
+class RequestScheduler:
+    def __init__(self, workers=3, reserved=1, sources=None):
+        self.sources = {k: dict(v) for k, v in SOURCES.items()}
+        for k, v in (sources or {}).items(): self.sources.setdefault(k, {"priority": 2, "queue": 8, "preempts": []}).update(v)
+        self.order = sorted(self.sources, key=lambda s: self.sources[s]["priority"])
+        self.top = self.sources[self.order[0]]["priority"]
+        self.workers = max(1, workers)
+        self.reserved = min(reserved, self.workers - 1)
+        self.queues = {s: deque() for s in self.sources}
+        self.running = {s: 0 for s in self.sources}
+        self.active = {}    # id -> RequestContext aberto (a gravar, em fila ou a correr)
+        self.stats = {s: _SourceStats() for s in self.sources}
+        self._cond = threading.Condition()
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, daemon=True, name=f"sched-{i}").start()
+
+    def new_context(self, source, session=None):
+        """ Abre um pedido: aplica já as regras de preempção (antes de gravar/submeter). """
+        if source not in self.sources: raise ValueError(f"Origem desconhecida: {source}")
+        ctx = RequestContext(source, session=session)
+        preempts = set(self.sources[source]["preempts"])
+        with self._cond:
+            victims = [c for c in self.active.values() if c.source in preempts]
+            self.active[ctx.id] = ctx
+            for v in victims: self.stats[v.source].preempted += 1
+        for v in victims: v.cancel(f"preemptado por {source} {ctx.id}")
+        return ctx
+
+    def submit(self, ctx, fn):
+        """ Põe fn(ctx) na fila da origem do contexto. SchedulerFull se a fila estiver cheia. """
+        job = Job(ctx, fn)
+        with self._cond:
+            q = self.queues[ctx.source]
+            if len(q) >= self.sources[ctx.source]["queue"]:
+                self.active.pop(ctx.id, None)
+                self.stats[ctx.source].rejected += 1
+                raise SchedulerFull(ctx.source)
+            q.append(job)
+            self.stats[ctx.source].submitted += 1
+            self._cond.notify()
+        return job
+
+    def close(self, ctx):
+        """ Fecha um contexto que não chegou a ter trabalho (ex: nada ouvido). """
+        with self._cond: self.active.pop(ctx.id, None)
+
+    def _next(self):
+        """ Próximo job (com o lock). Os não urgentes deixam 'reserved' workers livres. """
+        low_busy = sum(n for s, n in self.running.items() if self.sources[s]["priority"] > self.top)
+        for source in self.order:
+            q = self.queues[source]
+            while q and q[0].ctx.cancelled:
+                job = q.popleft()
+                self.stats[source].cancelled += 1
+                self.active.pop(job.ctx.id, None)
+                job.done.set()
+            if not q: continue
+            if self.sources[source]["priority"] > self.top and low_busy >= self.workers - self.reserved: continue
+            return q.popleft()
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next()
+                source = job.ctx.source
+                self.running[source] += 1
+            job.started = time.monotonic()
+            try: job.result = job.fn(job.ctx)
+            except Exception as e:
+                job.error = e
+                print(f"⚠️ Pedido {job.ctx.id} ({source}) falhou: {e}")
+            end = time.monotonic()
+            with self._cond:
+                self.running[source] -= 1
+                self.active.pop(job.ctx.id, None)
+                st = self.stats[source]
+                st.waits.append(job.started - job.submitted); st.runs.append(end - job.started)
+                if job.ctx.cancelled: st.cancelled += 1
+                elif job.error is not None: st.errors += 1
+                else: st.completed += 1; st.finished_at.append(end)
+                self._cond.notify_all()
+            job.done.set()
+
+    def summary(self):
+        with self._cond:
+            return {"workers": self.workers, "reserved": self.reserved,
+                    "sources": {s: self.stats[s].summary(len(self.queues[s]), self.running[s]) for s in self.order}}
@@ -0,0 +1,270 @@
+import os
+import ast
+import sys
+import json
+import glob
+import time
+import threading
+import importlib.util
+import config
+
+# --- CARREGAMENTO PREGUIÇOSO DAS SKILLS ---
+# No arranque só se lê o manifesto de cada skill (AST: TRIGGERS, TRIGGER_TYPE, funções
+# definidas, REQUIRES_CONFIG). O módulo pesado (discord, miio, tinytuya, ...) só é
+# importado no primeiro match, quando o daemon é preciso, ou logo no arranque se a
+# skill regista rotas Flask. TRIGGERS calculados a partir do config obrigam a um import
+# na primeira vez; o resultado fica em cache (chave: mtime da skill + mtime do config).
+# Recarregamento a quente: watch() compara os mtimes da pasta e volta a importar só
+# as skills alteradas (ex: skill_lucid reescrita pelo skill_dream), sem reiniciar o assistente.
+
+HOOKS = ("handle", "register_routes", "init_skill_daemon", "stop_skill_daemon", "get_status_for_device")
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def rss_bytes():
+    """ Memória residente do processo (Linux: /proc/self/statm). """
+    try:
+        with open("/proc/self/statm") as f: return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError): return 0
+
+def read_manifest(path):
+    """ Manifesto barato de uma skill, sem a importar. TRIGGERS=None se não for literal. """
+    with open(path, encoding="utf-8") as f: tree = ast.parse(f.read(), filename=path)
+    m = {"name": os.path.splitext(os.path.basename(path))[0], "path": path, "mtime": os.path.getmtime(path),
+         "trigger_type": "contains", "triggers": None, "hooks": [], "requires": [], "deadline": None, "wants_ctx": False}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name in HOOKS:
+            m["hooks"].append(node.name)
+            if node.name == "handle":  # handle(..., ctx=None) recebe o RequestContext
+                m["wants_ctx"] = any(a.arg == "ctx" for a in node.args.args + node.args.kwonlyargs)
+        elif isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            name = node.targets[0].id
+            if name not in ("TRIGGERS", "TRIGGER_TYPE", "REQUIRES_CONFIG", "DEADLINE"): continue
+            try: value = ast.literal_eval(node.value)
+            except ValueError: continue
+            if name == "TRIGGERS": m["triggers"] = list(value)
+            elif name == "TRIGGER_TYPE": m["trigger_type"] = value
+            elif name == "DEADLINE": m["deadline"] = value
+            else: m["requires"] = list(value)
+    return m
+
+class _Routes:
+    """ Fachada do Flask para register_routes: num recarregamento troca a view_function do endpoint. """
+    def __init__(self, app): self.app = app
+
+    def add_url_rule(self, rule, endpoint=None, view_func=None, **options):
+        endpoint = endpoint or view_func.__name__
+        if endpoint in self.app.view_functions:
+            self.app.view_functions[endpoint] = view_func
+            return
+        try: self.app.add_url_rule(rule, endpoint, view_func, **options)
+        except AssertionError as e: print(f"⚠️ Rota nova '{rule}' só fica ativa após reiniciar: {e}")
+
+    def route(self, rule, **options):
+        def deco(f):
+            self.add_url_rule(rule, options.pop("endpoint", None), f, **options)
+            return f
+        return deco
+
+    def __getattr__(self, name): return getattr(self.app, name)
+
+class SkillLoader:
+    def __init__(self, skills_dir, app=None, deadlines=None, default_deadline=5.0, lazy_daemons=(), cache_path=None):
+        self.skills_dir = skills_dir
+        self.app = app
+        self.deadlines = deadlines or {}
+        self.default_deadline = default_deadline
+        self.lazy_daemons = set(lazy_daemons)
+        self.cache_path = cache_path or os.path.join(skills_dir, ".manifest_cache.json")
+        self.config_mtime = os.path.getmtime(config.__file__) if getattr(config, "__file__", None) else 0
+        self.skipped = {}
+        self._failed = {}     # path -> mtime da versão que não importou (não se tenta outra vez)
+        self._lock = threading.RLock()
+        self._cache = self._load_cache()
+
+    # --- Cache dos TRIGGERS calculados ---
+    def _load_cache(self):
+        try:
+            with open(self.cache_path) as f: return json.load(f)
+        except (OSError, ValueError): return {}
+
+    def _save_cache(self):
+        try:
+            with open(self.cache_path, "w") as f: json.dump(self._cache, f)
+        except OSError as e: print(f"⚠️ Não consegui gravar a cache de manifestos: {e}")
+
+    def _cached_triggers(self, m):
+        c = self._cache.get(m["name"])
+        if c and c.get("mtime") == m["mtime"] and c.get("config_mtime") == self.config_mtime: return c
+        return None
+
+    # --- Descoberta ---
+    def _files(self):
+        return sorted(glob.glob(os.path.join(self.skills_dir, "skill_*.py")))
+
+    def _load(self, f):
+        """ Manifesto -> entrada pronta (None se falta config). Devolve (entrada, cache_alterada). """
+        m = read_manifest(f)
+        missing = [k for k in m["requires"] if not getattr(config, k, None)]
+        if missing:
+            self.skipped[m["name"]] = f"config em falta: {', '.join(missing)}"
+            return None, False
+        self.skipped.pop(m["name"], None); self.skipped.pop(os.path.basename(f), None)
+        entry, dirty = self._entry(m), False
+        if m["triggers"] is None:
+            cached = self._cached_triggers(m)
+            if cached:
+                entry["triggers"], entry["trigger_type"] = cached["triggers"], cached["trigger_type"]
+            else:
+                # TRIGGERS calculados (ex: a partir do config): importa uma vez e guarda
+                self.ensure(entry)
+                self._cache[m["name"]] = {"mtime": m["mtime"], "config_mtime": self.config_mtime,
+                                          "triggers": entry["triggers"], "trigger_type": entry["trigger_type"]}
+                dirty = True
+        if "register_routes" in m["hooks"]: self.ensure(entry)  # As rotas têm de existir antes do Flask arrancar
+        return entry, dirty
+
+    def discover(self):
+        """ Lista de entradas no formato do SKILLS_LIST (handle/get_status são proxies preguiçosos). """
+        if not os.path.exists(self.skills_dir): return []
+        if self.skills_dir not in sys.path: sys.path.append(self.skills_dir)
+        entries, dirty = [], False
+        for f in self._files():
+            try:
+                entry, d = self._load(f)
+                dirty |= d
+                if entry is not None: entries.append(entry)
+            except Exception as e:
+                self.skipped[os.path.basename(f)] = str(e)
+                print(f"⚠️ Skill {os.path.basename(f)} ignorada: {e}")
+        if dirty: self._save_cache()
+        loaded = sum(1 for e in entries if e["module"] is not None)
+        print(f"📦 Skills: {len(entries)} no manifesto, {loaded} importadas no arranque, {len(self.skipped)} ignoradas")
+        return entries
+
+    def _entry(self, m):
+        entry = {
+            "name": m["name"], "path": m["path"], "mtime": m["mtime"], "module": None,
+            "triggers": m["triggers"] or [], "trigger_type": m["trigger_type"],
+            "deadline": self.deadlines.get(m["name"], m["deadline"] or self.default_deadline),
+            "hooks": m["hooks"], "wants_ctx": m["wants_ctx"], "daemon_started": False, "import_ms": None, "rss_kb": None,
+        }
+        entry["handle"] = self._proxy(entry, "handle") if "handle" in m["hooks"] else None
+        entry["get_status"] = self._proxy(entry, "get_status_for_device") if "get_status_for_device" in m["hooks"] else None
+        return entry
+
+    def _proxy(self, entry, attr):
+        def call(*args, **kwargs):
+            mod = self.ensure(entry, start_daemon=entry["name"] in self.lazy_daemons)
+            return getattr(mod, attr)(*args, **kwargs)
+        call.__name__ = attr
+        return call
+
+    # --- Import ---
+    def ensure(self, entry, start_daemon=False):
+        """ Importa a skill (uma vez) e, se pedido, arranca o daemon. """
+        with self._lock:
+            if entry["module"] is None:
+                rss0, t0 = rss_bytes(), time.perf_counter()
+                spec = importlib.util.spec_from_file_location(entry["name"], entry["path"])
+                mod = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(mod)
+                entry["import_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+                entry["rss_kb"] = max(0, rss_bytes() - rss0) // 1024
+                entry["module"] = mod
+                entry["triggers"] = list(getattr(mod, 'TRIGGERS', entry["triggers"]))
+                entry["trigger_type"] = getattr(mod, 'TRIGGER_TYPE', entry["trigger_type"])
+                entry["deadline"] = self.deadlines.get(entry["name"], getattr(mod, 'DEADLINE', entry["deadline"]))
+                if hasattr(mod, 'register_routes') and self.app is not None: mod.register_routes(_Routes(self.app))
+                print(f"📦 Skill '{entry['name']}' importada em {entry['import_ms']:.0f}ms (+{entry['rss_kb'] / 1024:.1f} MB RSS)")
+        if start_daemon: self.start_daemon(entry)
+        return entry["module"]
+
+    def start_daemon(self, entry):
+        with self._lock:
+            if entry["daemon_started"] or "init_skill_daemon" not in entry["hooks"]: return
+            entry["daemon_started"] = True
+        self.ensure(entry).init_skill_daemon()
+
+    def stop_daemon(self, entry):
+        """ Pára o daemon através do hook opcional stop_skill_daemon(). False se não o souber parar. """
+        if not entry["daemon_started"]: return True
+        mod = entry["module"]
+        if mod is None or not hasattr(mod, "stop_skill_daemon"): return False
+        try: mod.stop_skill_daemon()
+        except Exception as e:
+            print(f"⚠️ stop_skill_daemon de '{entry['name']}' falhou: {e}")
+            return False
+        entry["daemon_started"] = False
+        return True
+
+    # --- Recarregamento a quente ---
+    def refresh(self, entries):
+        """
+        Compara os mtimes da pasta com as entradas atuais. Devolve (nova_lista, mudanças) ou
+        (entries, []) se nada mudou. A lista antiga não é tocada: o chamador troca a referência.
+        Skill alterada: o módulo novo é importado ANTES de largar o antigo; se tiver erros
+        (ex: código gerado pelo skill_dream) fica a versão anterior.
+        """
+        current = {e["path"]: e for e in entries}
+        files = self._files()
+        new_list, changes, dirty = [], [], False
+        for f in files:
+            old, mtime = current.get(f), None
+            try:
+                mtime = os.path.getmtime(f)
+                if (old is not None and mtime == old["mtime"]) or self._failed.get(f) == mtime:
+                    if old is not None: new_list.append(old)
+                    continue
+                entry, d = self._load(f)
+                dirty |= d
+                if entry is None:
+                    if old is not None: self._retire(old); changes.append(f"-{old['name']}")
+                    continue
+                if old is not None and (old["module"] is not None or old["daemon_started"]):
+                    self.ensure(entry)  # Importa já: rotas e daemon passam para o módulo novo
+                    if old["daemon_started"]:
+                        if self.stop_daemon(old): self.start_daemon(entry)
+                        else:
+                            entry["daemon_started"] = True  # Não arranca um segundo daemon por cima do antigo
+                            print(f"⚠️ '{old['name']}' sem stop_skill_daemon: o daemon antigo continua até reiniciar.")
+                new_list.append(entry)
+                changes.append(f"{'~' if old is not None else '+'}{entry['name']}")
+            except Exception as e:
+                if old is not None: new_list.append(old)
+                self._failed[f] = mtime
+                self.skipped[os.path.basename(f)] = str(e)
+                print(f"⚠️ Recarregar {os.path.basename(f)} falhou (fica a versão anterior): {e}")
+        for path, old in current.items():
+            if path not in files:
+                self._retire(old); changes.append(f"-{old['name']}")
+        if dirty: self._save_cache()
+        return (new_list, changes) if changes else (entries, [])
+
+    def _retire(self, entry):
+        if entry["daemon_started"] and not self.stop_daemon(entry):
+            print(f"⚠️ Skill '{entry['name']}' removida mas o daemon continua até reiniciar.")
+
+    def watch(self, get_entries, on_change, interval=2.0):
+        """ Thread que chama on_change(nova_lista, mudanças) quando a pasta das skills muda. """
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    t0 = time.perf_counter()
+                    entries, changes = self.refresh(get_entries())
+                    if changes:
+                        on_change(entries, changes)
+                        print(f"♻️ Skills recarregadas ({', '.join(changes)}) em {(time.perf_counter() - t0) * 1000:.0f}ms")
+                except Exception as e: print(f"⚠️ Erro no recarregamento de skills: {e}")
+        t = threading.Thread(target=loop, daemon=True, name="skill-reload")
+        t.start()
+        return t
+
+    def boot_daemons(self, entries):
+        """ Daemons que arrancam com o assistente (os de SKILL_LAZY_DAEMONS esperam pelo primeiro match). """
+        return [e for e in entries if "init_skill_daemon" in e["hooks"] and e["name"] not in self.lazy_daemons]
+
+    def stats(self, entries):
+        return {"skills": {e["name"]: {"imported": e["module"] is not None, "import_ms": e["import_ms"],
+                                       "rss_kb": e["rss_kb"], "daemon": e["daemon_started"]} for e in entries},
+                "skipped": self.skipped, "rss_mb": round(rss_bytes() / 2 ** 20, 1)}
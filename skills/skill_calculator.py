@@ -1,4 +1,5 @@
 import re
+from text_utils import to_digits
 
 # --- Configuração da Skill ---
 TRIGGER_TYPE = "contains"
@@ -17,11 +18,22 @@ TRIGGERS = [
 # As palavras de operação (como 'a dividir') devem ser mantidas para o cálculo.
 PREFIXES_TO_CLEAN = ["quanto é", "quantos são", "calcula", "diz-me", "sabes"]
 
+# Operadores por extenso -> símbolos (uma regex, alternativas mais longas primeiro)
+OPERATORS = {
+    "multiplicado por": "*", "vezes": "*", "x": "*",
+    "a dividir por": "/", "dividido por": "/", "a dividir": "/", "dividido": "/",
+    "somado a": "+", "mais": "+",
+    "subtraído de": "-", "menos": "-",
+}
+_OPERATORS_RE = re.compile("|".join(re.escape(k) for k in sorted(OPERATORS, key=len, reverse=True)))
+
 def handle(user_prompt_lower, user_prompt_full):
     """ Tenta calcular uma expressão matemática detetada em qualquer parte da frase. """
     
-    # 1. Limpeza inteligente: Remove apenas prefixos de pergunta
-    expression_str = user_prompt_lower
+    # 1. Números por extenso já convertidos pelo router (NormalizedPrompt.digits)
+    expression_str = getattr(user_prompt_lower, 'digits', None) or to_digits(user_prompt_lower)
+
+    # Limpeza inteligente: Remove apenas prefixos de pergunta
     for prefix in PREFIXES_TO_CLEAN:
         if expression_str.startswith(prefix):
             expression_str = expression_str[len(prefix):].strip()
@@ -30,25 +42,9 @@ def handle(user_prompt_lower, user_prompt_full):
     try:
         expr = re.sub(r"[?!]", "", expression_str)
         expr = expr.replace(",", ".")
-        
-        # Conversão de palavras numéricas para dígitos
-        word_to_num = {
-            r'\bum\b': '1', r'\bdois\b': '2', r'\btrês\b': '3', r'\bquatro\b': '4',
-            r'\bcinco\b': '5', r'\bseis\b': '6', r'\bsete\b': '7', r'\boito\b': '8',
-            r'\bnove\b': '9', r'\bdez\b': '10', r'\bzero\b': '0'
-        }
-        for word_re, num in word_to_num.items():
-            expr = re.sub(word_re, num, expr)
 
         # Substituição de operadores naturais por matemáticos
-        expr = expr.replace("x", "*").replace("vezes", "*").replace("multiplicado por", "*")
-        
-        # Tratamento específico para a divisão
-        expr = expr.replace("a dividir por", "/").replace("dividido por", "/")
-        expr = expr.replace("a dividir", "/").replace("dividido", "/")
-        
-        expr = expr.replace("mais", "+").replace("somado a", "+")
-        expr = expr.replace("menos", "-").replace("subtraído de", "-")
+        expr = _OPERATORS_RE.sub(lambda m: OPERATORS[m.group(0)], expr)
 
         # Limpeza final: mantém apenas números e operadores
         allowed_chars_pattern = r"[^0-9\.\+\-\*\/\(\)\s]"
@@ -1,6 +1,6 @@
 import config 
 import re
-import unicodedata
+from text_utils import fold
 import asyncio
 
 try:
@@ -19,20 +19,12 @@ except ImportError as e:
 
 # --- Configuração da Skill ---
 TRIGGER_TYPE = "contains"
+REQUIRES_CONFIG = ["CHACON_CLOUD_USER", "CHACON_CLOUD_PASS"]
 
 # Palavras-chave de Ação
 ACTIONS_ON = ["liga", "ligar", "acende", "acender", "ativa", "põe"]
 ACTIONS_OFF = ["desliga", "desligar", "apaga", "apagar", "desativa", "tira"]
 
-# --- FUNÇÃO HELPER PARA REMOVER ACENTOS ---
-def _normalize_string(text):
-    try:
-        return unicodedata.normalize('NFD', text.lower()) \
-                          .encode('ascii', 'ignore') \
-                          .decode('utf-8')
-    except Exception:
-        return text.lower()
-
 # --- FUNÇÃO DE TRIGGERS ---
 # Estas são as alcunhas que vamos procurar na conta da cloud
 TRIGGERS_NICKNAMES = [
@@ -75,7 +67,7 @@ async def _async_control_chacon(action_str):
         
         # Loop para encontrar um dispositivo que corresponda às nossas alcunhas
         for device_id, device_data in all_devices_dict.items():
-            device_name_norm = _normalize_string(device_data.get('name', ''))
+            device_name_norm = fold(device_data.get('name', ''))
             
             if device_name_norm in TRIGGERS_NICKNAMES:
                 found_device_id = device_id
@@ -124,7 +116,7 @@ def handle(user_prompt_lower, user_prompt_full):
         return "A skill Chacon falhou a carregar. Vê os logs para o erro exato."
 
     # 1. Verifica se o dispositivo foi mencionado
-    prompt_norm = _normalize_string(user_prompt_lower)
+    prompt_norm = fold(user_prompt_lower)  # Já vem calculado do router (text_utils)
     if not any(nickname in prompt_norm for nickname in TRIGGERS_NICKNAMES):
         return None # Não é para este dispositivo
 
@@ -9,6 +9,7 @@ from datetime import datetime
 # --- Configuração da Skill ---
 # Esta skill não é ativada por voz local, serve apenas para carregar o daemon.
 TRIGGER_TYPE = "contains"
+REQUIRES_CONFIG = ["DISCORD_BOT_TOKEN"]
 TRIGGERS = [] 
 
 # --- Definições de Permissões ---
@@ -76,16 +77,17 @@ def _process_standard_quota(user_id, prompt_lower):
     else:
         return False, f"Atingiste o teu limite diário de {limit} perguntas ao cérebro do Phantasma (as ferramentas de tempo e cálculo continuam disponíveis)."
 
-async def _send_to_phantasma(prompt):
-    """ Envia o texto para a API local e recebe a resposta """
+async def _send_to_phantasma(prompt, user_id=None):
+    """ Envia o texto para a API local e recebe a resposta (uma conversa por utilizador) """
     async with httpx.AsyncClient(timeout=120) as http_client:
         try:
-            payload = {"prompt": prompt}
+            payload = {"prompt": prompt, "source": "discord", "session": str(user_id) if user_id else None}
             # Usa a API local para processar (garante que passa pelo route_and_respond)
             response = await http_client.post(PHANTASMA_API_URL, json=payload)
+            if response.status_code == 429: return response.json().get("response") or "Estou ocupado."
             response.raise_for_status()
             data = response.json()
-            return data.get("response", "...")
+            return data.get("response") or "..."
         except Exception as e:
             return f"Erro de comunicação interna: {e}"
 
@@ -132,7 +134,7 @@ async def on_message(message):
     print(f"[Discord Skill] Comando aceite de {message.author.name}: {prompt}")
 
     async with message.channel.typing():
-        response_text = await _send_to_phantasma(prompt)
+        response_text = await _send_to_phantasma(prompt, message.author.id)
         
         # Corta a resposta se exceder o limite do Discord (2000 chars)
         if len(response_text) > 2000:
@@ -9,8 +9,8 @@ import os
 import glob
 import ast
 import httpx
-import ollama
 import config
+from llm_utils import gateway
 from tools import search_with_searxng
 from data_utils import save_to_rag, retrieve_from_rag
 
@@ -93,8 +93,7 @@ def _consolidate_memories():
         4. OUTPUT FORMAT: {{ "tags": [], "mermaid": "graph TD; ..." }}
         """
         
-        client = ollama.Client(timeout=config.OLLAMA_TIMEOUT)
-        resp = client.chat(model=config.OLLAMA_MODEL_PRIMARY, messages=[{'role': 'user', 'content': prompt}])
+        resp = gateway().chat([{'role': 'user', 'content': prompt}], options={"num_predict": -1})
         merged = _extract_json(resp['message']['content'])
         
         if merged:
@@ -219,9 +218,10 @@ def _perform_coding_dream():
     """
     
     try:
-        client = ollama.Client(timeout=config.OLLAMA_TIMEOUT * 2)
         print("👾 [Lucid Dream] Ollama a gerar rascunho inicial...")
-        resp = client.chat(model=config.OLLAMA_MODEL_PRIMARY, messages=[{'role': 'user', 'content': draft_prompt}])
+        # Código completo: sem o limite de tokens das respostas faladas (e com o dobro do prazo)
+        resp = gateway().chat([{'role': 'user', 'content': draft_prompt}], options={"num_predict": -1},
+                              timeout=getattr(config, 'OLLAMA_TIMEOUT', 600) * 2)
         ollama_draft = _extract_python_code(resp['message']['content'])
         
         # 3. Fase 2: Gemini refina e expande o código (Comunicação entre modelos)
@@ -256,8 +256,7 @@ def _perform_web_dream():
     introspection_prompt = f"{config.SYSTEM_PROMPT}\nMEMORIES: {recent_context}\nTASK: Generate ONE search query.\nOUTPUT: Query string ONLY."
     
     try:
-        client = ollama.Client(timeout=config.OLLAMA_TIMEOUT)
-        resp = client.chat(model=config.OLLAMA_MODEL_PRIMARY, messages=[{'role': 'user', 'content': introspection_prompt}])
+        resp = gateway().chat([{'role': 'user', 'content': introspection_prompt}])
         query = resp['message']['content'].strip().replace('"', '')
         print(f"💤 [Dream] Tópico: '{query}'")
         
@@ -265,7 +264,7 @@ def _perform_web_dream():
         if not results or len(results) < 10: return "Sonho vazio."
         
         internalize_prompt = f"SYSTEM: Data Extractor. JSON ONLY.\nCONTEXT: {results}\nTASK: Extract tags(PT) and facts(EN S->P->O)."
-        resp_final = client.chat(model=config.OLLAMA_MODEL_PRIMARY, messages=[{'role': 'user', 'content': internalize_prompt}])
+        resp_final = gateway().chat([{'role': 'user', 'content': internalize_prompt}], options={"num_predict": -1})
         json_data = _extract_json(resp_final['message']['content'])
         
         if json_data:
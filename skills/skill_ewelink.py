@@ -12,6 +12,7 @@ CACHE_FILE = "/opt/phantasma/cache/ewelink_cache.json"
 POLL_INTERVAL = 60  
 
 TRIGGER_TYPE = "contains"
+REQUIRES_CONFIG = ["EWELINK_USERNAME", "EWELINK_PASSWORD"]
 TRIGGERS = ["carregador", "carro", "ewelink", "tomada do carro"]
 
 ACTIONS_ON = ["liga", "ligar", "acende", "ativa", "inicia", "põe a carregar"]
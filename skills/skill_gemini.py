@@ -1,6 +1,7 @@
 import re
 import httpx
 import config
+from contextlib import nullcontext
 
 # --- Configuração da Skill ---
 TRIGGER_TYPE = "startswith"
@@ -22,9 +23,10 @@ TRIGGERS = [
 GEMINI_MODEL_NAME = "gemini-2.5-flash"
 GEMINI_API_URL = f"https://generativelanguage.googleapis.com/v1/models/{GEMINI_MODEL_NAME}:generateContent"
 
-def handle(user_prompt_lower, user_prompt_full):
+def handle(user_prompt_lower, user_prompt_full, ctx=None):
     """
     Extrai uma pergunta e envia-a para a API do Google Gemini.
+    'ctx' (RequestContext): uma wake word nova fecha o cliente e larga o pedido a meio.
     """
     
     # 1. Verificar se a API Key está configurada
@@ -67,8 +69,9 @@ def handle(user_prompt_lower, user_prompt_full):
     url_with_key = f"{GEMINI_API_URL}?key={config.GEMINI_API_KEY}"
 
     try:
-        client = httpx.Client(timeout=30.0) # Timeout generoso
-        response = client.post(url_with_key, headers=headers, json=payload)
+        # Timeout generoso
+        with (ctx.http_client(timeout=30.0) if ctx else nullcontext(httpx.Client(timeout=30.0))) as client:
+            response = client.post(url_with_key, headers=headers, json=payload)
         response.raise_for_status() # Lança erro se a API retornar 4xx ou 5xx
         
         data = response.json()
@@ -91,5 +94,6 @@ def handle(user_prompt_lower, user_prompt_full):
         print(f"ERRO (Skill Gemini): A API do Gemini retornou um erro {e.response.status_code}: {e.response.text}")
         return f"Ups! Tentei ligar à Gemini, mas a chamada falhou com o erro {e.response.status_code}."
     except Exception as e:
+        if ctx and ctx.cancelled: return None
         print(f"ERRO CRÍTICO (Skill Gemini): {e}")
         return "Ocorreu um erro inesperado ao tentar falar com os meus amigos da Google."
@@ -1,7 +1,6 @@
-import config
-import ollama
 import json
 from data_utils import save_to_rag
+from llm_utils import gateway
 
 TRIGGER_TYPE = "startswith"
 TRIGGERS = ["memoriza", "lembra-te disto", "grava isto", "guarda isto", "anota"]
@@ -45,11 +44,7 @@ def handle(user_prompt_lower, user_prompt_full):
     """
 
     try:
-        client = ollama.Client(timeout=config.OLLAMA_TIMEOUT)
-        resp = client.chat(
-            model=config.OLLAMA_MODEL_PRIMARY, 
-            messages=[{'role': 'user', 'content': structure_prompt}]
-        )
+        resp = gateway().chat([{'role': 'user', 'content': structure_prompt}])
 
         json_output = resp['message']['content'].strip()
         
@@ -39,13 +39,19 @@ def _collect_stats():
     except: pass
     return stats
 
+_STOP = threading.Event()
+
 def init_skill_daemon():
     def loop():
-        while True:
+        while not _STOP.is_set():
             _save_cache(_collect_stats())
-            time.sleep(POLL_INTERVAL)
+            _STOP.wait(POLL_INTERVAL)
+    _STOP.clear()
     threading.Thread(target=loop, daemon=True).start()
 
+def stop_skill_daemon():
+    _STOP.set()
+
 def handle(user_prompt_lower, user_prompt_full):
     # CRÍTICO: Só responde a temperatura se for da CPU ou Sistema.
     # Se houver uma localização (WC, Sala, etc), ignora e deixa para a skill_tuya.
@@ -17,6 +17,7 @@ except ImportError:
 
 # --- Configuração ---
 TRIGGER_TYPE = "contains"
+REQUIRES_CONFIG = ["TUYA_DEVICES"]  # Sem dispositivos Tuya o tinytuya nem é importado
 CACHE_FILE = "/opt/phantasma/cache/tuya_cache.json"
 PORTS_TO_LISTEN = [6666, 6667]
 POLL_COOLDOWN = 10 
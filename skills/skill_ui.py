@@ -293,7 +293,7 @@ def handle_request():
                 addToChatLog(prompt, 'user'); chatInput.value = ''; chatInput.style.height = '24px'; 
                 showTypingIndicator(); 
                 try {
-                    const res = await fetch('/comando', { method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify({prompt}) });
+                    const res = await fetch('/comando', { method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify({prompt, source: 'ui'}) });
                     const data = await res.json(); 
                     if (data.response) addToChatLog(data.response, 'ia'); else removeTypingIndicator();
                 } catch (e) { removeTypingIndicator(); addToChatLog('Erro rede.', 'ia'); }
@@ -1,6 +1,6 @@
 import re
 import httpx
-import unicodedata
+from text_utils import fold
 import config
 import json
 import os
@@ -25,12 +25,6 @@ _LOCATIONS_CACHE = {}
 
 # --- Helpers ---
 
-def _normalize(text):
-    try:
-        return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('utf-8').lower()
-    except:
-        return text.lower()
-
 def _get_moon_phase():
     try:
         known_new_moon = datetime(2000, 1, 6)
@@ -89,14 +83,14 @@ def _get_city_id(city_name):
                 data = resp.json()
                 for entry in data.get('data', []):
                     # Guarda normalizado: "lisboa" -> 1110600
-                    norm_name = _normalize(entry['local'])
+                    norm_name = fold(entry['local'])
                     _LOCATIONS_CACHE[norm_name] = entry['globalIdLocal']
         except Exception as e:
             print(f"[Weather] Falha ao obter lista de cidades: {e}")
             return None
 
     # Tenta encontrar a cidade
-    return _LOCATIONS_CACHE.get(_normalize(city_name))
+    return _LOCATIONS_CACHE.get(fold(city_name))
 
 def _fetch_city_data(global_id):
     result = {"timestamp": time.time(), "city_id": global_id}
@@ -155,17 +149,23 @@ def _save_cache(data):
     except Exception as e:
         print(f"[Weather] Erro cache: {e}")
 
+_STOP = threading.Event()
+
 def _daemon_loop():
-    while True:
+    while not _STOP.is_set():
         # O Daemon guarda apenas a cidade PADRÃO
         data = _fetch_city_data(DEFAULT_CITY_ID)
         if data: _save_cache(data)
-        time.sleep(POLL_INTERVAL)
+        _STOP.wait(POLL_INTERVAL)
 
 def init_skill_daemon():
     print("[Weather] Daemon iniciado.")
+    _STOP.clear()
     threading.Thread(target=_daemon_loop, daemon=True).start()
 
+def stop_skill_daemon():
+    _STOP.set()
+
 # --- Handler ---
 
 def handle(user_prompt_lower, user_prompt_full):
@@ -31,6 +31,7 @@ VACUUM_HOME = ["base", "casa", "volta", "carrega", "recolhe"]
 
 # --- Configuração da Skill (Triggers Dinâmicos) ---
 TRIGGER_TYPE = "contains"
+REQUIRES_CONFIG = ["MIIO_DEVICES"]
 
 def _get_triggers():
     """ Gera triggers baseados nos dispositivos configurados no config.py """
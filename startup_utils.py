@@ -0,0 +1,78 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# --- ARRANQUE PARALELO ---
+# Cada fase corre na sua thread e fica cronometrada. Quem depende de outra fase
+# chama wait(nome). No fim imprime-se um relatório com o tempo de cada fase.
+
+class Startup:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.timings = {}    # nome -> (início, duração) em segundos desde t0
+        self.errors = {}
+        self.results = {}
+        self._done = {}
+        self._lock = threading.Lock()
+
+    def _event(self, name):
+        with self._lock: return self._done.setdefault(name, threading.Event())
+
+    def expect(self, *names):
+        """ Fases que ainda não começaram mas que o relatório deve esperar. """
+        for name in names: self._event(name)
+
+    @contextmanager
+    def phase(self, name):
+        """ Cronometra um bloco na thread atual. """
+        start = time.perf_counter()
+        try: yield
+        except Exception as e:
+            self.errors[name] = str(e)
+            print(f"❌ Arranque '{name}': {e}")
+        finally:
+            self.timings[name] = (start - self.t0, time.perf_counter() - start)
+            self._event(name).set()
+
+    def run(self, name, fn, *args):
+        """ Corre 'fn' numa thread de fundo como a fase 'name'. """
+        self._event(name)
+        def target():
+            with self.phase(name): self.results[name] = fn(*args)
+        threading.Thread(target=target, name=f"boot-{name}", daemon=True).start()
+
+    def mark(self, name, started):
+        """ Regista uma fase medida fora do orquestrador (ex: processo dedicado). """
+        self.timings[name] = (started - self.t0, time.perf_counter() - started)
+        self._event(name).set()
+
+    def fail(self, name, started, error):
+        """ Regista uma fase medida fora do orquestrador que não chegou a arrancar. """
+        self.errors[name] = str(error)
+        print(f"❌ Arranque '{name}': {error}")
+        self.mark(name, started)
+
+    def wait(self, name, timeout=None):
+        self._event(name).wait(timeout)
+        return self.results.get(name)
+
+    def report(self):
+        total = time.perf_counter() - self.t0
+        print(f"⏱️ Arranque ({total:.1f}s):")
+        for name, (start, dur) in sorted(self.timings.items(), key=lambda kv: kv[1][0]):
+            status = f"❌ {self.errors[name]}" if name in self.errors else "✅"
+            print(f"   {name:<24} +{start:5.1f}s  {dur:6.2f}s  {status}")
+
+    def report_when_done(self):
+        """ Espera por todas as fases registadas (em background) e imprime o relatório. """
+        def target():
+            while True:
+                with self._lock: pending = [e for e in self._done.values() if not e.is_set()]
+                if not pending: break
+                for e in pending: e.wait()
+            self.report()
+        threading.Thread(target=target, name="boot-report", daemon=True).start()
+
+    def summary(self):
+        return {name: {"start_s": round(s, 2), "duration_s": round(d, 2), "error": self.errors.get(name)}
+                for name, (s, d) in self.timings.items()}
@@ -0,0 +1,184 @@
+import math
+import time
+import threading
+import numpy as np
+from text_utils import strip_wake_word, is_hallucination
+
+# --- BACKENDS STT ---
+# Interface comum: backend.transcribe(audio_float32_16k, initial_prompt=None, language="pt") -> SttResult.
+# O filtro de alucinações e os PHONETIC_FIXES ficam por cima (assistant.clean_transcript);
+# em streaming o filtro corre também em cada segmento (StreamingTranscriber._run).
+
+class SttResult:
+    """ Texto + segmentos [{start, end, text, confidence, no_speech}] + confiança média (0-1). """
+    def __init__(self, text, segments=None, language=None, duration=0.0, elapsed=0.0):
+        self.text = text.strip()
+        self.segments = segments or []
+        self.language = language
+        self.duration = duration
+        self.elapsed = elapsed
+        # Média das confianças pesada pela duração de cada segmento
+        total = sum(max(seg["end"] - seg["start"], 1e-3) for seg in self.segments)
+        self.confidence = (sum(seg["confidence"] * max(seg["end"] - seg["start"], 1e-3) for seg in self.segments) / total
+                           if total else 0.0)
+
+    @property
+    def rtf(self):
+        """ Real-time factor: segundos de CPU por segundo de áudio. """
+        return self.elapsed / self.duration if self.duration else 0.0
+
+    def as_dict(self):
+        return {"text": self.text, "confidence": round(self.confidence, 3), "language": self.language,
+                "duration_s": round(self.duration, 2), "elapsed_s": round(self.elapsed, 3), "rtf": round(self.rtf, 3),
+                "segments": self.segments}
+
+def _segment(start, end, text, avg_logprob, no_speech_prob):
+    return {"start": round(float(start), 2), "end": round(float(end), 2), "text": text.strip(),
+            "confidence": round(math.exp(min(0.0, float(avg_logprob))), 3), "no_speech": round(float(no_speech_prob), 3)}
+
+class WhisperBackend:
+    """ openai-whisper (PyTorch FP32 em CPU). """
+    name = "whisper"
+    def __init__(self, model_name="medium", threads=None):
+        import whisper
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.model = whisper.load_model(model_name)
+        print(f"🗣️ STT: whisper '{model_name}' (FP32)")
+
+    def transcribe(self, audio, initial_prompt=None, language="pt"):
+        t0 = time.perf_counter()
+        res = self.model.transcribe(audio, language=language, fp16=False, initial_prompt=initial_prompt)
+        segs = [_segment(s["start"], s["end"], s["text"], s["avg_logprob"], s["no_speech_prob"]) for s in res.get("segments", [])]
+        return SttResult(res["text"], segs, res.get("language", language), len(audio) / 16000.0, time.perf_counter() - t0)
+
+class FasterWhisperBackend:
+    """ CTranslate2 / faster-whisper com pesos quantizados (int8 por defeito). """
+    name = "faster-whisper"
+    def __init__(self, model_name="medium", threads=None, compute_type="int8", beam_size=5):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(model_name, device="cpu", compute_type=compute_type, cpu_threads=threads or 0)
+        self.beam_size = beam_size
+        print(f"🗣️ STT: faster-whisper '{model_name}' ({compute_type}, beam {beam_size})")
+
+    def transcribe(self, audio, initial_prompt=None, language="pt"):
+        t0 = time.perf_counter()
+        segments, info = self.model.transcribe(audio.astype(np.float32, copy=False), language=language,
+                                               initial_prompt=initial_prompt, beam_size=self.beam_size,
+                                               condition_on_previous_text=False)
+        segs = [_segment(s.start, s.end, s.text, s.avg_logprob, s.no_speech_prob) for s in segments]
+        return SttResult(" ".join(seg["text"] for seg in segs if seg["text"]), segs, info.language,
+                         len(audio) / 16000.0, time.perf_counter() - t0)
+
+BACKENDS = {"whisper": WhisperBackend, "faster-whisper": FasterWhisperBackend}
+
+def create_backend(name="whisper", model_name="medium", threads=None, compute_type="int8"):
+    if name not in BACKENDS: raise ValueError(f"Backend STT desconhecido: {name} (opções: {list(BACKENDS)})")
+    if name == "faster-whisper": return FasterWhisperBackend(model_name, threads, compute_type)
+    return WhisperBackend(model_name, threads)
+
+
+# --- STT EM STREAMING ---
+# Enquanto o utilizador ainda fala, um worker transcreve o áudio já gravado:
+#  - segmentos fechados em cada pausa (o texto fica "confirmado");
+#  - hipóteses parciais sobre a janela ainda aberta, quando o worker está livre.
+# No fim de fala só falta (quase sempre) o último segmento curto, que muitas vezes
+# já foi transcrito durante o silêncio final do Endpointer.
+
+# O modelo de STT não é thread-safe: uma transcrição de cada vez
+TRANSCRIBE_LOCK = threading.Lock()
+
+class StreamingTranscriber:
+    """
+    Lê o buffer do Endpointer (dsp_utils, por snapshot) durante a gravação.
+    'transcribe_fn(audio_float32, prompt)' devolve texto cru (sem filtros).
+    """
+    def __init__(self, transcribe_fn, min_segment=0.5, partial_interval=1.0, poll_interval=0.05, on_partial=None):
+        self.transcribe_fn = transcribe_fn
+        self.min_segment = min_segment
+        self.partial_interval = partial_interval
+        self.poll_interval = poll_interval
+        self.on_partial = on_partial
+        self.ep = None
+        self.segments = []       # Textos confirmados
+        self.committed = 0       # Amostra onde acaba o último segmento confirmado
+        self.partial = ""        # Hipótese sobre [committed, partial_end)
+        self.partial_end = 0
+        self.stats = {"segments": 0, "partials": 0, "stt_s": 0.0, "final_ms": 0}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, ep):
+        """ Chamado por record_audio() depois de ep.reset(). """
+        self.ep = ep
+        self._thread = threading.Thread(target=self._worker, name="stt-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """ Fim da gravação: o worker não começa mais trabalhos (o buffer vai ser reutilizado). """
+        self._stop.set()
+
+    def text(self):
+        """ Melhor hipótese atual (confirmado + parcial). """
+        return " ".join(t for t in self.segments + [self.partial] if t)
+
+    def _run(self, audio, start, end):
+        t0 = time.perf_counter()
+        with TRANSCRIBE_LOCK:
+            txt = self.transcribe_fn(audio[start:end], " ".join(t for t in self.segments if t)[-200:] or None)
+        self.stats["stt_s"] += time.perf_counter() - t0
+        return "" if is_hallucination(txt) else txt   # "Obrigado." num segmento curto do fim
+
+    def _worker(self):
+        ep = self.ep
+        rate = ep.rate
+        min_seg = int(self.min_segment * rate)
+        last_partial = 0
+        while not self._stop.wait(self.poll_interval):
+            if not ep.started: continue
+            n, silence, speech_end = ep.progress()
+
+            # Pausa: fecha o segmento até à última fala (+ cauda)
+            if silence >= ep.min_pause and speech_end - self.committed >= min_seg:
+                end = min(n, speech_end + ep.tail_keep)
+                if self.partial and self.partial_end >= end: txt = self.partial  # A parcial já tem a fala toda
+                else:
+                    seg = ep.snapshot(self.committed, end)[0]
+                    if len(seg) < end - self.committed: continue   # reset() entretanto (gravação nova)
+                    txt = self._run(seg, 0, len(seg))
+                self.segments.append(txt); self.committed = end
+                self.partial = ""; self.partial_end = end
+                self.stats["segments"] += 1
+                ep.hint_from_text(strip_wake_word(self.text()))
+                if self.on_partial: self.on_partial(self.text())
+                continue
+
+            # Janela aberta a crescer: hipótese parcial
+            if n - max(self.committed, last_partial) >= int(self.partial_interval * rate) and speech_end > self.committed:
+                seg = ep.snapshot(self.committed, n)[0]
+                if len(seg) < n - self.committed: continue
+                txt = self._run(seg, 0, len(seg))
+                self.partial = txt; self.partial_end = n; last_partial = n
+                self.stats["partials"] += 1
+                ep.hint_from_text(strip_wake_word(self.text()))
+                if self.on_partial: self.on_partial(self.text())
+
+    def finish(self, audio):
+        """
+        'audio' é a cópia devolvida por record_audio(). Espera pelo worker e transcreve
+        só o que ainda não está coberto. Devolve o texto cru completo.
+        """
+        t0 = time.perf_counter()
+        self.stop()
+        if self._thread is not None: self._thread.join()
+        end = len(audio)
+        if end - self.committed > 0:
+            # Se a última parcial já cobre até ao fim, reaproveita-a
+            if self.partial and self.partial_end >= end: self.segments.append(self.partial)
+            elif end - self.committed >= int(0.1 * (self.ep.rate if self.ep else 16000)):
+                self.segments.append(self._run(audio, self.committed, end))
+            self.committed = end
+        self.partial = ""
+        self.stats["final_ms"] = int((time.perf_counter() - t0) * 1000)
+        return self.text()
@@ -0,0 +1,121 @@
+import bisect
+import time
+import numpy as np
+
+# --- TELEMETRIA DO LOOP WAKE WORD ---
+# Contadores em arrays de tamanho fixo: registar um chunk custa um bisect e
+# um incremento. Nada de strings nem listas a crescer no caminho quente.
+
+LATENCY_EDGES_MS = [0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 50, 75, 100, 200]
+LAG_EDGES_MS = [5, 10, 20, 40, 80, 160, 320, 640, 1280, 2560]
+SCORE_BINS = 20
+
+class Histogram:
+    """ Histograma com limites fixos. O último bin apanha tudo acima do último limite. """
+    def __init__(self, edges):
+        self.edges = list(edges)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.edges, value)] += 1
+
+    def percentile(self, q, counts=None):
+        """ Limite superior do bin onde cai o percentil q (0-100). """
+        counts = self.counts if counts is None else counts
+        total = counts.sum()
+        if total == 0: return 0.0
+        idx = int(np.searchsorted(np.cumsum(counts), total * q / 100.0))
+        return float(self.edges[idx]) if idx < len(self.edges) else float("inf")
+
+    def as_dict(self, counts=None):
+        counts = self.counts if counts is None else counts
+        labels = [f"<={e}" for e in self.edges] + [f">{self.edges[-1]}"]
+        return dict(zip(labels, counts.tolist()))
+
+class WakeTelemetry:
+    """
+    Agrega latência de inferência do PhantasmaEngine.predict, atraso do ring,
+    distribuição de scores e clipping. Exposto via Flask e numa linha de log periódica.
+    """
+    def __init__(self, log_interval=300):
+        self.log_interval = log_interval
+        self.latency = Histogram(LATENCY_EDGES_MS)
+        self.lag = Histogram(LAG_EDGES_MS)
+        self.scores = np.zeros(SCORE_BINS, dtype=np.int64)
+        self.chunks = 0
+        self.clips = 0
+        self.detections = 0
+        self.latency_sum_ms = 0.0
+        self.score_max = 0.0
+        self.started = time.time()
+        self.ring = None
+        self.gate = None
+
+        # Snapshot para a linha de log (só o intervalo desde o último log)
+        self._next_log = time.monotonic() + log_interval
+        self._snap = self._snapshot()
+
+    def attach_ring(self, ring, rate):
+        self.ring = ring
+        self._lag_scale = 1000.0 / rate
+
+    def attach_gate(self, gate):
+        self.gate = gate
+
+    def record(self, latency_s, score, clipped=False):
+        """ Chamado uma vez por chunk inferido. """
+        ms = latency_s * 1000.0
+        self.latency.add(ms)
+        self.latency_sum_ms += ms
+        if self.ring is not None: self.lag.add(self.ring.lag() * self._lag_scale)
+        self.scores[min(int(score * SCORE_BINS), SCORE_BINS - 1)] += 1
+        if score > self.score_max: self.score_max = score
+        if clipped: self.clips += 1
+        self.chunks += 1
+
+    def record_detection(self):
+        self.detections += 1
+
+    def _snapshot(self):
+        return {"latency": self.latency.counts.copy(), "lag": self.lag.counts.copy(),
+                "chunks": self.chunks, "clips": self.clips, "latency_sum_ms": self.latency_sum_ms,
+                "gate_chunks": self.gate.chunks if self.gate else 0, "gate_skipped": self.gate.skipped if self.gate else 0}
+
+    def summary(self):
+        n = self.chunks
+        res = {
+            "uptime_s": round(time.time() - self.started),
+            "chunks": n, "clips": self.clips, "detections": self.detections,
+            "latency_ms": {
+                "mean": round(self.latency_sum_ms / n, 3) if n else 0.0,
+                "p50": self.latency.percentile(50), "p95": self.latency.percentile(95),
+                "p99": self.latency.percentile(99), "histogram": self.latency.as_dict(),
+            },
+            "lag_ms": {"p50": self.lag.percentile(50), "p95": self.lag.percentile(95), "histogram": self.lag.as_dict()},
+            "score": {"max": round(float(self.score_max), 4),
+                      "histogram": {f"{i / SCORE_BINS:.2f}": int(c) for i, c in enumerate(self.scores)}},
+        }
+        if self.ring is not None: res["ring"] = self.ring.stats()
+        if self.gate is not None: res["gate"] = self.gate.stats()
+        return res
+
+    def maybe_log(self):
+        """ Linha de resumo a cada 'log_interval' segundos (barato de chamar em cada chunk). """
+        if time.monotonic() < self._next_log: return
+        self._next_log = time.monotonic() + self.log_interval
+        prev, self._snap = self._snap, self._snapshot()
+        n = self.chunks - prev["chunks"]
+        gate = ""
+        if self.gate is not None:
+            seen = self.gate.chunks - prev["gate_chunks"]
+            if seen > 0: gate = f" | gate saltou {100.0 * (self.gate.skipped - prev['gate_skipped']) / seen:.0f}%"
+        if n <= 0:
+            if gate: print(f"📈 Wake: sem inferência{gate}")
+            return
+        lat = self.latency.counts - prev["latency"]
+        lag = self.lag.counts - prev["lag"]
+        mean = (self.latency_sum_ms - prev["latency_sum_ms"]) / n
+        ring = f" | ring overruns {self.ring.overruns}" if self.ring is not None else ""
+        print(f"📈 Wake: {n} chunks | inferência média {mean:.1f}ms p95 {self.latency.percentile(95, lat)}ms"
+              f" | lag p95 {self.lag.percentile(95, lag)}ms | score máx {self.score_max:.2f}"
+              f" | clips {self.clips - prev['clips']}{gate}{ring}")
@@ -0,0 +1,35 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from circuit_utils import CircuitBreaker, OPEN, CLOSED
+
+class HalfOpenProbeTest(unittest.TestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker("teste", consecutive=1, cooloff=0.0)
+        self.breaker.record(0.1, False, "timeout")
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_cancelled_probe_is_released(self):
+        # A chamada de teste é cancelada a meio: sem veredicto, a seguinte testa outra vez
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.trips, 1)
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(0.1, True)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_only_one_probe_at_a_time(self):
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+
+    def test_release_when_closed_is_noop(self):
+        breaker = CircuitBreaker("outra")
+        breaker.release()
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertTrue(breaker.allow())
+
+if __name__ == "__main__":
+    unittest.main()
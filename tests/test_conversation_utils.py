@@ -0,0 +1,41 @@
+import os
+import sys
+import types
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.modules.setdefault("config", types.ModuleType("config"))   # text_utils só lê PHONETIC_FIXES
+from conversation_utils import ConversationManager
+
+SYSTEM = "És o Phantasma, um assistente doméstico."
+
+class FollowUpTest(unittest.TestCase):
+    def setUp(self):
+        self.conv = ConversationManager(num_ctx=4096, num_predict=512)
+
+    def test_skill_turn_then_new_llm_question(self):
+        # "liga a luz" (skill) seguido de uma pergunta nova: não é conversa
+        self.conv.add_turn("voz", "liga a luz da sala", "Luz da sala ligada.", "skill")
+        question = "qual é a capital da austrália"
+        self.assertFalse(self.conv.is_follow_up("voz", question))
+        history, _, usage = self.conv.build("voz", SYSTEM, question, follow_up=False)
+        self.assertEqual(history, [])
+        self.assertEqual(usage["history"], 0)
+
+    def test_skill_turn_then_follow_up(self):
+        self.conv.add_turn("voz", "como está o tempo", "Amanhã vai chover em Viseu.", "skill")
+        self.assertTrue(self.conv.is_follow_up("voz", "E porquê?"))
+        history, _, _ = self.conv.build("voz", SYSTEM, "E porquê?", follow_up=True)
+        self.assertEqual([m['role'] for m in history], ["user", "assistant"])
+
+    def test_short_question_after_llm_answer(self):
+        self.conv.add_turn("voz", "quem foi fernando pessoa", "Um poeta português.")
+        self.assertTrue(self.conv.is_follow_up("voz", "quando morreu?"))
+        self.assertFalse(self.conv.is_follow_up("voz", "dá-me uma receita de bacalhau à brás"))
+
+    def test_sessions_are_separate(self):
+        self.conv.add_turn("discord:1", "quem foi fernando pessoa", "Um poeta português.")
+        self.assertFalse(self.conv.is_follow_up("discord:2", "quando morreu?"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import sys
+import types
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.modules.setdefault("config", types.ModuleType("config"))   # text_utils só lê PHONETIC_FIXES/WAKEWORD_PHRASES
+import numpy as np
+from text_utils import WakeWordStripper, strip_wake_word, is_hallucination
+from dsp_utils import Endpointer
+from stt_utils import StreamingTranscriber
+
+class WakeWordTailTest(unittest.TestCase):
+    def test_one_breath_command(self):
+        # "fantasma memoriza ..." de seguida: o pre-roll do comando apanha o fim da wake word
+        self.assertEqual(strip_wake_word("...tasma, memoriza que a chave está na gaveta"),
+                         "memoriza que a chave está na gaveta")
+        self.assertEqual(strip_wake_word("Fantasma. Liga a luz da sala"), "Liga a luz da sala")
+        self.assertEqual(strip_wake_word("hey fantasma que horas são?"), "que horas são?")
+
+    def test_one_breath_dictation_hint(self):
+        ep = Endpointer()
+        ep.dictation_triggers = ("memoriza",)
+        ep.hint_from_text(strip_wake_word("ntasma memoriza isto"))
+        self.assertEqual(ep.mode, "dictation")
+
+    def test_keeps_other_words(self):
+        self.assertEqual(strip_wake_word("liga a luz"), "liga a luz")
+        self.assertEqual(strip_wake_word("fantasmas existem?"), "fantasmas existem?")
+        self.assertEqual(strip_wake_word("asma é perigosa?"), "asma é perigosa?")
+
+    def test_custom_phrases(self):
+        strip = WakeWordStripper(["hey jarvis"])
+        self.assertEqual(strip("Jarvis, toca música"), "toca música")
+
+class HallucinationTest(unittest.TestCase):
+    def test_filters_whole_phrases(self):
+        for text in ["", ".", "?", "...", "Obrigado.", "obrigado!", "Sous-titres"]:
+            self.assertTrue(is_hallucination(text), text)
+        self.assertFalse(is_hallucination("obrigado pela ajuda"))
+        self.assertFalse(is_hallucination("liga a luz."))
+
+    def test_streaming_tail_segment(self):
+        # Whisper inventa "Obrigado." no silêncio do último segmento
+        stream = StreamingTranscriber(lambda audio, prompt: "Obrigado.")
+        stream.segments = ["liga a luz"]
+        self.assertEqual(stream.finish(np.zeros(8000, dtype=np.float32)), "liga a luz")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import re
+import unicodedata
+import config
+
+# --- NORMALIZAÇÃO DE TEXTO (uma vez por pedido) ---
+# O router cria um NormalizedPrompt e passa-o às skills como 'user_prompt_lower'.
+# Continua a ser uma str (o texto em minúsculas), por isso as skills antigas não mudam;
+# as novas usam os atributos já calculados em vez de normalizar outra vez:
+#   .raw     texto original         .folded  minúsculas sem acentos
+#   .tokens  palavras de .folded    .digits  minúsculas com números por extenso em dígitos
+#   .numbers números encontrados em .digits
+
+def fold(text):
+    """ Minúsculas sem acentos. Reaproveita o cálculo se já vier normalizado. """
+    if isinstance(text, NormalizedPrompt): return text.folded
+    return unicodedata.normalize('NFKD', text.lower()).encode('ascii', 'ignore').decode('utf-8')
+
+# --- Correções fonéticas (uma regex compilada com todas as chaves) ---
+
+class PhoneticFixer:
+    def __init__(self, fixes):
+        self.fixes = {k.lower(): v for k, v in fixes.items()}
+        keys = sorted(self.fixes, key=len, reverse=True)  # "liga-nos" antes de "liga"
+        self.pattern = re.compile("|".join(re.escape(k) for k in keys), re.IGNORECASE) if keys else None
+
+    def __call__(self, text):
+        if self.pattern is None: return text
+        return self.pattern.sub(lambda m: self.fixes[m.group(0).lower()], text)
+
+fix_phonetics = PhoneticFixer(getattr(config, 'PHONETIC_FIXES', {}))
+
+# --- Restos da wake word no início do comando ---
+# Com "fantasma liga a luz" de seguida, o pre-roll do comando apanha o fim da wake word
+# ("...tasma, liga a luz"). Sem isto falham as skills 'startswith' ("memoriza ..."), o
+# modo ditado e as chaves da cache/intenções.
+
+class WakeWordStripper:
+    def __init__(self, phrases, min_tail=5):
+        # Cada frase e todos os seus finais com pelo menos 'min_tail' letras ("hey fantasma", "fantasma", "tasma")
+        forms = {p.lower()[i:].strip() for p in phrases for i in range(len(p)) if len(p.lower()[i:].strip()) >= min_tail}
+        alts = "|".join(re.escape(f) for f in sorted(forms, key=len, reverse=True))
+        self.pattern = re.compile(rf"^\W*(?:{alts})\b\W*", re.IGNORECASE) if forms else None
+
+    def __call__(self, text):
+        if self.pattern is None: return text
+        return self.pattern.sub("", text, count=1)
+
+strip_wake_word = WakeWordStripper(getattr(config, 'WAKEWORD_PHRASES', ["hey fantasma", "ei fantasma", "phantasma", "fantasma"]))
+
+# --- Alucinações do Whisper ---
+# Em silêncio/ruído o Whisper inventa frases feitas. Com STT em streaming aparecem num
+# segmento curto do fim ("liga a luz Obrigado."), por isso filtra-se cada segmento.
+
+HALLUCINATIONS = [".", "?", "Obrigado", "Sous-titres"]
+_HALLUCINATION_KEYS = {h.lower().strip(" .,!?…") for h in HALLUCINATIONS}
+
+def is_hallucination(text):
+    """ Texto vazio, curto com uma das HALLUCINATIONS, ou só uma delas ("Obrigado.", "..."). """
+    text = text.strip()
+    if any(h in text for h in HALLUCINATIONS) and len(text) < 5: return True
+    return text.lower().strip(" .,!?…") in _HALLUCINATION_KEYS
+
+# --- Números por extenso ---
+
+UNITS = {"zero": 0, "um": 1, "uma": 1, "dois": 2, "duas": 2, "três": 3, "tres": 3, "quatro": 4, "cinco": 5,
+         "seis": 6, "sete": 7, "oito": 8, "nove": 9, "dez": 10, "onze": 11, "doze": 12, "treze": 13,
+         "catorze": 14, "quatorze": 14, "quinze": 15, "dezasseis": 16, "dezesseis": 16, "dezassete": 17,
+         "dezessete": 17, "dezoito": 18, "dezanove": 19, "dezenove": 19}
+TENS = {"vinte": 20, "trinta": 30, "quarenta": 40, "cinquenta": 50, "sessenta": 60, "setenta": 70,
+        "oitenta": 80, "noventa": 90}
+HUNDREDS = {"cem": 100, "cento": 100, "duzentos": 200, "duzentas": 200, "trezentos": 300, "trezentas": 300,
+            "quatrocentos": 400, "quatrocentas": 400, "quinhentos": 500, "quinhentas": 500, "seiscentos": 600,
+            "seiscentas": 600, "setecentos": 700, "setecentas": 700, "oitocentos": 800, "oitocentas": 800,
+            "novecentos": 900, "novecentas": 900}
+NUMBER_WORDS = {**UNITS, **TENS, **HUNDREDS, "mil": 1000}
+
+# Sequências de palavras numéricas ligadas por "e" ("mil e cinquenta", "vinte e cinco")
+_NUM = "|".join(sorted(map(re.escape, NUMBER_WORDS), key=len, reverse=True))
+_NUMBER_RUN = re.compile(rf"\b(?:{_NUM})(?:\s+(?:e\s+)?(?:{_NUM}))*\b")
+_NUMBER_FOUND = re.compile(r"\d+(?:[.,]\d+)?")
+
+def _fits(last, v):
+    """ 'v' continua o número anterior? ("vinte e cinco" sim, "cinco e seis" não) """
+    if last is None: return True
+    if last == 1000: return v < 1000
+    if last >= 100: return v < 100
+    if last >= 20: return v < 10
+    return False
+
+def _convert_run(run):
+    out, total, cur, last, sep = [], 0, 0, None, ""
+    for w in run.split():
+        if w == "e": sep = " e "; continue
+        v = NUMBER_WORDS[w]
+        if w == "mil":
+            total += max(cur, 1) * 1000; cur = 0; last = 1000
+        elif _fits(last, v):
+            cur += v; last = v
+        else:
+            out.append(str(total + cur) + (sep or " ")); total, cur, last = 0, v, v
+        sep = ""
+    return "".join(out) + str(total + cur)
+
+def to_digits(text):
+    """ "mil e cinquenta a dividir por trinta" -> "1050 a dividir por 30". """
+    return _NUMBER_RUN.sub(lambda m: _convert_run(m.group(0)), text.lower())
+
+# --- Objeto partilhado ---
+
+class NormalizedPrompt(str):
+    def __new__(cls, text):
+        obj = super().__new__(cls, text.lower())
+        obj.raw = text
+        obj.folded = fold(text)
+        obj.tokens = re.findall(r"\w+", obj.folded)
+        obj.digits = to_digits(text)
+        obj.numbers = [float(n.replace(",", ".")) if re.search(r"[.,]", n) else int(n)
+                       for n in _NUMBER_FOUND.findall(obj.digits)]
+        return obj
+
+def normalize_prompt(text):
+    return text if isinstance(text, NormalizedPrompt) else NormalizedPrompt(text)
+
+# --- Segmentação em frases (resposta do LLM em streaming -> TTS) ---
+
+_ABBREVIATIONS = {"sr", "sra", "dr", "dra", "eng", "prof", "ex", "etc", "n", "nº", "pág", "vs", "av"}
+_SENTENCE_END = re.compile(r"[.!?…]+[\"'»)]*(?=\s)|\n+")
+
+class SentenceSegmenter:
+    """
+    Recebe pedaços de texto à medida que chegam e devolve as frases já completas.
+    Não corta em abreviaturas ("Sr.") nem em números ("3.5"); ignora blocos <think>...</think>
+    e limpa o markdown. 'min_chars' evita frases minúsculas (o piper soa aos soluços).
+    """
+    def __init__(self, min_chars=12):
+        self.min_chars = min_chars
+        self.buf = ""
+        self._raw = ""          # Texto ainda por separar do <think> (pode ter uma tag a meio)
+        self._thinking = False
+
+    def feed(self, chunk):
+        self.buf += self._visible(chunk)
+        out, start = [], 0
+        for m in _SENTENCE_END.finditer(self.buf):
+            end = m.end()
+            candidate = self.buf[start:end]
+            if m.group(0).startswith(".") and self._is_abbreviation(candidate): continue
+            if len(candidate.strip()) < self.min_chars and not m.group(0).startswith("\n"): continue
+            out.append(candidate)
+            start = end
+        self.buf = self.buf[start:]
+        return [t for t in (self._clean(x) for x in out) if t]
+
+    def flush(self):
+        """ O que sobrou no fim do stream. """
+        rest = self.buf + ("" if self._thinking else self._raw)
+        self.buf = self._raw = ""
+        rest = self._clean(rest)
+        return [rest] if rest else []
+
+    def _visible(self, chunk):
+        self._raw += chunk
+        out = ""
+        while self._raw:
+            tag = "</think>" if self._thinking else "<think>"
+            i = self._raw.find(tag)
+            if i >= 0:
+                if not self._thinking: out += self._raw[:i]
+                self._raw, self._thinking = self._raw[i + len(tag):], not self._thinking
+                continue
+            # Sem tag completa: guarda o fim se puder ser o início de uma tag partida entre pedaços
+            keep = next((k for k in range(min(len(tag) - 1, len(self._raw)), 0, -1) if tag.startswith(self._raw[-k:])), 0)
+            if not self._thinking: out += self._raw[:len(self._raw) - keep]
+            self._raw = self._raw[len(self._raw) - keep:]
+            break
+        return out
+
+    @staticmethod
+    def _is_abbreviation(text):
+        words = text.rstrip(".").split()
+        return bool(words) and words[-1].lower() in _ABBREVIATIONS
+
+    @staticmethod
+    def _clean(text):
+        return re.sub(r"\s+", " ", text.replace("**", "").replace("*", "").replace("#", "").replace("`", "")).strip()
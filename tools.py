@@ -1,9 +1,11 @@
 import httpx
 import config
+from contextlib import nullcontext
 
-def search_with_searxng(prompt, max_results=3):
+def search_with_searxng(prompt, max_results=3, ctx=None):
     """
     Pesquisa na web usando SearxNG e retorna snippets de contexto.
+    Com 'ctx' (RequestContext), cancelar o pedido fecha o cliente e aborta a pesquisa.
     """
     if not config.SEARXNG_URL:
         return "" # Ignora se a URL não estiver definida
@@ -14,11 +16,11 @@ def search_with_searxng(prompt, max_results=3):
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36"
         }
         
-        client = httpx.Client(timeout=10.0, headers=headers)
-        response = client.get(
-            f"{config.SEARXNG_URL}/search",
-            params={'q': prompt, 'format': 'json'}
-        )
+        with (ctx.http_client(timeout=10.0, headers=headers) if ctx else nullcontext(httpx.Client(timeout=10.0, headers=headers))) as client:
+            response = client.get(
+                f"{config.SEARXNG_URL}/search",
+                params={'q': prompt, 'format': 'json'}
+            )
         response.raise_for_status()
         data = response.json()
         
@@ -41,5 +43,6 @@ def search_with_searxng(prompt, max_results=3):
         print(f"ERRO (Web RAG): Não foi possível ligar ao SearxNG em {config.SEARXNG_URL}")
         return ""
     except Exception as e:
+        if ctx and ctx.cancelled: return ""
         print(f"ERRO (Web RAG): Falha ao pesquisar no SearxNG: {e}")
         return ""
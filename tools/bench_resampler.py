@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dsp_utils import PolyphaseResampler
+
+# --- CONFIGURAÇÃO ---
+RATES = [48000, 44100, 32000, 16000]
+CHUNK_SIZE = 1280          # 80 ms @ 16 kHz (o que o openWakeWord quer)
+N_CHUNKS = 2000            # ~160 s de áudio por taxa
+ALIAS_TONE_HZ = 11000      # Acima de Nyquist (8 kHz): tem de desaparecer
+
+def legacy_factor(rate):
+    """ A lógica antiga do main() (44100 -> fator 3 -> 14700 Hz, errado). """
+    if rate > 32000: return 3
+    if rate > 24000: return 2
+    return 1
+
+def legacy_process(chunk, factor):
+    audio_raw = np.frombuffer(chunk, dtype=np.int16)
+    audio_resampled = audio_raw[::factor] if factor > 1 else audio_raw
+    audio_float = audio_resampled.astype(np.float32)
+    audio_float -= np.mean(audio_float)
+    return np.clip(audio_float, -32767, 32767).astype(np.int16)
+
+def make_signal(rate, n_samples, tone_hz, noise=200):
+    t = np.arange(n_samples) / rate
+    sig = 8000 * np.sin(2 * np.pi * tone_hz * t) + np.random.normal(0, noise, n_samples)
+    return sig.astype(np.int16)
+
+def bench(fn, chunks):
+    # CPU por chunk
+    t0 = time.process_time()
+    for c in chunks: fn(c)
+    cpu_us = (time.process_time() - t0) / len(chunks) * 1e6
+
+    # Bytes alocados por chunk (amostra curta, tracemalloc é lento)
+    sample = chunks[:200]
+    tracemalloc.start()
+    for c in sample: fn(c)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu_us, peak
+
+def alias_db(out_chunks):
+    """ Energia residual do tom fora de banda, relativa ao tom original (dB). """
+    y = np.concatenate(out_chunks[10:]).astype(np.float32)
+    rms = np.sqrt(np.mean(y ** 2)) + 1e-9
+    return 20 * np.log10(rms / (8000 / np.sqrt(2)))
+
+def main():
+    print(f"📊 Benchmark front-end DSP ({N_CHUNKS} chunks por taxa)\n")
+    print(f"{'Taxa':>7} | {'Caminho':<10} | {'Taxa real':>9} | {'CPU/chunk':>10} | {'Pico alloc':>10} | {'Alias':>8}")
+    print("-" * 70)
+
+    for rate in RATES:
+        rs = PolyphaseResampler(rate, chunk_out=CHUNK_SIZE)
+        factor = legacy_factor(rate)
+
+        sig = make_signal(rate, rs.chunk_in * N_CHUNKS, 440)
+        chunks_new = [sig[i:i + rs.chunk_in] for i in range(0, len(sig), rs.chunk_in)]
+        legacy_in = CHUNK_SIZE * factor
+        chunks_old = [sig[i:i + legacy_in] for i in range(0, len(sig) - legacy_in + 1, legacy_in)]
+
+        old_us, old_peak = bench(lambda c: legacy_process(c, factor), chunks_old)
+        new_us, new_peak = bench(rs.process, chunks_new)
+
+        # Teste de aliasing com um tom acima de 8 kHz
+        tone = make_signal(rate, rs.chunk_in * 50, min(ALIAS_TONE_HZ, rate // 2 - 1000), noise=0)
+        old_alias = alias_db([legacy_process(tone[i:i + legacy_in], factor).copy() for i in range(0, len(tone) - legacy_in + 1, legacy_in)])
+        rs.reset()
+        new_alias = alias_db([rs.process(tone[i:i + rs.chunk_in]).copy() for i in range(0, len(tone), rs.chunk_in)])
+
+        print(f"{rate:>7} | {'antigo':<10} | {rate // factor:>7}Hz | {old_us:>8.1f}µs | {old_peak:>9}B | {old_alias:>6.1f}dB")
+        print(f"{rate:>7} | {'polifásico':<10} | {rs.rate_out:>7}Hz | {new_us:>8.1f}µs | {new_peak:>9}B | {new_alias:>6.1f}dB")
+
+if __name__ == "__main__":
+    main()
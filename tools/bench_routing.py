@@ -0,0 +1,72 @@
+import os
+import sys
+import glob
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from routing import build_trigger_index, static_skill_lists
+
+# --- CONFIGURAÇÃO ---
+SKILLS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "skills")
+SKILL_COUNTS = [20, 50, 100, 200, 400]
+TRIGGERS_PER_SKILL = 25      # Skills sintéticas (a Tuya real anda por aqui)
+N_ROUNDS = 2000
+PROMPTS = [
+    "quanto está a temperatura na sala",
+    "liga a luz da sala",
+    "memoriza que a chave está na gaveta",
+    "quanto é mil e cinquenta a dividir por trinta",
+    "como vai estar o tempo amanhã em viseu",
+    "conta-me uma história sobre o mar e as estrelas",
+]
+
+def real_skills():
+    """ TRIGGERS/TRIGGER_TYPE das skills reais, lidos por AST (sem importar). """
+    skills = []
+    for f in sorted(glob.glob(os.path.join(SKILLS_DIR, "skill_*.py"))):
+        info = static_skill_lists(f)
+        skills.append({"name": info["name"], "triggers": info["TRIGGERS"] or [], "trigger_type": info["TRIGGER_TYPE"]})
+    return skills
+
+def synthetic_skills(n, base):
+    rng = random.Random(42)
+    words = sorted({w for s in base for t in s["triggers"] for w in t.split()} | {w for p in PROMPTS for w in p.split()})
+    skills = list(base)
+    while len(skills) < n:
+        trigs = [" ".join(rng.sample(words, rng.choice([1, 2, 2, 3]))) + f" {rng.randrange(10**6)}" for _ in range(TRIGGERS_PER_SKILL)]
+        skills.append({"name": f"sint_{len(skills)}", "triggers": trigs, "trigger_type": rng.choice(["contains", "startswith"])})
+    return skills
+
+def linear_route(skills, p_low):
+    """ A lógica antiga do route_and_respond. """
+    out = []
+    for i, s in enumerate(skills):
+        trigs = [t.lower() for t in s['triggers']]
+        match = any(p_low.startswith(t) for t in trigs) if s['trigger_type'] == 'startswith' else any(t in p_low for t in trigs)
+        if match: out.append(i)
+    return out
+
+def bench(fn):
+    t0 = time.perf_counter()
+    for _ in range(N_ROUNDS):
+        for p in PROMPTS: fn(p)
+    return (time.perf_counter() - t0) / (N_ROUNDS * len(PROMPTS)) * 1e6
+
+def main():
+    base = real_skills()
+    print(f"📊 Benchmark routing ({len(base)} skills reais, {sum(len(s['triggers']) for s in base)} triggers)\n")
+    print(f"{'Skills':>6} | {'Triggers':>8} | {'Linear':>10} | {'Aho-Corasick':>12} | {'Build':>8}")
+    print("-" * 58)
+    for n in [len(base)] + [c for c in SKILL_COUNTS if c > len(base)]:
+        skills = synthetic_skills(n, base)
+        t0 = time.perf_counter()
+        index = build_trigger_index(skills)
+        build_ms = (time.perf_counter() - t0) * 1000
+        for p in PROMPTS: assert sorted(index.match(p)) == linear_route(skills, p), p
+        lin = bench(lambda p: linear_route(skills, p))
+        ac = bench(index.match)
+        print(f"{n:>6} | {len(index.patterns):>8} | {lin:>8.1f}µs | {ac:>10.1f}µs | {build_ms:>6.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import random
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scheduler import RequestScheduler, SchedulerFull
+
+# --- CONFIGURAÇÃO ---
+# Carga sintética: cada origem envia pedidos em paralelo; o "trabalho" é uma pausa
+# interrompível com a duração típica (skill rápida vs. resposta do LLM).
+DURATION = 20.0              # Segundos de carga
+WORKERS = 3
+RESERVED = 1
+LOAD = {
+    #             pedidos/s, duração do trabalho (s): (mín, máx)
+    "voz":        (0.3, (0.2, 3.0)),
+    "ui":         (0.5, (0.2, 4.0)),
+    "cli":        (0.2, (0.2, 2.0)),
+    "discord":    (1.0, (1.0, 6.0)),
+    "background": (0.2, (5.0, 10.0)),
+}
+
+def work(duration):
+    def fn(ctx):
+        return None if ctx.wait(duration) else "ok"
+    return fn
+
+def producer(sched, source, rate, dur, stop, results):
+    while not stop.is_set():
+        time.sleep(random.expovariate(rate))
+        ctx = sched.new_context(source)
+        t0 = time.monotonic()
+        try: job = sched.submit(ctx, work(random.uniform(*dur)))
+        except SchedulerFull: continue
+        threading.Thread(target=lambda: (job.wait(), results.append((source, time.monotonic() - t0))), daemon=True).start()
+
+def main():
+    random.seed(1)
+    sched = RequestScheduler(WORKERS, RESERVED)
+    stop, results = threading.Event(), []
+    print(f"📊 Carga de {DURATION:.0f}s | {WORKERS} workers ({RESERVED} reservado para a voz)\n")
+    for source, (rate, dur) in LOAD.items():
+        threading.Thread(target=producer, args=(sched, source, rate, dur, stop, results), daemon=True).start()
+    time.sleep(DURATION)
+    stop.set()
+    time.sleep(1.0)
+
+    print(f"{'origem':<11} {'envi.':>5} {'ok':>4} {'canc.':>5} {'preem.':>6} {'rej.':>4} {'fila p50':>9} {'fila p95':>9} {'total p95':>10} {'/min':>5}")
+    for source, st in sched.summary()["sources"].items():
+        total = sorted(t for s, t in results if s == source)
+        p95 = int(total[min(len(total) - 1, int(len(total) * 0.95))] * 1000) if total else 0
+        print(f"{source:<11} {st['submitted']:>5} {st['completed']:>4} {st['cancelled']:>5} {st['preempted']:>6} {st['rejected']:>4}"
+              f" {st['wait_p50_ms']:>7}ms {st['wait_p95_ms']:>7}ms {p95:>8}ms {st['per_min']:>5}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+import re
+import sys
+import glob
+import wave
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dsp_utils import PolyphaseResampler, TARGET_RATE
+from stt_utils import create_backend
+
+# --- CONFIGURAÇÃO ---
+# Pasta com comandos gravados: cada 'x.wav' tem ao lado 'x.txt' com a transcrição correta.
+# Uso: python tools/bench_stt.py [pasta] [backend,backend,...]
+SAMPLES_DIR = "stt_samples"
+BACKENDS = ["whisper", "faster-whisper"]
+MODEL = "medium"
+THREADS = 4
+COMPUTE_TYPE = "int8"
+INITIAL_PROMPT = None  # Ex: o WHISPER_INITIAL_PROMPT do config
+
+def load_wav(path):
+    """ WAV int16 (mono ou estéreo, qualquer taxa) -> float32 mono a 16 kHz. """
+    with wave.open(path, "rb") as w:
+        rate, channels = w.getframerate(), w.getnchannels()
+        data = np.frombuffer(w.readframes(w.getnframes()), dtype=np.int16)
+    if channels > 1: data = data.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    if rate != TARGET_RATE:
+        rs = PolyphaseResampler(rate, chunk_out=1600, remove_dc=False)
+        pad = (-len(data)) % rs.chunk_in
+        data = np.concatenate([data, np.zeros(pad, dtype=np.int16)])
+        data = np.concatenate([rs.process(data[i:i + rs.chunk_in]).copy() for i in range(0, len(data), rs.chunk_in)])
+    return data.astype(np.float32) / 32768.0
+
+def normalize(text):
+    return re.sub(r"[^\w\s]", " ", text.lower()).split()
+
+def word_errors(ref, hyp):
+    """ Distância de Levenshtein ao nível da palavra. """
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1]
+
+def main():
+    folder = sys.argv[1] if len(sys.argv) > 1 else SAMPLES_DIR
+    backends = sys.argv[2].split(",") if len(sys.argv) > 2 else BACKENDS
+    files = sorted(glob.glob(os.path.join(folder, "*.wav")))
+    samples = [(f, open(f[:-4] + ".txt", encoding="utf-8").read().strip()) for f in files if os.path.exists(f[:-4] + ".txt")]
+    if not samples: print(f"❌ Sem pares .wav/.txt em '{folder}'"); return
+    audio = [(os.path.basename(f), load_wav(f), ref) for f, ref in samples]
+    print(f"📊 Benchmark STT: {len(audio)} comandos, {sum(len(a) for _, a, _ in audio) / TARGET_RATE:.1f}s de áudio\n")
+
+    for name in backends:
+        try: backend = create_backend(name, MODEL, THREADS, COMPUTE_TYPE)
+        except Exception as e: print(f"⚠️ {name}: {e}\n"); continue
+        backend.transcribe(np.zeros(TARGET_RATE, dtype=np.float32))  # Aquecimento
+
+        errors = words = 0
+        elapsed = duration = 0.0
+        for fname, a, ref in audio:
+            res = backend.transcribe(a, initial_prompt=INITIAL_PROMPT)
+            ref_w, hyp_w = normalize(ref), normalize(res.text)
+            e = word_errors(ref_w, hyp_w)
+            errors += e; words += len(ref_w)
+            elapsed += res.elapsed; duration += res.duration
+            print(f"  {fname:<28} RTF {res.rtf:5.2f} | conf {res.confidence:.2f} | erros {e} | {res.text}")
+
+        print(f"➡️  {name}: RTF {elapsed / duration:.3f} | WER {100.0 * errors / max(words, 1):.1f}%"
+              f" | {elapsed / len(audio) * 1000:.0f}ms por comando\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import os
+import sys
+import glob
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from routing import static_skill_lists
+from intent_utils import train_intents, IntentClassifier
+
+# --- CONFIGURAÇÃO ---
+SKILLS_DIR = os.path.join(ROOT, "skills")
+EXAMPLES_FILE = os.path.join(ROOT, "models", "intent_examples.txt")
+OUTPUT_FILE = os.path.join(ROOT, "models", "intents.npz")
+# Listas literais (além de TRIGGERS) que também descrevem a skill
+TRIGGER_LISTS = ("TRIGGERS", "TRIGGERS_NICKNAMES", "BASE_TRIGGERS", "BASE_NOUNS", "STATUS_TRIGGERS",
+                 "KEYWORDS_LAMP", "KEYWORDS_VACUUM", "VACUUM_START", "VACUUM_HOME")
+
+def load_examples(path):
+    examples = []
+    for line in open(path, encoding="utf-8"):
+        line = line.strip()
+        if not line or line.startswith("#") or "|" not in line: continue
+        label, text = (x.strip() for x in line.split("|", 1))
+        examples.append((label, text))
+    return examples
+
+def skill_triggers():
+    examples = []
+    for f in sorted(glob.glob(os.path.join(SKILLS_DIR, "skill_*.py"))):
+        info = static_skill_lists(f)
+        if info["TRIGGER_TYPE"] == "none": continue
+        for name in TRIGGER_LISTS:
+            for t in info["lists"].get(name, []):
+                if len(t) > 2: examples.append((info["name"], t))
+    return examples
+
+def main():
+    examples = load_examples(EXAMPLES_FILE)
+    labelled = {lab for lab, _ in examples}
+    # Triggers só das skills que têm exemplos (as outras ficam com o fallback de triggers)
+    triggers = [(lab, t) for lab, t in skill_triggers() if lab in labelled]
+    print(f"🎯 Treino: {len(examples)} exemplos + {len(triggers)} triggers, {len(labelled)} classes")
+
+    model = train_intents(examples + triggers)
+    np.savez_compressed(OUTPUT_FILE, **model)
+    print(f"💾 Modelo guardado em {OUTPUT_FILE} ({os.path.getsize(OUTPUT_FILE) // 1024} KB)")
+
+    # Autoavaliação leave-one-out nos exemplos (só o que não está nos triggers)
+    errors = 0
+    for i, (lab, text) in enumerate(examples):
+        m = train_intents(examples[:i] + examples[i + 1:] + triggers)
+        np.savez(OUTPUT_FILE + ".tmp.npz", **m)
+        pred, score = IntentClassifier(OUTPUT_FILE + ".tmp.npz").predict(text)
+        if pred != lab:
+            errors += 1
+            print(f"   ✗ '{text}': esperado {lab}, previsto {pred} ({score:.2f})")
+    os.remove(OUTPUT_FILE + ".tmp.npz")
+    print(f"📊 Leave-one-out: {100.0 * (len(examples) - errors) / len(examples):.1f}% certos ({errors} erros / {len(examples)})")
+
+    clf = IntentClassifier(OUTPUT_FILE)
+    import time
+    t0 = time.perf_counter()
+    for _ in range(1000): clf.predict("quanto está a temperatura na sala")
+    print(f"⚡ Previsão: {(time.perf_counter() - t0) * 1000:.1f}µs por frase")
+
+if __name__ == "__main__":
+    main()
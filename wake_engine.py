@@ -0,0 +1,245 @@
+import os
+import time
+import numpy as np
+from dsp_utils import PolyphaseResampler
+
+# --- MOTORES WAKE WORD ---
+# Interface comum: predict() -> score máximo, predict_scores() -> vetor por modelo
+# (na ordem de self.names), prime(), reset() e o atributo ready.
+
+def _model_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+class PhantasmaEngine:
+    def __init__(self, model_paths):
+        self.ready = False
+        self.names = [_model_name(p) for p in model_paths]
+        self.scores = np.zeros(len(self.names), dtype=np.float32)
+        try:
+            from openwakeword.model import Model
+            self.model = Model(wakeword_models=model_paths, inference_framework="onnx")
+            self.ready = True
+            print(f"👻 Motor Phantasma: ONLINE")
+            print(f"   Modelos: {model_paths}")
+        except Exception as e:
+            print(f"❌ Erro Motor: {e}")
+
+    def predict(self, audio_chunk_int16):
+        if not self.ready: return 0.0
+        prediction = self.model.predict(audio_chunk_int16)
+        if prediction: return max(prediction.values())
+        return 0.0
+
+    def predict_scores(self, audio_chunk_int16):
+        if not self.ready: return self.scores
+        prediction = self.model.predict(audio_chunk_int16)
+        for i, name in enumerate(self.names): self.scores[i] = prediction.get(name, 0.0)
+        return self.scores
+
+    def prime(self, chunks):
+        """ Só o extrator de features (sem classificador): mantém os buffers contínuos após o gate. """
+        if not self.ready: return
+        for c in chunks: self.model.preprocessor(c)
+
+    def reset(self):
+        if self.ready: self.model.reset()
+
+def _merge_heads(model_paths):
+    """
+    Junta os classificadores (heads) num único grafo ONNX.
+    Heads com a mesma janela de features partilham a mesma entrada.
+    Devolve (modelo, [(nome_entrada, n_frames)], [nome_saida por modelo]).
+    """
+    import onnx
+    from onnx import compose, helper
+
+    nodes, inits, value_info, outputs = [], [], [], []
+    inputs, out_names, opsets = {}, [], {}
+    ir_version = 0
+
+    for i, path in enumerate(model_paths):
+        m = compose.add_prefix(onnx.load(path), prefix=f"h{i}_")
+        g = m.graph
+        ir_version = max(ir_version, m.ir_version)
+        for op in m.opset_import: opsets[op.domain] = max(opsets.get(op.domain, 0), op.version)
+
+        init_names = {t.name for t in g.initializer}
+        graph_in = [x for x in g.input if x.name not in init_names][0]
+        n_frames = graph_in.type.tensor_type.shape.dim[1].dim_value
+        shared = f"features_{n_frames}"
+        if shared not in inputs:
+            inputs[shared] = helper.make_tensor_value_info(shared, onnx.TensorProto.FLOAT, [1, n_frames, 96])
+
+        for node in g.node:
+            for k, name in enumerate(node.input):
+                if name == graph_in.name: node.input[k] = shared
+        nodes.extend(g.node); inits.extend(g.initializer); value_info.extend(g.value_info)
+        outputs.append(g.output[0]); out_names.append(g.output[0].name)
+
+    graph = helper.make_graph(nodes, "phantasma_heads", list(inputs.values()), outputs,
+                              initializer=inits, value_info=value_info)
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid(d, v) for d, v in opsets.items()])
+    model.ir_version = ir_version
+    onnx.checker.check_model(model)
+    windows = [(name, int(name.split("_")[1])) for name in inputs]
+    return model, windows, out_names
+
+class BatchedWakeEngine:
+    """
+    Vários modelos ao mesmo tempo (ex: "hey fantasma" + "pára") sem duplicar CPU:
+    melspectrogram e embedding calculados UMA vez por chunk, e todos os heads
+    avaliados numa única sessão ONNX Runtime com threads explícitas.
+    """
+    def __init__(self, model_paths, intra_threads=1, inter_threads=1):
+        self.ready = False
+        self.names = [_model_name(p) for p in model_paths]
+        self.scores = np.zeros(len(self.names), dtype=np.float32)
+        self._frames = 0
+        try:
+            import onnxruntime as ort
+            from openwakeword.utils import AudioFeatures
+
+            self.features = AudioFeatures(inference_framework="onnx", ncpu=intra_threads)
+
+            opts = ort.SessionOptions()
+            opts.intra_op_num_threads = intra_threads
+            opts.inter_op_num_threads = inter_threads
+            opts.execution_mode = ort.ExecutionMode.ORT_PARALLEL if inter_threads > 1 else ort.ExecutionMode.ORT_SEQUENTIAL
+            opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+            try:
+                merged, self._windows, self._outputs = _merge_heads(model_paths)
+                self._sessions = [ort.InferenceSession(merged.SerializeToString(), sess_options=opts,
+                                                       providers=["CPUExecutionProvider"])]
+                mode = "sessão única"
+            except ImportError:
+                # Sem o pacote 'onnx' não dá para fundir grafos: uma sessão por head (features continuam partilhadas)
+                self._sessions = [ort.InferenceSession(p, sess_options=opts, providers=["CPUExecutionProvider"]) for p in model_paths]
+                self._windows = [(s.get_inputs()[0].name, s.get_inputs()[0].shape[1]) for s in self._sessions]
+                self._outputs = None
+                mode = "uma sessão por modelo"
+
+            self.ready = True
+            print(f"👻 Motor Phantasma (batched, {mode}, threads {intra_threads}/{inter_threads}): ONLINE")
+            print(f"   Modelos: {self.names}")
+        except Exception as e:
+            print(f"❌ Erro Motor: {e}")
+
+    def predict_scores(self, audio_chunk_int16):
+        if not self.ready: return self.scores
+        if self.features(audio_chunk_int16) < 1280: return self.scores
+
+        if self._outputs is not None:
+            feeds = {name: self.features.get_features(n) for name, n in self._windows}
+            outs = self._sessions[0].run(self._outputs, feeds)
+        else:
+            outs = [s.run(None, {name: self.features.get_features(n)})[0]
+                    for s, (name, n) in zip(self._sessions, self._windows)]
+        for i, out in enumerate(outs): self.scores[i] = out.reshape(-1)[0]
+
+        # Tal como o openWakeWord: scores a zero nos primeiros frames após reset
+        self._frames += 1
+        if self._frames < 5: self.scores.fill(0)
+        return self.scores
+
+    def predict(self, audio_chunk_int16):
+        return float(self.predict_scores(audio_chunk_int16).max()) if self.ready else 0.0
+
+    def prime(self, chunks):
+        if not self.ready: return
+        for c in chunks: self.features(c)
+
+    def reset(self):
+        if not self.ready: return
+        self.features.reset()
+        self.scores.fill(0)
+        self._frames = 0
+
+def create_engine(model_paths, mode="openwakeword", intra_threads=1, inter_threads=1):
+    if mode == "batched": return BatchedWakeEngine(model_paths, intra_threads, inter_threads)
+    return PhantasmaEngine(model_paths)
+
+def warmup(engine, n_chunks=5, chunk_size=1280):
+    """ Inferências falsas (silêncio) para o ONNX Runtime alocar tudo antes do primeiro comando. """
+    if not engine.ready: return
+    zeros = np.zeros(chunk_size, dtype=np.int16)
+    for _ in range(n_chunks): engine.predict_scores(zeros)
+    engine.reset()
+
+# --- DETETOR (resample -> gate -> motor -> persistência) ---
+
+class WakeDetector:
+    """
+    Lógica por chunk do loop de wake word, igual dentro do processo principal ou
+    num processo dedicado. process() devolve None, ("wake", score) ou ("stop", score).
+    """
+    def __init__(self, engine, rate, n_wake, chunk_size=1280, thresh=0.6, persistence=3,
+                 stop_thresh=0.6, gate=None, telemetry=None, debug=False):
+        self.engine = engine
+        self.resampler = PolyphaseResampler(rate, chunk_out=chunk_size)
+        self.chunk_in = self.resampler.chunk_in
+        self.n_wake = n_wake
+        self.has_stop = len(engine.names) > n_wake
+        self.thresh = thresh
+        self.persistence = persistence
+        self.stop_thresh = stop_thresh
+        self.gate = gate
+        self.telemetry = telemetry
+        self.debug = debug
+        self.streak = 0
+        self._log_counter = 0
+
+    def process(self, chunk, busy=False, speaking=False):
+        # Processamento de Audio (anti-aliasing + DC in-place, sem alocações)
+        audio_np = self.resampler.process(chunk)
+        tel = self.telemetry
+
+        # A falar: só interessa o modelo de paragem (se existir)
+        if busy and not self.has_stop: self.streak = 0; return None
+
+        if self.gate is not None:
+            if not self.gate.update(self.resampler.float_out, audio_np):
+                self.streak = 0
+                if tel: tel.maybe_log()
+                return None
+            if self.gate.just_opened: self.engine.prime(self.gate.take_preroll())
+
+        # Previsão (medida para a telemetria)
+        t0 = time.perf_counter()
+        scores = self.engine.predict_scores(audio_np)
+        latency = time.perf_counter() - t0
+        score = float(scores[:self.n_wake].max())
+        y = self.resampler.float_out
+        clipped = y.max() > 32500 or y.min() < -32500
+        if tel: tel.record(latency, score, clipped)
+
+        if self.has_stop and speaking:
+            stop_score = float(scores[self.n_wake:].max())
+            if stop_score > self.stop_thresh: return ("stop", stop_score)
+        if busy: self.streak = 0; return None
+
+        # --- SILENT DEBUG LOGIC ---
+        # A string só é construída se o score for interessante (> 0.2) ou em debug total.
+        # Isto permite-te ver se ele te está a ouvir "baixo" (0.3, 0.4) sem encher o log de lixo
+        if self.debug or (score > 0.2):
+            self._log_counter += 1
+            # Limita o spam visual mesmo quando deteta algo
+            if self._log_counter % 2 == 0 or score > self.thresh:
+                amplitude = int(max(y.max(), -y.min()))
+                stat = "🔴 CLIP" if clipped else "🟢 SOM"
+                print(f"[{stat}] Vol:{amplitude:<5} | Score:{score:.4f} {'█' * int(score * 20)}")
+        if tel: tel.maybe_log()
+
+        if score > self.thresh: self.streak += 1
+        else: self.streak = 0
+
+        if self.streak >= self.persistence:
+            self.streak = 0
+            if tel: tel.record_detection()
+            return ("wake", score)
+        return None
+
+    def reset(self):
+        self.engine.reset()
+        self.resampler.reset()
+        self.streak = 0
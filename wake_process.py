@@ -0,0 +1,200 @@
+import time
+import weakref
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+from dsp_utils import AudioRingBuffer, EnergyGate
+from wake_engine import create_engine, warmup, WakeDetector
+from telemetry import WakeTelemetry
+
+# --- WAKE WORD NUM PROCESSO DEDICADO ---
+# O processo filho tem o seu próprio GIL: captura + openWakeWord não competem com o
+# Flask, os daemons das skills nem o Whisper. O áudio (ring) e os scores vivem em
+# shared memory; as deteções chegam ao processo principal por um Pipe.
+#
+# Layout da shared memory:
+#   [0:16)   controlo float64[2] -> [a_falar, ocupado_até (time.time())]
+#   [16:..)  scores float32[n_modelos] (alinhado a 8 bytes)
+#   [..]     AudioRingBuffer (head int64 + amostras int16 espelhadas)
+
+CTRL_SPEAKING = 0
+CTRL_BUSY_UNTIL = 1
+STATS_INTERVAL = 5.0
+MAX_RESTARTS = 5          # Mortes seguidas sem chegar a "ready" antes de desistir
+RESTART_BACKOFF = 2.0     # Segundos antes do 1º reinício; duplica a cada falha (máx. 60s)
+
+def _layout(buf, n_models, capacity, rate):
+    ctrl = np.ndarray((2,), dtype=np.float64, buffer=buf, offset=0)
+    scores = np.ndarray((n_models,), dtype=np.float32, buffer=buf, offset=16)
+    ring_offset = 16 + ((4 * n_models + 7) // 8) * 8
+    ring = AudioRingBuffer(capacity, rate=rate, buffer=buf[ring_offset:ring_offset + AudioRingBuffer.nbytes(capacity)])
+    return ctrl, scores, ring
+
+def _shm_size(n_models, capacity):
+    return 16 + ((4 * n_models + 7) // 8) * 8 + AudioRingBuffer.nbytes(capacity)
+
+def _worker(shm_name, settings, conn):
+    """ Processo filho: captura, motor e deteção. """
+    from audio_utils import AudioCapture
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    models = settings["models"]
+    ctrl, scores, ring = _layout(shm.buf, len(models), settings["capacity"], settings["rate"])
+
+    engine = create_engine(models, mode=settings["engine"],
+                           intra_threads=settings["intra_threads"], inter_threads=settings["inter_threads"])
+    if not engine.ready: conn.send(("error", "motor")); return
+    warmup(engine)
+
+    telemetry = WakeTelemetry(settings["telemetry_interval"])
+    gate = EnergyGate(**settings["gate"]) if settings["gate"] is not None else None
+    if gate is not None: telemetry.attach_gate(gate)
+    detector = WakeDetector(engine, settings["rate"], settings["n_wake"], thresh=settings["thresh"],
+                            persistence=settings["persistence"], stop_thresh=settings["stop_thresh"],
+                            gate=gate, telemetry=telemetry, debug=settings["debug"])
+
+    capture = AudioCapture(settings["device"], settings["rate"], detector.chunk_in, ring=ring)
+    reader = ring.reader(policy=settings["policy"], max_backlog=settings["max_backlog"])
+    telemetry.attach_ring(reader, settings["rate"])
+    conn.send(("ready", None))
+
+    next_stats = time.monotonic() + STATS_INTERVAL
+    while True:
+        try:
+            if not capture.active:
+                capture.start(); reader.clear()
+                print(f"👂 Stream Ativo (processo wake word)")
+
+            while True:
+                chunk = reader.read(detector.chunk_in, timeout=2.0)
+                if chunk is None: raise RuntimeError(f"Stream de áudio parado ({reader.stats()})")
+
+                speaking = ctrl[CTRL_SPEAKING] > 0
+                busy = speaking or time.time() < ctrl[CTRL_BUSY_UNTIL]
+                event = detector.process(chunk, busy, speaking)
+                scores[:] = engine.scores
+
+                if event is not None:
+                    if event[0] == "wake": ctrl[CTRL_BUSY_UNTIL] = float("inf")  # O pai liberta depois do comando
+                    conn.send(event)
+
+                # Comandos do processo principal
+                while conn.poll():
+                    msg = conn.recv()
+                    if msg == "reset": detector.reset(); reader.clear()
+                    elif msg == "exit": capture.stop(); return
+
+                if time.monotonic() > next_stats:
+                    next_stats = time.monotonic() + STATS_INTERVAL
+                    conn.send(("stats", telemetry.summary()))
+
+        except (EOFError, BrokenPipeError):
+            capture.stop(); return
+        except Exception as e:
+            print(f"❌ Erro Processo Wake: {e}")
+            capture.stop()
+            time.sleep(1)
+
+class WakeProcess:
+    """
+    Lado do processo principal. poll() devolve eventos ("wake"/"stop", score);
+    reader() dá acesso ao mesmo áudio (para gravar o comando com pre-roll).
+    """
+    def __init__(self, settings):
+        self.settings = settings
+        self.rate = settings["rate"]
+        self.names = settings["names"]
+        self.stats = None
+        self.on_ready = None
+        self.on_failed = None     # f(motivo): o filho morreu MAX_RESTARTS vezes seguidas sem arrancar
+        self.failures = 0
+        self.failed = False
+        self.last_error = None
+        self._next_start = 0.0
+        self._ctx = mp.get_context("spawn")
+        self._shm = shared_memory.SharedMemory(create=True, size=_shm_size(len(settings["models"]), settings["capacity"]))
+        self.ctrl, self.scores, self.ring = _layout(self._shm.buf, len(settings["models"]), settings["capacity"], self.rate)
+        self.ctrl[:] = 0
+        self.proc = None
+        self.conn = None
+        self._readers = weakref.WeakSet()   # Fechados em stop(), antes de libertar a shared memory
+
+    def start(self):
+        if self.proc is not None and self.proc.is_alive(): return
+        parent_conn, child_conn = self._ctx.Pipe()
+        self.conn = parent_conn
+        self.proc = self._ctx.Process(target=_worker, args=(self._shm.name, self.settings, child_conn),
+                                      name="phantasma-wake", daemon=True)
+        self.proc.start()
+        print(f"👻 Processo Wake Word iniciado (PID {self.proc.pid})")
+
+    def poll(self, timeout=0.05):
+        """ Próximo evento de deteção, ou None. Mensagens de estado são absorvidas aqui. """
+        if self.proc is None or not self.proc.is_alive():
+            self._restart()
+            time.sleep(timeout)
+            return None
+        try:
+            while self.conn.poll(timeout):
+                kind, payload = self.conn.recv()
+                if kind == "stats": self.stats = payload; timeout = 0; continue
+                if kind == "ready":
+                    print("👻 Processo Wake Word: ONLINE")
+                    self.failures = 0
+                    if self.on_ready: self.on_ready()
+                    timeout = 0; continue
+                if kind == "error":
+                    self.last_error = f"erro no {payload}"
+                    print(f"❌ Processo Wake Word: {self.last_error}"); return None
+                return kind, payload
+        except (EOFError, OSError): pass
+        return None
+
+    def _restart(self):
+        """ Reinicia o filho com backoff; desiste (on_failed) ao fim de MAX_RESTARTS falhas seguidas. """
+        if self.failed: return
+        if self.proc is not None:   # Acabou de morrer: conta e marca o próximo arranque
+            self.proc.join(timeout=0); self.proc = None
+            self.failures += 1
+            if self.failures > MAX_RESTARTS:
+                self.failed = True
+                reason = f"{self.failures - 1} reinícios falhados ({self.last_error or 'processo morreu'})"
+                print(f"❌ Processo Wake Word: desisto após {reason}.")
+                if self.on_failed: self.on_failed(reason)
+                return
+            delay = min(60.0, RESTART_BACKOFF * 2 ** (self.failures - 1))
+            self._next_start = time.monotonic() + delay
+            print(f"⚠️ Processo Wake Word em baixo. A reiniciar dentro de {delay:.0f}s ({self.failures}/{MAX_RESTARTS})...")
+        if time.monotonic() >= self._next_start: self.start()
+
+    def set_state(self, speaking, busy_until=None):
+        self.ctrl[CTRL_SPEAKING] = 1.0 if speaking else 0.0
+        if busy_until is not None: self.ctrl[CTRL_BUSY_UNTIL] = busy_until
+
+    def reset(self):
+        try: self.conn.send("reset")
+        except Exception: pass
+
+    def reader(self, preroll_seconds=0.0, policy="catch_up", max_backlog_seconds=None):
+        max_backlog = int(self.rate * max_backlog_seconds) if max_backlog_seconds else None
+        reader = self.ring.reader(int(self.rate * preroll_seconds), policy, max_backlog)
+        self._readers.add(reader)
+        return reader
+
+    def summary(self):
+        res = dict(self.stats or {})
+        res["process"] = {"pid": self.proc.pid if self.proc else None, "alive": bool(self.proc and self.proc.is_alive())}
+        res["last_scores"] = {n: round(float(s), 4) for n, s in zip(self.names, self.scores)}
+        return res
+
+    def stop(self):
+        try: self.conn.send("exit")
+        except Exception: pass
+        if self.proc is not None: self.proc.join(timeout=2)
+        # Os leitores deixam de tocar no ring ANTES do unmap (ler depois disso é um segfault)
+        for r in list(self._readers): r.close()
+        del self.ctrl, self.scores, self.ring
+        try: self._shm.close()
+        except BufferError: print("⚠️ Shared memory da wake word ainda em uso por um leitor (liberta ao sair).")
+        self._shm.unlink()